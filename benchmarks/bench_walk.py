@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the repository walker used by the decorator scanner.
+
+Builds a synthetic tree (100k files by default) in a temporary directory and
+times the legacy recursive Path.iterdir() walker against the iterative
+os.scandir() walker in dungeon_master.core.decorator_parser.
+
+Usage:
+    python benchmarks/bench_walk.py [--files N] [--repeat N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dungeon_master.core.decorator_parser import (  # noqa: E402
+    is_supported_file,
+    iter_repository_files,
+    should_skip_directory,
+)
+
+EXTENSIONS = [".py", ".ts", ".md", ".json", ".tsx"]
+
+
+def build_tree(root: Path, total_files: int) -> None:
+    """Create a tree of directories, each holding 50 small files."""
+    files_per_dir = 50
+    dirs_per_level = 20
+    for index in range(total_files // files_per_dir):
+        directory = root / f"pkg{index // dirs_per_level}" / f"mod{index}"
+        directory.mkdir(parents=True, exist_ok=True)
+        for file_index in range(files_per_dir):
+            ext = EXTENSIONS[file_index % len(EXTENSIONS)]
+            (directory / f"file{file_index}{ext}").write_bytes(b"x = 1\n")
+
+
+def legacy_walk(current_path: Path, excluded_directories=None):
+    """The recursive walker the scanner used before the scandir rewrite."""
+    files = []
+    try:
+        for item in current_path.iterdir():
+            if item.is_dir():
+                if should_skip_directory(item, excluded_directories):
+                    continue
+                files.extend(legacy_walk(item, excluded_directories))
+            elif item.is_file():
+                if is_supported_file(item):
+                    files.append(item)
+    except (PermissionError, OSError):
+        pass
+    return files
+
+
+def legacy_relative_paths(root: Path):
+    """Legacy walk plus the per-file relative_to() the scanner performed."""
+    return [str(path.relative_to(root)) for path in legacy_walk(root)]
+
+
+def scandir_relative_paths(root: Path):
+    """Walk with the iterative scandir walker."""
+    return [relative_path for relative_path, _ in iter_repository_files(root)]
+
+
+def best_time(func, root: Path, repeat: int):
+    """Return the best wall time over several runs and the result size."""
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(func(root))
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        print(f"Building synthetic tree with {args.files} files...")
+        build_tree(root, args.files)
+
+        legacy, legacy_count = best_time(legacy_relative_paths, root, args.repeat)
+        scandir, scandir_count = best_time(scandir_relative_paths, root, args.repeat)
+
+        assert legacy_count == scandir_count, (legacy_count, scandir_count)
+        print(f"candidate files:   {scandir_count}")
+        print(f"legacy iterdir:    {legacy * 1000:8.1f} ms")
+        print(f"iterative scandir: {scandir * 1000:8.1f} ms")
+        print(f"speedup:           {legacy / scandir:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
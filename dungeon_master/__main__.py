@@ -0,0 +1,9 @@
+# track_lore("cli/main-interface.md")
+"""
+Allow running Dungeon Master as ``python -m dungeon_master``.
+"""
+
+from dungeon_master.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,22 @@ try:
 except importlib.metadata.PackageNotFoundError:
     __version__ = "unknown"
 
+# Shared options for commands that scan the repository
+rebuild_cache_option = click.option(
+    "--rebuild-cache",
+    is_flag=True,
+    help="Ignore the incremental scan index and re-parse every source file.",
+)
+jobs_option = click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=None,
+    metavar="N",
+    help="Parse source files with N parallel workers (0 = automatic). "
+    "Defaults to the scanWorkers setting.",
+)
+
 
 @click.group()
 @click.version_option(version=__version__)
@@ -52,16 +68,54 @@ def init():
 
 
 @main.command()
-def validate():
+@rebuild_cache_option
+@jobs_option
+@click.option(
+    "--strict-scan",
+    is_flag=True,
+    help="Search whole source files for decorators, even when "
+    'decoratorScanMode is "header".',
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    help="Stop at the first missing, template or incomplete lore file.",
+)
+@click.option(
+    "--scoped/--full",
+    default=False,
+    help="--scoped only re-checks files changed since the last validation "
+    "(used by the pre-commit hook); --full rescans the whole repository "
+    "(default).",
+)
+@click.option(
+    "--staged",
+    is_flag=True,
+    help="Validate the staged versions of source and lore files, exactly as "
+    "the next commit would contain them.",
+)
+def validate(rebuild_cache, jobs, strict_scan, fail_fast, scoped, staged):
     """Validate documentation for pre-commit hook.
 
     Core pre-commit hook functionality that verifies each tracked file
     has corresponding documentation and checks that changed tracked files
     have updated documentation. Blocks commits when validation fails.
     """
-    from dungeon_master.commands.validate import run_validate
-
-    success = run_validate()
+    options = dict(
+        rebuild_cache=rebuild_cache,
+        jobs=jobs,
+        strict_scan=strict_scan,
+        fail_fast=fail_fast,
+        scoped=scoped,
+        staged=staged,
+    )
+    from dungeon_master.core.daemon import run_in_daemon
+
+    success = run_in_daemon("validate", options)
+    if success is None:
+        from dungeon_master.commands.validate import run_validate
+
+        success = run_validate(**options)
     if not success:
         sys.exit(1)
 
@@ -74,23 +128,32 @@ def validate():
     "USE WITH EXTREME CAUTION - only for truly minor changes that "
     "do not affect documented behavior.",
 )
-def review(mark_reviewed):
+@rebuild_cache_option
+@jobs_option
+def review(mark_reviewed, rebuild_cache, jobs):
     """Review documentation status.
 
     Display documentation status using rich formatting. Shows which lore files
     require updates, identifies template-only documentation, and provides
     clear visualization of documentation needs.
     """
-    from dungeon_master.commands.review import run_review
+    from dungeon_master.core.daemon import run_in_daemon
+
+    options = dict(mark_reviewed=mark_reviewed, rebuild_cache=rebuild_cache, jobs=jobs)
+    success = run_in_daemon("review", options)
+    if success is None:
+        from dungeon_master.commands.review import run_review
 
-    success = run_review(mark_reviewed)
+        success = run_review(**options)
     if not success:
         sys.exit(1)
 
 
 @main.command()
 @click.argument("lore_file", required=False)
-def create_lore(lore_file):
+@rebuild_cache_option
+@jobs_option
+def create_lore(lore_file, rebuild_cache, jobs):
     """Create missing documentation files.
 
     Scans all track_lore decorators in the codebase and creates missing
@@ -102,13 +165,15 @@ def create_lore(lore_file):
     """
     from dungeon_master.commands.create_lore import run_create_lore
 
-    success = run_create_lore(lore_file)
+    success = run_create_lore(lore_file, rebuild_cache=rebuild_cache, jobs=jobs)
     if not success:
         sys.exit(1)
 
 
 @main.command()
-def map():
+@rebuild_cache_option
+@jobs_option
+def map(rebuild_cache, jobs):
     """Generate a visual map of repository structure.
 
     Creates a file tree map showing relationships between source files
@@ -116,11 +181,76 @@ def map():
     """
     from dungeon_master.commands.map import run_map
 
-    success = run_map()
+    success = run_map(rebuild_cache=rebuild_cache, jobs=jobs)
+    if not success:
+        sys.exit(1)
+
+
+@main.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path())
+@rebuild_cache_option
+def impact(paths, rebuild_cache):
+    """Print the lore files affected by changes to PATHS.
+
+    Answers from the lore index persisted by the last scan, so it returns
+    instantly and is suitable for editor save hooks. Prints one lore file
+    path per line.
+    """
+    from dungeon_master.core.daemon import run_in_daemon
+
+    options = dict(paths=list(paths), rebuild_cache=rebuild_cache)
+    success = run_in_daemon("impact", options)
+    if success is None:
+        from dungeon_master.commands.impact import run_impact
+
+        success = run_impact(**options)
     if not success:
         sys.exit(1)
 
 
+@main.group()
+def daemon():
+    """Manage the background daemon for this repository.
+
+    While a daemon runs, validate, review and impact (including the
+    pre-commit hook) are answered from a warm process that keeps the scan
+    and lore indexes in memory. Without one they run in-process as usual.
+    """
+    pass
+
+
+@daemon.command(name="start")
+@click.option(
+    "--foreground",
+    is_flag=True,
+    help="Serve from this process until interrupted instead of detaching.",
+)
+def daemon_start(foreground):
+    """Start the daemon for the current repository."""
+    from dungeon_master.commands.daemon import run_daemon_start
+
+    if not run_daemon_start(foreground=foreground):
+        sys.exit(1)
+
+
+@daemon.command(name="stop")
+def daemon_stop():
+    """Stop the daemon for the current repository."""
+    from dungeon_master.commands.daemon import run_daemon_stop
+
+    if not run_daemon_stop():
+        sys.exit(1)
+
+
+@daemon.command(name="status")
+def daemon_status():
+    """Show whether a daemon serves the current repository."""
+    from dungeon_master.commands.daemon import run_daemon_status
+
+    if not run_daemon_status():
+        sys.exit(1)
+
+
 # Command aliases for convenience
 @main.command(name="dm")
 @click.pass_context
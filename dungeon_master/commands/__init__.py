@@ -7,9 +7,21 @@ as the entry point.
 """
 
 from .create_lore import run_create_lore
+from .daemon import run_daemon_start, run_daemon_status, run_daemon_stop
+from .impact import run_impact
 from .init import run_init
 from .map import run_map
 from .review import run_review
 from .validate import run_validate
 
-__all__ = ["run_init", "run_validate", "run_review", "run_create_lore", "run_map"]
+__all__ = [
+    "run_init",
+    "run_validate",
+    "run_review",
+    "run_create_lore",
+    "run_map",
+    "run_impact",
+    "run_daemon_start",
+    "run_daemon_stop",
+    "run_daemon_status",
+]
@@ -10,24 +10,33 @@ from pathlib import Path
 
 from rich.console import Console
 
-from dungeon_master.core.decorator_parser import scan_repository_for_lore_decorators
+from dungeon_master.core.decorator_parser import (
+    ScanStats,
+    iter_lore_decorators,
+)
 from dungeon_master.core.template import create_multiple_lore_files
 from dungeon_master.utils.config import get_lore_directory, load_config
 
 console = Console()
 
 
-def run_create_lore(lore_file=None):
+def run_create_lore(lore_file=None, rebuild_cache=False, jobs=None):
     """
     Create missing documentation files.
 
     Scans all track_lore decorators in codebase and creates missing
     documentation files with the standard template. Creates any necessary
-    subdirectories within .lore/ directory.
+    subdirectories within .lore/ directory. Each lore file's status is
+    reported as soon as it is first referenced; files are created once the
+    scan has collected every source file that references them.
 
     Args:
         lore_file (str, optional): Specific lore file to create.
                                   If None, scans for all missing files.
+        rebuild_cache (bool): Re-parse every source file instead of using
+                              the incremental scan index.
+        jobs (int): Number of parallel extraction workers, overriding
+                              the scanWorkers setting (0 = automatic).
 
     Returns:
         bool: True if files created successfully
@@ -41,37 +50,26 @@ def run_create_lore(lore_file=None):
         lore_root = get_lore_directory(config)
         lore_path = Path(lore_root)
 
-        # Scan for decorators
+        # Scan for decorators, reporting each lore file's status as soon as it
+        # is first referenced
         console.print("🔍 Scanning for track_lore decorators...")
-        mapping = scan_repository_for_lore_decorators(config=config)
-
-        if not mapping:
-            console.print(
-                "  [yellow]No track_lore decorators found in codebase[/yellow]"
-            )
-            return True
-
-        console.print(
-            f"  Found [bold]{len(mapping)}[/bold] unique lore files referenced in code"
-        )
-        console.print()
-
-        # Filter to specific file if requested
-        if lore_file:
-            if lore_file in mapping:
-                mapping = {lore_file: mapping[lore_file]}
-            else:
-                console.print(
-                    f"❌ [red]Lore file '{lore_file}' not found in any track_lore decorators[/red]"
-                )
-                return False
-
-        # Check which files already exist
-        console.print("📝 Checking documentation status...")
+        stats = ScanStats()
+        mapping = {}
         existing = []
         missing = []
 
-        for lore_file_path in mapping.keys():
+        for source_file, lore_file_path in iter_lore_decorators(
+            config=config, rebuild_cache=rebuild_cache, workers=jobs, stats=stats
+        ):
+            if lore_file_path in mapping:
+                mapping[lore_file_path].append(source_file)
+                continue
+            mapping[lore_file_path] = [source_file]
+
+            # Only report on the requested file, if any
+            if lore_file and lore_file_path != lore_file:
+                continue
+
             full_path = lore_path / lore_file_path
             if full_path.exists():
                 existing.append(lore_file_path)
@@ -84,6 +82,27 @@ def run_create_lore(lore_file=None):
                     f"  ❌ [cyan]{lore_root}/{lore_file_path}[/cyan] (missing)"
                 )
 
+        if config.get("verboseOutput"):
+            console.print(f"  [dim]{stats.summary()}[/dim]")
+
+        if not mapping:
+            console.print(
+                "  [yellow]No track_lore decorators found in codebase[/yellow]"
+            )
+            return True
+
+        console.print(
+            f"  Found [bold]{len(mapping)}[/bold] unique lore files referenced in code"
+        )
+        console.print()
+
+        # Check the specific file if requested
+        if lore_file and lore_file not in mapping:
+            console.print(
+                f"❌ [red]Lore file '{lore_file}' not found in any track_lore decorators[/red]"
+            )
+            return False
+
         if not missing:
             console.print("✨ [bold green]All lore files already exist![/bold green]")
             return True
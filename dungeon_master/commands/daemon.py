@@ -0,0 +1,142 @@
+# track_lore("commands/cli-system.md")
+"""
+Manage the Dungeon Master daemon.
+
+This module starts, stops and reports on the per-repository daemon that
+answers validate, review and impact requests from a warm process (see
+dungeon_master.core.daemon).
+"""
+
+import subprocess
+import sys
+import time
+
+from rich.console import Console
+
+from dungeon_master.core.daemon import (
+    DaemonError,
+    DaemonServer,
+    get_daemon_status,
+    get_runtime_directory,
+    get_socket_path,
+    is_daemon_supported,
+    stop_daemon,
+)
+from dungeon_master.utils.config import load_config
+
+console = Console()
+
+# Seconds to wait for a background daemon to start answering
+START_TIMEOUT = 10
+
+
+def run_daemon_start(foreground=False):
+    """
+    Start the daemon for the current repository.
+
+    Args:
+        foreground (bool): Serve from this process until stopped instead of
+                           starting a background process.
+
+    Returns:
+        bool: True if a daemon is running when the command finishes
+    """
+    try:
+        if not is_daemon_supported():
+            console.print(
+                "❌ [red]The daemon needs Unix domain sockets, which this "
+                "platform does not provide[/red]"
+            )
+            return False
+
+        status = get_daemon_status()
+        if status is not None:
+            console.print(
+                f"✅ [green]Daemon already running[/green] (pid {status['pid']})"
+            )
+            return True
+
+        if foreground:
+            config = load_config()
+            server = DaemonServer(poll_interval=config.get("daemonPollInterval", 5))
+            server.bind()
+            console.print(
+                f"👂 [green]Daemon listening on {server.socket_path}[/green] "
+                "(Ctrl+C to stop)"
+            )
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            return True
+
+        # Detach a foreground daemon into its own session, logging next to
+        # the socket so start-up failures can be diagnosed
+        get_runtime_directory(create=True)
+        log_path = get_socket_path().with_suffix(".log")
+        with open(log_path, "ab") as log:
+            command = [sys.executable, "-m", "dungeon_master"]
+            subprocess.Popen(
+                command + ["daemon", "start", "--foreground"],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            status = get_daemon_status()
+            if status is not None:
+                console.print(f"✅ [green]Daemon started[/green] (pid {status['pid']})")
+                return True
+            time.sleep(0.1)
+
+        console.print(f"❌ [red]Daemon did not start; see {log_path}[/red]")
+        return False
+
+    except (DaemonError, OSError) as e:
+        console.print(f"❌ [red]Error starting daemon: {e}[/red]")
+        return False
+
+
+def run_daemon_stop():
+    """
+    Stop the daemon for the current repository.
+
+    Returns:
+        bool: True if no daemon is running when the command finishes
+    """
+    if not stop_daemon():
+        console.print("[dim]No daemon running[/dim]")
+        return True
+
+    socket_path = get_socket_path()
+    deadline = time.monotonic() + START_TIMEOUT
+    while socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    console.print("🛑 [green]Daemon stopped[/green]")
+    return True
+
+
+def run_daemon_status():
+    """
+    Report whether a daemon serves the current repository.
+
+    Returns:
+        bool: True if a daemon is running
+    """
+    status = get_daemon_status()
+    if status is None:
+        console.print("[dim]No daemon running - commands run in-process[/dim]")
+        return False
+
+    last_refresh = status.get("lastRefresh")
+    refreshed = f"{time.time() - last_refresh:.0f}s ago" if last_refresh else "not yet"
+    console.print(f"✅ [green]Daemon running[/green] (pid {status['pid']})")
+    console.print(f"  Repository:   {status['root']}")
+    console.print(f"  Socket:       {get_socket_path()}")
+    console.print(f"  Uptime:       {status['uptime']:.0f}s")
+    console.print(f"  Requests:     {status['requests']}")
+    console.print(f"  Last refresh: {refreshed}")
+    return True
@@ -0,0 +1,92 @@
+# track_lore("commands/cli-system.md")
+"""
+Report lore files affected by changes to source files.
+
+This module answers "which documentation does this file feed?" from the
+persisted lore index, without scanning the repository, so it is fast enough
+to run from editor save hooks.
+"""
+
+from pathlib import Path
+
+from rich.console import Console
+
+from dungeon_master.core.decorator_parser import (
+    build_lore_index,
+    extract_lore_paths_safe,
+    get_relative_source_path,
+    is_supported_file,
+    load_lore_index,
+)
+from dungeon_master.utils.config import get_lore_directory, load_config
+
+console = Console()
+
+
+def get_impacted_lore(paths, index):
+    """
+    Collect the lore files affected by a set of changed paths.
+
+    A lore file is affected if the persisted index says a path references it
+    (covering references that were just removed) or if the path's current
+    content references it (covering references that were just added).
+    Directories affect the lore files of every indexed source below them.
+
+    Args:
+        paths (list): Changed file or directory paths
+        index (LoreIndex): Lore index for the repository
+
+    Returns:
+        list: Affected lore paths in first-seen order
+    """
+    impacted = {}
+    for path in paths:
+        path = Path(path)
+        relative_path = get_relative_source_path(path)
+
+        if path.is_dir():
+            prefix = "" if relative_path == "." else relative_path.rstrip("/") + "/"
+            for source_path, lore_paths in index.source_to_lore.items():
+                if source_path.startswith(prefix):
+                    impacted.update(dict.fromkeys(lore_paths))
+            continue
+
+        impacted.update(dict.fromkeys(index.lore_for(relative_path)))
+        if path.is_file() and is_supported_file(path):
+            impacted.update(dict.fromkeys(extract_lore_paths_safe(path)))
+
+    return list(impacted)
+
+
+def run_impact(paths, rebuild_cache=False):
+    """
+    Print the lore files affected by changes to the given paths.
+
+    Uses the lore index persisted by the last scan; if there is none (or
+    rebuild_cache is set) the repository is scanned once to build it. Output
+    is one lore file path per line, suitable for scripts and editor hooks.
+
+    Args:
+        paths (list): Changed file or directory paths
+        rebuild_cache (bool): Rescan the repository instead of using the
+                              persisted index.
+
+    Returns:
+        bool: True if the lookup succeeded
+    """
+    try:
+        config = load_config()
+        lore_root = get_lore_directory(config)
+
+        index = None if rebuild_cache else load_lore_index(config=config)
+        if index is None:
+            index = build_lore_index(config=config, rebuild_cache=rebuild_cache)
+
+        for lore_file in get_impacted_lore(paths, index):
+            console.print(f"{lore_root}/{lore_file}", highlight=False, soft_wrap=True)
+
+        return True
+
+    except Exception as e:
+        console.print(f"❌ [red]Error computing impact: {e}[/red]")
+        return False
@@ -198,8 +198,8 @@ def setup_pre_commit_hook() -> bool:
 
 echo "🔒 Running Dungeon Master validation..."
 
-# Run dm validate command
-dm validate
+# Run dm validate, re-checking only what changed since the last validation
+dm validate --scoped
 
 # Exit with the same code as dm validate
 exit $?
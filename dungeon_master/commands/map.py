@@ -11,13 +11,17 @@ from pathlib import Path
 from rich.console import Console
 from rich.tree import Tree
 
-from dungeon_master.core.decorator_parser import scan_repository_for_lore_decorators
+from dungeon_master.core.cache import LoreIndex
+from dungeon_master.core.decorator_parser import (
+    ScanStats,
+    scan_repository_for_lore_decorators,
+)
 from dungeon_master.utils.config import get_lore_directory, load_config
 
 console = Console()
 
 
-def generate_project_tree(repo_path, mapping, lore_root):
+def generate_project_tree(repo_path, mapping, lore_root, index=None):
     """
     Generate a project tree structure showing tracked files and their documentation.
 
@@ -25,17 +29,15 @@ def generate_project_tree(repo_path, mapping, lore_root):
         repo_path (Path): Repository root path
         mapping (dict): Mapping of lore files to tracked files
         lore_root (str): Path to lore directory
+        index (LoreIndex, optional): Index built from mapping, if available
 
     Returns:
         str: Markdown representation of the project tree
     """
-    # Create reverse mapping: source file -> lore files
-    file_to_lore = {}
-    for lore_file, tracked_files in mapping.items():
-        for tracked_file in tracked_files:
-            if tracked_file not in file_to_lore:
-                file_to_lore[tracked_file] = []
-            file_to_lore[tracked_file].append(lore_file)
+    # Reverse mapping: source file -> lore files
+    if index is None:
+        index = LoreIndex(mapping)
+    file_to_lore = index.source_to_lore
 
     # Build directory structure
     tree_data = {}
@@ -134,7 +136,7 @@ def render_tree_markdown(tree_data, prefix="", is_last=True, level=0):
     return lines
 
 
-def run_map():
+def run_map(rebuild_cache=False, jobs=None):
     """
     Generate a visual representation of repository structure.
 
@@ -143,6 +145,12 @@ def run_map():
     - Shows relationships between source files and documentation
     - Saves output as map.md in .lore/ directory
 
+    Args:
+        rebuild_cache (bool): Re-parse every source file instead of using
+                              the incremental scan index.
+        jobs (int): Number of parallel extraction workers, overriding
+                              the scanWorkers setting (0 = automatic).
+
     Returns:
         bool: True if map generated successfully
     """
@@ -157,7 +165,12 @@ def run_map():
 
         # Scan for decorators
         console.print("🔍 Scanning repository structure...")
-        mapping = scan_repository_for_lore_decorators(config=config)
+        stats = ScanStats()
+        mapping = scan_repository_for_lore_decorators(
+            config=config, rebuild_cache=rebuild_cache, workers=jobs, stats=stats
+        )
+        if config.get("verboseOutput"):
+            console.print(f"  [dim]{stats.summary()}[/dim]")
 
         if not mapping:
             console.print(
@@ -170,7 +183,9 @@ def run_map():
 
         # Generate tree structure
         repo_path = Path.cwd()
-        tree_data = generate_project_tree(repo_path, mapping, lore_root)
+        tree_data = generate_project_tree(
+            repo_path, mapping, lore_root, LoreIndex(mapping)
+        )
 
         # Create Rich tree for console display
         rich_tree = Tree("📂 [bold]Project Tree[/bold]")
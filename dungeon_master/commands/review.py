@@ -6,20 +6,27 @@ This module handles displaying documentation status using rich formatting,
 showing which lore files require updates and providing manual override options.
 """
 
-from pathlib import Path
-
 from rich.console import Console
 from rich.table import Table
 
-from dungeon_master.core.decorator_parser import scan_repository_for_lore_decorators
-from dungeon_master.core.git_utils import get_changed_files
-from dungeon_master.core.template import validate_lore_file
+from dungeon_master.core.cache import get_cache_path
+from dungeon_master.core.decorator_parser import (
+    ScanStats,
+    iter_lore_decorators,
+    open_blob_cache,
+)
+from dungeon_master.core.git_utils import GitStatusSnapshot
+from dungeon_master.core.validation import (
+    LoreStatus,
+    LoreValidator,
+    resolve_validation_workers,
+)
 from dungeon_master.utils.config import get_lore_directory, load_config
 
 console = Console()
 
 
-def run_review(mark_reviewed=None):
+def run_review(mark_reviewed=None, rebuild_cache=False, jobs=None):
     """
     Display documentation status with rich formatting.
 
@@ -33,6 +40,10 @@ def run_review(mark_reviewed=None):
     Args:
         mark_reviewed (str, optional): File to mark as reviewed for manual override.
                                       USE WITH EXTREME CAUTION.
+        rebuild_cache (bool): Re-parse every source file instead of using
+                              the incremental scan index.
+        jobs (int): Number of parallel extraction workers, overriding
+                              the scanWorkers setting (0 = automatic).
 
     Returns:
         bool: True if review completes successfully
@@ -70,11 +81,30 @@ def run_review(mark_reviewed=None):
         # Load configuration
         config = load_config()
         lore_root = get_lore_directory(config)
-        lore_path = Path(lore_root)
 
-        # Scan for decorators
+        # Scan for decorators, validating each lore file as soon as it is
+        # first referenced so the checks overlap with the scan
         console.print("🔍 Scanning for track_lore decorators...")
-        mapping = scan_repository_for_lore_decorators(config=config)
+        stats = ScanStats()
+        mapping = {}
+        blob_cache = None if rebuild_cache else open_blob_cache(config=config)
+        validator = LoreValidator(lore_root, blob_cache=blob_cache, config=config)
+        if not rebuild_cache:
+            validator.load_results(get_cache_path(config))
+        decorators = iter_lore_decorators(
+            config=config, rebuild_cache=rebuild_cache, workers=jobs, stats=stats
+        )
+        workers = resolve_validation_workers(config.get("validationWorkers", 0))
+        statuses = {
+            lore_status.lore_path: lore_status
+            for lore_status in validator.iter_statuses(decorators, mapping, workers)
+        }
+        validator.save_results()
+        if blob_cache is not None:
+            blob_cache.close()
+
+        if config.get("verboseOutput"):
+            console.print(f"  [dim]{stats.summary()}[/dim]")
 
         if not mapping:
             console.print(
@@ -88,7 +118,14 @@ def run_review(mark_reviewed=None):
         console.print()
 
         # Get changed files for update detection
-        changed_files = get_changed_files()
+        status = GitStatusSnapshot.capture()
+        changed_files = status.changed if status is not None else set()
+        updates = {
+            lore_file_path: (changed_tracked, lore_changed)
+            for lore_file_path, changed_tracked, lore_changed in validator.find_updates(
+                mapping, changed_files
+            )
+        }
 
         # Create status table
         table = Table(
@@ -110,11 +147,11 @@ def run_review(mark_reviewed=None):
         issues_found = []
 
         for lore_file_path, tracked_files in mapping.items():
-            full_path = lore_path / lore_file_path
             tracked_files_str = ", ".join(tracked_files)
             issues = []
 
-            if not full_path.exists():
+            lore_status = statuses[lore_file_path]
+            if lore_status.state == LoreStatus.MISSING:
                 status = "🔴 MISSING"
                 issues.append("File does not exist")
                 issues_found.append(
@@ -122,10 +159,7 @@ def run_review(mark_reviewed=None):
                 )
 
             else:
-                # Validate the lore file
-                validation = validate_lore_file(full_path)
-
-                if validation["is_template"]:
+                if lore_status.state == LoreStatus.TEMPLATE:
                     status = "🟡 TEMPLATE"
                     issues.append("Contains placeholder text")
                     issues_found.append(
@@ -136,24 +170,20 @@ def run_review(mark_reviewed=None):
                         )
                     )
 
-                elif not validation["is_valid"]:
+                elif lore_status.state == LoreStatus.INCOMPLETE:
                     status = "🟠 INCOMPLETE"
-                    missing_sections = ", ".join(validation["missing_sections"])
-                    issues.append(f"Missing: {missing_sections}")
+                    issues.extend(lore_status.problems)
                     issues_found.append(
-                        (
-                            lore_file_path,
-                            "FIX",
-                            f"Add missing sections: {missing_sections}",
-                        )
+                        (lore_file_path, "FIX", "; ".join(lore_status.problems))
                     )
 
                 else:
                     # Check if files need updates
-                    changed_tracked = [f for f in tracked_files if f in changed_files]
+                    changed_tracked, lore_changed = updates.get(
+                        lore_file_path, ([], False)
+                    )
                     if changed_tracked:
-                        lore_relative = str(Path(lore_root) / lore_file_path)
-                        if lore_relative not in changed_files:
+                        if not lore_changed:
                             status = "⚠️ NEEDS UPDATE"
                             issues.append(f"Code changed: {', '.join(changed_tracked)}")
                             issues_found.append(
@@ -7,19 +7,336 @@ each tracked file has corresponding documentation and checks that changed
 tracked files have updated documentation.
 """
 
+import hashlib
 from pathlib import Path
 
 from rich.console import Console
 
-from dungeon_master.core.decorator_parser import scan_repository_for_lore_decorators
-from dungeon_master.core.git_utils import get_changed_files
-from dungeon_master.core.template import validate_lore_file
-from dungeon_master.utils.config import get_lore_directory, load_config
+from dungeon_master.core.cache import (
+    CACHE_SCHEMA_VERSION,
+    LoreIndex,
+    get_cache_path,
+    load_cache,
+    save_cache,
+)
+from dungeon_master.core.decorator_parser import (
+    GIT_BACKENDS,
+    ScanStats,
+    get_header_scan_limits,
+    get_parser_fingerprint,
+    iter_lore_decorators,
+    load_lore_index,
+    open_blob_cache,
+    refresh_lore_index,
+    save_lore_index,
+)
+from dungeon_master.core.git_utils import (
+    GitStatusSnapshot,
+    get_files_changed_between,
+    get_git_session,
+    get_head_commit,
+    get_index_tree,
+)
+from dungeon_master.core.template import get_configured_template
+from dungeon_master.core.validation import (
+    LoreStatus,
+    LoreValidator,
+    StagedLore,
+    resolve_validation_workers,
+)
+from dungeon_master.utils.config import (
+    get_config_fingerprint,
+    get_lore_directory,
+    load_config,
+)
 
 console = Console()
 
+# Above this many changed paths a scoped run falls back to a full scan
+MAX_SCOPED_PATHS = 2000
 
-def run_validate():
+
+def capture_checkpoint(config, status):
+    """
+    Record the git state validation results can be tied to.
+
+    Args:
+        config (dict): Configuration in effect
+        status (GitStatusSnapshot): Working tree state taken for this run,
+                                    or None outside a git work tree
+
+    Returns:
+        dict: HEAD commit, paths whose working tree content differs from
+              HEAD and a configuration fingerprint, or None outside a git
+              repository with at least one commit
+    """
+    if status is None:
+        return None
+    head = get_head_commit()
+    if head is None:
+        return None
+    return {
+        "head": head,
+        "dirty": sorted(status.dirty),
+        "config": get_config_fingerprint(config),
+    }
+
+
+def get_validation_fingerprint(config, scan_mode=None):
+    """
+    Digest everything besides the files that decides a validation outcome.
+
+    Args:
+        config (dict): Configuration in effect
+        scan_mode (str): "full" or "header", overriding decoratorScanMode
+
+    Returns:
+        str: Hex digest of the configuration, the lore template, the
+             decorator scan rules and the cache schema version
+    """
+    template = get_configured_template(config)
+    digest = hashlib.sha256()
+    for part in (
+        get_config_fingerprint(config),
+        get_parser_fingerprint(*get_header_scan_limits(config, scan_mode)),
+        str(CACHE_SCHEMA_VERSION),
+        template,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def capture_validated_tree(
+    config, status, staged=False, scan_mode=None, write_index=True
+):
+    """
+    Identify a validation run's input by the tree the git index holds.
+
+    A staged run only ever reads what is in the index. Any other run reads
+    the working tree, which matches the index exactly when nothing is
+    modified or untracked, so the index tree describes it as well (as long
+    as the scan takes its files from git). Together with the changed files
+    the needs-update check looks at and the validation fingerprint, the
+    tree fully determines the outcome.
+
+    Args:
+        config (dict): Configuration in effect
+        status (GitStatusSnapshot): Working tree state taken for this run,
+                                    or None outside a git work tree
+        staged (bool): Whether the run validates the staged content
+        scan_mode (str): "full" or "header", overriding decoratorScanMode
+        write_index (bool): Allow git write-tree when the index's cached
+                            tree is not valid (see get_index_tree())
+
+    Returns:
+        dict: Tree id, digest of the changed paths (None when nothing
+              changed) and validation fingerprint, or None if the run is
+              not described by the index tree
+    """
+    if status is None:
+        return None
+    if not staged:
+        if status.unstaged or status.untracked:
+            return None
+        if config.get("scanBackend", "git") not in GIT_BACKENDS:
+            return None
+
+    tree = get_index_tree(write=write_index)
+    if tree is None:
+        return None
+
+    changes = None
+    changed_files = status.get_changed(include_unstaged=not staged)
+    if changed_files:
+        encoded = "\0".join(sorted(changed_files)).encode("utf-8")
+        changes = hashlib.sha256(encoded).hexdigest()
+    return {
+        "tree": tree,
+        "changes": changes,
+        "fingerprint": get_validation_fingerprint(config, scan_mode),
+    }
+
+
+def is_tree_validated(config, validated_tree):
+    """
+    Check whether a successful validation already had this input.
+
+    Files and settings must match the cache's lastValidation entry. The
+    changed files must match too, unless nothing changed: then no lore file
+    can need an update, and the other checks only depend on the tree. That
+    is the case when a commit is amended without changes.
+
+    Args:
+        config (dict): Configuration in effect
+        validated_tree (dict): Run input from capture_validated_tree()
+
+    Returns:
+        bool: True if the run would pass again
+    """
+    cache_path = get_cache_path(config)
+    if validated_tree is None or cache_path is None:
+        return False
+    last = load_cache(cache_path).get("lastValidation")
+    if not isinstance(last, dict):
+        return False
+    return (
+        last.get("tree") == validated_tree["tree"]
+        and last.get("fingerprint") == validated_tree["fingerprint"]
+        and validated_tree["changes"] in (None, last.get("changes"))
+    )
+
+
+def remember_validated_tree(config, validated_tree):
+    """
+    Record a successful validation's input as the cache's lastValidation.
+
+    Args:
+        config (dict): Configuration in effect
+        validated_tree (dict): Run input from capture_validated_tree()
+    """
+    cache_path = get_cache_path(config)
+    if validated_tree is None or cache_path is None:
+        return
+    cache = load_cache(cache_path)
+    if cache.get("lastValidation") != validated_tree:
+        cache["lastValidation"] = validated_tree
+        save_cache(cache, cache_path)
+
+
+def get_validation_scope(config, checkpoint, lore_root, scan_mode=None):
+    """
+    Work out what a scoped validation run has to look at.
+
+    Starting from the lore index saved by the last validation, only files
+    that may differ from what that run saw are re-scanned: files changed
+    between the two HEAD commits and files that were modified or untracked
+    at either time. Lore files referenced by those files (before or after
+    the change), lore files that were themselves changed and lore files
+    that failed last time are the ones that need checking; every other lore
+    file would give the same result as before.
+
+    Args:
+        config (dict): Configuration in effect
+        checkpoint (dict): Current git state from capture_checkpoint()
+        lore_root (str): Lore directory
+        scan_mode (str): "full" or "header", overriding decoratorScanMode
+
+    Returns:
+        tuple: (updated LoreIndex, changed paths, set of lore files to
+               check), or None if a full scan is needed
+    """
+    if checkpoint is None or config.get("scanBackend", "git") != "git":
+        return None
+
+    index = load_lore_index(config=config, scan_mode=scan_mode)
+    previous = index.checkpoint if index is not None else None
+    if not previous or previous.get("config") != checkpoint["config"]:
+        return None
+
+    changed_paths = set(previous.get("dirty", [])) | set(checkpoint["dirty"])
+    if previous.get("head") != checkpoint["head"]:
+        committed = get_files_changed_between(previous.get("head"), checkpoint["head"])
+        if committed is None:
+            return None
+        changed_paths.update(committed)
+    if len(changed_paths) > MAX_SCOPED_PATHS:
+        return None
+
+    refreshed = refresh_lore_index(
+        index, changed_paths, config=config, scan_mode=scan_mode
+    )
+    if refreshed is None:
+        return None
+
+    lore_prefix = Path(lore_root).as_posix().rstrip("/") + "/"
+    affected = set(previous.get("failing", []))
+    for path in changed_paths:
+        affected.update(index.lore_for(path))
+        affected.update(refreshed.lore_for(path))
+        if path.startswith(lore_prefix):
+            affected.add(path[len(lore_prefix) :])
+
+    return refreshed, sorted(changed_paths), affected
+
+
+def record_passed_checkpoint(config, status, lore_root, scan_mode=None):
+    """
+    Move the scoped checkpoint to a run that passed without scanning.
+
+    A run whose tree already passed validation (see is_tree_validated())
+    reports nothing as failing, but the lore index still describes the git
+    state of the last run that scanned. The index is brought up to date the
+    way a scoped run would, so the next scoped run starts from here instead
+    of re-scanning everything changed since.
+
+    Args:
+        config (dict): Configuration in effect
+        status (GitStatusSnapshot): Working tree state taken for this run
+        lore_root (str): Lore directory
+        scan_mode (str): "full" or "header", overriding decoratorScanMode
+    """
+    checkpoint = capture_checkpoint(config, status)
+    scope = get_validation_scope(config, checkpoint, lore_root, scan_mode)
+    if scope is None:
+        return
+    index = scope[0]
+    index.checkpoint = dict(checkpoint, failing=[])
+    save_lore_index(index, config=config, scan_mode=scan_mode)
+
+
+def report_lore_status(lore_root, status, problems):
+    """
+    Print a lore file's status and record it if it is a problem.
+
+    Args:
+        lore_root (str): Lore directory
+        status (LoreStatus): Status computed by the LoreValidator
+        problems (tuple): (missing, template, invalid) lists of LoreStatus
+                          to append to
+
+    Returns:
+        bool: True if the lore file has a problem
+    """
+    missing_files, template_files, invalid_files = problems
+    lore_file_path = status.lore_path
+
+    if status.state == LoreStatus.MISSING:
+        missing_files.append(status)
+        console.print(f"  ❌ [red]MISSING: {lore_root}/{lore_file_path}[/red]")
+        console.print(
+            f"     [dim]Referenced in: {', '.join(status.tracked_files)}[/dim]"
+        )
+        return True
+
+    if status.state == LoreStatus.TEMPLATE:
+        template_files.append(status)
+        console.print(f"  ⚠️ [yellow]TEMPLATE: {lore_root}/{lore_file_path}[/yellow]")
+        console.print(f"     [dim]Contains placeholder text - needs completion[/dim]")
+        return True
+
+    if status.state == LoreStatus.INCOMPLETE:
+        invalid_files.append(status)
+        console.print(f"  ❌ [red]INCOMPLETE: {lore_root}/{lore_file_path}[/red]")
+        for section_problem in status.section_problems:
+            console.print(f"     [dim]Section check: {section_problem}[/dim]")
+        for diagram_problem in status.diagram_problems:
+            console.print(f"     [dim]Diagram check: {diagram_problem}[/dim]")
+        return True
+
+    console.print(f"  ✅ [green]VALID: {lore_root}/{lore_file_path}[/green]")
+    return False
+
+
+def run_validate(
+    rebuild_cache=False,
+    jobs=None,
+    strict_scan=False,
+    fail_fast=False,
+    scoped=False,
+    staged=False,
+    write_index=True,
+):
     """
     Core pre-commit hook functionality.
 
@@ -30,8 +347,43 @@ def run_validate():
     - Placeholder text in required sections is detected
     - Professional diagrams are included when required
 
+    Lore files are checked as soon as the scan finds their first reference,
+    so problems are reported while the rest of the repository is scanned.
+    In scoped mode (used by the pre-commit hook) only files changed since
+    the last validation are re-scanned and only the lore files they can
+    affect are re-checked; the outcome is the same as a full run. Scoped
+    runs fall back to a full scan when there is no usable checkpoint.
+
+    In staged mode source and lore files are validated as they are staged
+    in the git index, i.e. exactly what the next commit would contain, and
+    only staged changes count as changed files. Staged runs always scan the
+    whole index and do not record a checkpoint.
+
+    A successful run whose input is described by the tree the index holds
+    (see capture_validated_tree()) is remembered in the cache, and later
+    runs with the same tree, changes and settings pass without scanning -
+    for example when a hook is retried or a commit is amended. Such a run
+    still moves the scoped checkpoint to the current git state.
+
     Blocks commits when validation fails.
 
+    Args:
+        rebuild_cache (bool): Re-parse every source file instead of using
+                              the incremental scan index.
+        jobs (int): Number of parallel extraction workers, overriding
+                              the scanWorkers setting (0 = automatic).
+        strict_scan (bool): Search whole files for decorators regardless
+                              of the decoratorScanMode setting.
+        fail_fast (bool): Stop scanning at the first missing, template or
+                              incomplete lore file.
+        scoped (bool): Only re-check what changed since the last
+                              validation (see get_validation_scope()).
+        staged (bool): Validate the staged content instead of the
+                              working tree; takes precedence over scoped.
+        write_index (bool): Allow git write-tree to identify the index
+                              tree; background runs pass False so they
+                              never lock the git index.
+
     Returns:
         bool: True if validation passes, False if it fails
     """
@@ -44,102 +396,183 @@ def run_validate():
         # Load configuration
         config = load_config()
         lore_root = get_lore_directory(config)
-        lore_path = Path(lore_root)
-
-        # Scan for decorators
-        console.print("🔍 Scanning for track_lore decorators...")
-        mapping = scan_repository_for_lore_decorators(config=config)
-
-        if not mapping:
-            console.print(
-                "  [green]No track_lore decorators found - validation passes[/green]"
-            )
-            return True
 
-        console.print(
-            f"  Found [bold]{len(mapping)}[/bold] lore files referenced in code"
-        )
-        console.print()
-
-        # Check for missing lore files
-        console.print("📋 Checking for missing documentation files...")
+        scan_mode = "full" if strict_scan else None
         missing_files = []
         template_files = []
         invalid_files = []
+        problems = (missing_files, template_files, invalid_files)
+        stopped_early = False
+
+        # One status snapshot answers every working tree question of the run.
+        # It is taken before reading any file, so edits made while
+        # validating are picked up as changes by the next scoped run
+        status = GitStatusSnapshot.capture()
+
+        # The index tree identifies what this run would read; a tree that
+        # already passed with the same changes and settings passes unscanned
+        validated_tree = capture_validated_tree(
+            config, status, staged, scan_mode, write_index
+        )
+        if not rebuild_cache and is_tree_validated(config, validated_tree):
+            if not staged:
+                record_passed_checkpoint(config, status, lore_root, scan_mode)
+            console.print(
+                f"  [green]Tree {validated_tree['tree'][:12]} already passed "
+                "validation - nothing to re-check[/green]"
+            )
+            console.print()
+            console.print("✅ [bold green]VALIDATION PASSED[/bold green]")
+            console.print("All documentation is properly maintained and up-to-date.")
+            return True
 
-        for lore_file_path, tracked_files in mapping.items():
-            full_path = lore_path / lore_file_path
-
-            if not full_path.exists():
-                missing_files.append((lore_file_path, tracked_files))
-                console.print(f"  ❌ [red]MISSING: {lore_root}/{lore_file_path}[/red]")
-                console.print(
-                    f"     [dim]Referenced in: {', '.join(tracked_files)}[/dim]"
-                )
+        # Staged runs read the index through the session's blob reader,
+        # shared by the scan and the lore checks; they describe the index
+        # rather than the working tree, so they are never used as a checkpoint
+        blob_reader = None
+        staged_lore = None
+        checkpoint = None
+        if staged:
+            blob_reader = get_git_session().blob_reader
+            staged_lore = StagedLore(lore_root, blob_reader)
+        else:
+            checkpoint = capture_checkpoint(config, status)
+        # Lore validation results are shared with every worktree of the clone
+        blob_cache = None if rebuild_cache else open_blob_cache(config=config)
+        validator = LoreValidator(lore_root, staged_lore, blob_cache, config)
+        if not rebuild_cache:
+            validator.load_results(get_cache_path(config))
+        validation_workers = config.get("validationWorkers", 0)
+        scope = None
+        if scoped and not staged and not rebuild_cache:
+            scope = get_validation_scope(config, checkpoint, lore_root, scan_mode)
+
+        if scope is not None:
+            # Scoped: re-scan only what changed since the last checkpoint and
+            # check the lore files those changes can affect
+            index, changed_paths, affected = scope
+            mapping = index.lore_to_sources
+            console.print(
+                f"🔍 Re-scanning [bold]{len(changed_paths)}[/bold] changed files "
+                "for track_lore decorators..."
+            )
+            lore_files = [
+                (lore_file_path, tracked_files)
+                for lore_file_path, tracked_files in mapping.items()
+                if lore_file_path in affected
+            ]
+            # Size the pool for the change set: a commit touching a few
+            # files checks its lore files with a few threads, or serially
+            workers = resolve_validation_workers(validation_workers, len(lore_files))
+            statuses = validator.check_each(lore_files, workers)
+            try:
+                for lore_status in statuses:
+                    report_lore_status(lore_root, lore_status, problems)
+                    if fail_fast and any(problems):
+                        stopped_early = True
+                        break
+            finally:
+                statuses.close()
+        else:
+            # Scan for decorators, checking each lore file as soon as it is
+            # first referenced so problems are reported before the scan finishes
+            if staged:
+                console.print("🔍 Scanning staged files for track_lore decorators...")
             else:
-                # Validate the lore file
-                validation = validate_lore_file(full_path)
+                console.print("🔍 Scanning for track_lore decorators...")
+            stats = ScanStats()
+            mapping = {}
+            decorators = iter_lore_decorators(
+                config=config,
+                rebuild_cache=rebuild_cache,
+                workers=jobs,
+                scan_mode=scan_mode,
+                stats=stats,
+                staged=staged,
+                blob_reader=blob_reader,
+            )
+            statuses = validator.iter_statuses(
+                decorators, mapping, resolve_validation_workers(validation_workers)
+            )
+            try:
+                # Each status's tracked list keeps growing as the scan
+                # continues, so the summary below reports every referencing file
+                for lore_status in statuses:
+                    report_lore_status(lore_root, lore_status, problems)
+                    if fail_fast and any(problems):
+                        stopped_early = True
+                        break
+            finally:
+                statuses.close()
+                decorators.close()
+
+            if config.get("verboseOutput"):
+                console.print(f"  [dim]{stats.summary()}[/dim]")
+            index = LoreIndex(mapping)
+
+        validator.save_results()
+        if blob_cache is not None:
+            blob_cache.close()
+
+        # Remember the outcome so the next scoped run can start from here
+        if checkpoint is not None and not stopped_early:
+            failing = [entry.lore_path for problem in problems for entry in problem]
+            index.checkpoint = dict(checkpoint, failing=failing)
+            save_lore_index(index, config=config, scan_mode=scan_mode)
 
-                if validation["is_template"]:
-                    template_files.append((lore_file_path, tracked_files, validation))
-                    console.print(
-                        f"  ⚠️ [yellow]TEMPLATE: {lore_root}/{lore_file_path}[/yellow]"
-                    )
-                    console.print(
-                        f"     [dim]Contains placeholder text - needs completion[/dim]"
-                    )
-                elif not validation["is_valid"]:
-                    invalid_files.append((lore_file_path, tracked_files, validation))
-                    console.print(
-                        f"  ❌ [red]INCOMPLETE: {lore_root}/{lore_file_path}[/red]"
-                    )
-                    console.print(
-                        f"     [dim]Missing required sections: {', '.join(validation['missing_sections'])}[/dim]"
-                    )
-                else:
-                    console.print(
-                        f"  ✅ [green]VALID: {lore_root}/{lore_file_path}[/green]"
-                    )
+        if not mapping:
+            console.print(
+                "  [green]No track_lore decorators found - validation passes[/green]"
+            )
+            remember_validated_tree(config, validated_tree)
+            return True
 
+        if stopped_early:
+            console.print(
+                "  [yellow]Stopped at the first problem (--fail-fast)[/yellow]"
+            )
+        else:
+            console.print(
+                f"  Found [bold]{len(mapping)}[/bold] lore files referenced in code"
+            )
         console.print()
 
         # Check for files that need updates based on git changes
-        console.print("📝 Checking for files needing updates...")
-        changed_files = get_changed_files()
         needs_update = []
+        if not stopped_early:
+            console.print("📝 Checking for files needing updates...")
+            changed_files = set()
+            if status is not None:
+                changed_files = status.get_changed(include_unstaged=not staged)
+
+            if changed_files:
+
+                updates = validator.find_updates(mapping, changed_files)
+                for lore_file_path, changed_tracked, lore_changed in updates:
+                    if not lore_changed:
+                        needs_update.append((lore_file_path, changed_tracked))
+                        console.print(
+                            f"  ❌ [red]NEEDS UPDATE: {lore_root}/{lore_file_path}[/red]"
+                        )
+                        console.print(
+                            f"     [dim]Changed files: {', '.join(changed_tracked)}[/dim]"
+                        )
+                    else:
+                        console.print(
+                            f"  ✅ [green]UPDATED: {lore_root}/{lore_file_path}[/green]"
+                        )
+                        console.print(
+                            f"     [dim]Both code and docs updated: {', '.join(changed_tracked)}[/dim]"
+                        )
+
+                if not any(
+                    [missing_files, template_files, invalid_files, needs_update]
+                ):
+                    console.print("  ✅ [green]All documentation is up to date[/green]")
+            else:
+                console.print("  [dim]No changed files detected[/dim]")
 
-        if changed_files:
-
-            for lore_file_path, tracked_files in mapping.items():
-                # Check if any tracked files for this lore file have changed
-                changed_tracked = [f for f in tracked_files if f in changed_files]
-                if changed_tracked:
-                    full_path = lore_path / lore_file_path
-                    if full_path.exists():
-                        # Check if lore file is also changed (updated)
-                        lore_relative = str(Path(lore_root) / lore_file_path)
-                        if lore_relative not in changed_files:
-                            needs_update.append((lore_file_path, changed_tracked))
-                            console.print(
-                                f"  ❌ [red]NEEDS UPDATE: {lore_root}/{lore_file_path}[/red]"
-                            )
-                            console.print(
-                                f"     [dim]Changed files: {', '.join(changed_tracked)}[/dim]"
-                            )
-                        else:
-                            console.print(
-                                f"  ✅ [green]UPDATED: {lore_root}/{lore_file_path}[/green]"
-                            )
-                            console.print(
-                                f"     [dim]Both code and docs updated: {', '.join(changed_tracked)}[/dim]"
-                            )
-
-            if not any([missing_files, template_files, invalid_files, needs_update]):
-                console.print("  ✅ [green]All documentation is up to date[/green]")
-        else:
-            console.print("  [dim]No changed files detected[/dim]")
-
-        console.print()
+            console.print()
 
         # Summary and validation result
         has_errors = bool(
@@ -152,15 +585,20 @@ def run_validate():
 
             if missing_files:
                 console.print("[red]MISSING FILES:[/red]")
-                for lore_file, tracked_files in missing_files:
+                for lore_status in missing_files:
+                    lore_file = lore_status.lore_path
                     console.print(f"  → CREATE {lore_root}/{lore_file}")
+                    console.print(
+                        "    [dim]Referenced in: "
+                        f"{', '.join(lore_status.tracked_files)}[/dim]"
+                    )
                     console.print(f"    [dim]Run: dm create_lore {lore_file}[/dim]")
                 console.print()
 
             if template_files:
                 console.print("[yellow]TEMPLATE FILES (NEED COMPLETION):[/yellow]")
-                for lore_file, tracked_files, validation in template_files:
-                    console.print(f"  → COMPLETE {lore_root}/{lore_file}")
+                for lore_status in template_files:
+                    console.print(f"  → COMPLETE {lore_root}/{lore_status.lore_path}")
                     console.print(
                         f"    [dim]Fill out placeholder sections with actual documentation[/dim]"
                     )
@@ -168,11 +606,10 @@ def run_validate():
 
             if invalid_files:
                 console.print("[red]INCOMPLETE FILES:[/red]")
-                for lore_file, tracked_files, validation in invalid_files:
-                    console.print(f"  → FIX {lore_root}/{lore_file}")
-                    console.print(
-                        f"    [dim]Add missing sections: {', '.join(validation['missing_sections'])}[/dim]"
-                    )
+                for lore_status in invalid_files:
+                    console.print(f"  → FIX {lore_root}/{lore_status.lore_path}")
+                    for problem in lore_status.problems:
+                        console.print(f"    [dim]{problem}[/dim]")
                 console.print()
 
             if needs_update:
@@ -192,6 +629,7 @@ def run_validate():
             return False
 
         else:
+            remember_validated_tree(config, validated_tree)
             console.print("✅ [bold green]VALIDATION PASSED[/bold green]")
             console.print("All documentation is properly maintained and up-to-date.")
             return True
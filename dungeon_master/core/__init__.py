@@ -8,4 +8,12 @@ including decorator parsing, template handling, validation logic, and git utilit
 # Core functionality will be imported as needed by individual modules
 # to avoid circular imports
 
-__all__ = ["decorator_parser", "template", "validation", "git_utils"]
+__all__ = [
+    "decorator_parser",
+    "template",
+    "validation",
+    "git_utils",
+    "cache",
+    "gitignore",
+    "daemon",
+]
@@ -0,0 +1,890 @@
+# track_lore("core/engine.md")
+"""
+Cache Persistence for Dungeon Master
+
+This module manages the dmcache.json state file. It provides tolerant loading
+and atomic saving of the cache document, plus the incremental scan and tree
+indexes that let repository scans skip re-parsing source files that have not
+changed (the latter across checkouts), the lore index that answers
+source <-> lore lookups without a scan and the lore result index that
+skips re-reading unchanged lore files. The blob cache, kept in the git
+directory, shares results by content across every worktree of a clone.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Default cache file name (mirrors the cacheFile configuration setting)
+DEFAULT_CACHE_FILE = "dmcache.json"
+
+# Bump when the shape of cached results or the rules producing them change
+# (lore outlines, diagram checks, lore results, validation outcomes); every
+# result stored under another version is ignored
+CACHE_SCHEMA_VERSION = 2
+
+# Bump when the layout of the scan index changes
+SCAN_INDEX_VERSION = 1
+
+# Bump when the layout of the lore index changes
+LORE_INDEX_VERSION = 1
+
+# Bump when the layout of the lore result index changes
+LORE_RESULT_INDEX_VERSION = 1
+
+# Bump when the layout of the blob index changes
+BLOB_INDEX_VERSION = 1
+
+# Number of blob index updates an unused blob's result is kept for, so
+# switching back to a recently scanned branch still finds it
+BLOB_INDEX_GENERATIONS = 8
+
+# Bump when the layout of the blob cache database changes
+BLOB_CACHE_VERSION = 1
+
+# Location of the blob cache database inside the git common directory
+BLOB_CACHE_FILE = "dungeon-master/blobcache.db"
+
+# Entries the blob cache keeps by default (blobCacheEntries setting)
+DEFAULT_BLOB_CACHE_ENTRIES = 100000
+
+# Seconds a blob cache update waits for another process holding the lock
+BLOB_CACHE_TIMEOUT = 5
+
+# A file's stat signature: (mtime_ns, size, inode)
+FileSignature = Tuple[int, int, int]
+
+# Cache documents kept in memory by long-running processes, keyed by path
+# (see enable_memory_cache())
+_memory_cache: Optional[Dict[str, Tuple[FileSignature, Dict[str, Any]]]] = None
+
+
+def get_cache_path(
+    config: Optional[Dict[str, Any]] = None, root: Optional[Path] = None
+) -> Optional[Path]:
+    """
+    Get the path to the cache file.
+
+    Args:
+        config: Optional configuration dictionary with a cacheFile setting
+        root: Directory the cache file is relative to (defaults to cwd)
+
+    Returns:
+        Path to the cache file, or None if caching is disabled in config
+    """
+    cache_file = DEFAULT_CACHE_FILE
+    if config is not None:
+        cache_file = config.get("cacheFile", DEFAULT_CACHE_FILE)
+        if not cache_file:
+            return None
+
+    cache_path = Path(cache_file)
+    if root is not None and not cache_path.is_absolute():
+        cache_path = Path(root) / cache_path
+    return cache_path
+
+
+def enable_memory_cache(enabled: bool = True) -> None:
+    """
+    Keep loaded cache documents in memory between loads.
+
+    Meant for long-running processes such as the dm daemon: a document is
+    only re-read when the file's stat signature changes (another process
+    saved it). Documents returned by load_cache() are then shared, so
+    callers must save what they modify, as every caller here does.
+
+    Args:
+        enabled: Whether to keep documents in memory
+    """
+    global _memory_cache
+    _memory_cache = {} if enabled else None
+
+
+def load_cache(cache_path: Path) -> Dict[str, Any]:
+    """
+    Load the cache document, returning an empty cache on any problem.
+
+    The cache only ever holds derived data, so a missing, unreadable or
+    corrupt file is treated as empty rather than as an error.
+
+    Args:
+        cache_path: Path to the cache file
+
+    Returns:
+        Dictionary containing the cache contents
+    """
+    memory_cache = _memory_cache
+    signature = None
+    if memory_cache is not None:
+        try:
+            signature = get_file_signature(os.stat(cache_path))
+        except OSError:
+            signature = None
+        entry = memory_cache.get(os.fspath(cache_path))
+        if signature is not None and entry is not None and entry[0] == signature:
+            return entry[1]
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, UnicodeDecodeError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict):
+        return {}
+    if memory_cache is not None and signature is not None:
+        memory_cache[os.fspath(cache_path)] = (signature, cache)
+    return cache
+
+
+def save_cache(cache: Dict[str, Any], cache_path: Path) -> bool:
+    """
+    Atomically write the cache document.
+
+    The content is written to a temporary file next to the cache and then
+    renamed over it, so concurrent readers never see a partial file.
+
+    Args:
+        cache: Cache contents to save
+        cache_path: Path to the cache file
+
+    Returns:
+        True if the cache was saved successfully, False otherwise
+    """
+    cache_path = Path(cache_path)
+    tmp_name = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=".dmcache.", suffix=".tmp", dir=str(cache_path.parent)
+        )
+        # mkstemp creates owner-only files; keep the existing cache's mode
+        try:
+            mode = os.stat(cache_path).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(tmp_name, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(tmp_name, cache_path)
+        if _memory_cache is not None:
+            _memory_cache[os.fspath(cache_path)] = (
+                get_file_signature(os.stat(cache_path)),
+                cache,
+            )
+        return True
+    except (OSError, TypeError, ValueError):
+        if _memory_cache is not None:
+            _memory_cache.pop(os.fspath(cache_path), None)
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+        return False
+
+
+def get_file_signature(stat_result: os.stat_result) -> FileSignature:
+    """
+    Build the stat signature used to detect file changes.
+
+    Args:
+        stat_result: Result of os.stat() / DirEntry.stat() for the file
+
+    Returns:
+        Tuple of (mtime_ns, size, inode)
+    """
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+def _entry_matches(entry: Any, length: int, signature: FileSignature) -> bool:
+    """
+    Check a recorded per-file entry is well-formed and has a signature.
+
+    Cache documents are plain JSON anyone can edit, so an entry of another
+    shape is treated like a changed file rather than trusted.
+
+    Args:
+        entry: Recorded entry, a list starting with the stat signature
+        length: Number of items the entry must have
+        signature: Current stat signature of the file
+
+    Returns:
+        True if the entry has the expected length and signature
+    """
+    return (
+        isinstance(entry, list)
+        and len(entry) == length
+        and entry[0] == signature[0]
+        and entry[1] == signature[1]
+        and entry[2] == signature[2]
+    )
+
+
+class ScanIndex:
+    """
+    Incremental index of decorator extraction results.
+
+    Records, per source file relative to the scanned root, the file's stat
+    signature and the lore paths extracted from it. Entries are only reused
+    when the signature is unchanged and the file was not modified during or
+    after the scan that recorded it (the same "racy timestamp" rule git
+    applies to its index).
+    """
+
+    def __init__(self, root: str, parser: str = "", scanned_at_ns: int = 0, files=None):
+        self.root = root
+        self.parser = parser
+        self.scanned_at_ns = scanned_at_ns
+        self.files: Dict[str, list] = files if files is not None else {}
+        self.seen: Set[str] = set()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_cache(
+        cls, cache: Dict[str, Any], root: str, parser: str = ""
+    ) -> "ScanIndex":
+        """
+        Restore the scan index from a loaded cache document.
+
+        An index recorded for a different root, parser configuration or
+        layout version is discarded and an empty index returned instead.
+
+        Args:
+            cache: Loaded cache document
+            root: Absolute path of the directory being scanned
+            parser: Fingerprint of the parser settings in effect
+
+        Returns:
+            ScanIndex instance
+        """
+        data = cache.get("scanIndex")
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != SCAN_INDEX_VERSION
+            or data.get("root") != root
+            or data.get("parser") != parser
+            or not isinstance(data.get("files"), dict)
+        ):
+            index = cls(root, parser)
+            index.dirty = True
+            return index
+
+        return cls(
+            root,
+            parser,
+            scanned_at_ns=int(data.get("scannedAt", 0)),
+            files=data["files"],
+        )
+
+    def to_cache(self, cache: Dict[str, Any], scanned_at_ns: int) -> None:
+        """
+        Store the scan index into a cache document.
+
+        Args:
+            cache: Cache document to update in place
+            scanned_at_ns: Time the scan started, used for racy detection
+        """
+        cache["scanIndex"] = {
+            "version": SCAN_INDEX_VERSION,
+            "root": self.root,
+            "parser": self.parser,
+            "scannedAt": scanned_at_ns,
+            "files": self.files,
+        }
+
+    def lookup(self, rel_path: str, signature: FileSignature) -> Optional[List[str]]:
+        """
+        Return cached lore paths for a file if its signature is unchanged.
+
+        Args:
+            rel_path: File path relative to the scanned root
+            signature: Current stat signature of the file
+
+        Returns:
+            Cached list of lore paths, or None if the file must be re-parsed
+        """
+        self.seen.add(rel_path)
+        entry = self.files.get(rel_path)
+        if (
+            not _entry_matches(entry, 4, signature)
+            or not isinstance(entry[3], list)
+            or signature[0] >= self.scanned_at_ns
+        ):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[3]
+
+    def store(
+        self, rel_path: str, signature: FileSignature, lore_paths: List[str]
+    ) -> None:
+        """
+        Record the extraction result for a file.
+
+        Args:
+            rel_path: File path relative to the scanned root
+            signature: Stat signature of the file that was parsed
+            lore_paths: Lore paths extracted from the file
+        """
+        self.seen.add(rel_path)
+        self.files[rel_path] = [signature[0], signature[1], signature[2], lore_paths]
+        self.dirty = True
+
+    def prune(self) -> int:
+        """
+        Drop entries for files that were not seen during the current scan.
+
+        Returns:
+            Number of entries removed
+        """
+        stale = [path for path in self.files if path not in self.seen]
+        for path in stale:
+            del self.files[path]
+        if stale:
+            self.dirty = True
+        return len(stale)
+
+
+class LoreResultIndex:
+    """
+    Lore file validation results keyed by the lore files' stat signatures.
+
+    Records, per lore file relative to the lore directory, its stat
+    signature, the blob id of its content and its validation results, so
+    an unchanged lore file is neither read nor checked again. The index is
+    bound to a fingerprint of the validation rules and discarded when they
+    change; signatures follow the same racy timestamp rule as ScanIndex.
+    """
+
+    def __init__(self, root: str, fingerprint: str, checked_at_ns: int = 0, files=None):
+        self.root = root
+        self.fingerprint = fingerprint
+        self.checked_at_ns = checked_at_ns
+        self.files: Dict[str, list] = files if files is not None else {}
+        self.dirty = False
+        self.hits = 0
+
+    @classmethod
+    def from_cache(
+        cls, cache: Dict[str, Any], root: str, fingerprint: str
+    ) -> "LoreResultIndex":
+        """
+        Restore the lore result index from a loaded cache document.
+
+        An index recorded for a different lore directory, rule fingerprint
+        or layout version is discarded and an empty index returned instead.
+
+        Args:
+            cache: Loaded cache document
+            root: Absolute path of the lore directory
+            fingerprint: Fingerprint of the validation rules in effect
+
+        Returns:
+            LoreResultIndex instance
+        """
+        data = cache.get("loreResults")
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != LORE_RESULT_INDEX_VERSION
+            or data.get("root") != root
+            or data.get("fingerprint") != fingerprint
+            or not isinstance(data.get("files"), dict)
+        ):
+            index = cls(root, fingerprint)
+            index.dirty = True
+            return index
+
+        return cls(
+            root,
+            fingerprint,
+            checked_at_ns=int(data.get("checkedAt", 0)),
+            files=data["files"],
+        )
+
+    def to_cache(self, cache: Dict[str, Any], checked_at_ns: int) -> None:
+        """
+        Store the lore result index into a cache document.
+
+        Args:
+            cache: Cache document to update in place
+            checked_at_ns: Time the validation started, used for racy detection
+        """
+        cache["loreResults"] = {
+            "version": LORE_RESULT_INDEX_VERSION,
+            "root": self.root,
+            "fingerprint": self.fingerprint,
+            "checkedAt": checked_at_ns,
+            "files": self.files,
+        }
+
+    def lookup(
+        self, lore_path: str, signature: FileSignature
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the recorded results for a lore file if it is unchanged.
+
+        Args:
+            lore_path: Lore file path relative to the lore directory
+            signature: Current stat signature of the lore file
+
+        Returns:
+            Recorded validation results, or None if the file must be checked
+        """
+        entry = self.files.get(lore_path)
+        if (
+            not _entry_matches(entry, 5, signature)
+            or not isinstance(entry[4], dict)
+            or signature[0] >= self.checked_at_ns
+        ):
+            return None
+
+        self.hits += 1
+        return entry[4]
+
+    def store(
+        self,
+        lore_path: str,
+        signature: FileSignature,
+        oid: str,
+        results: Dict[str, Any],
+    ) -> None:
+        """
+        Record the validation results of a lore file.
+
+        Args:
+            lore_path: Lore file path relative to the lore directory
+            signature: Stat signature of the lore file that was read
+            oid: Blob id of the content that was read
+            results: Validation results, without the file path
+        """
+        self.files[lore_path] = [signature[0], signature[1], signature[2], oid, results]
+        self.dirty = True
+
+    def discard(self, lore_path: str) -> None:
+        """Forget a lore file that no longer exists."""
+        if self.files.pop(lore_path, None) is not None:
+            self.dirty = True
+
+
+class BlobIndex:
+    """
+    Decorator extraction results keyed by the git blob id of each file.
+
+    A file whose working tree copy is exactly what the git index holds has
+    the content of the blob its index entry records, so the result recorded
+    for that blob id applies however the file's mtime changed. A checkout,
+    pull or rebase therefore only re-parses the files whose content it
+    changed, moved or renamed files are not parsed again, and switching back
+    to a branch scanned recently parses nothing.
+
+    Each blob remembers the generation (update count) it was last used in;
+    blobs unused for BLOB_INDEX_GENERATIONS updates are dropped.
+    """
+
+    def __init__(self, parser: str = "", generation: int = 0, blobs=None):
+        self.parser = parser
+        self.generation = generation
+        # blob id -> [generation last used, lore paths]
+        self.blobs: Dict[str, list] = blobs if blobs is not None else {}
+        self.dirty = False
+        self.hits = 0
+
+    @classmethod
+    def from_cache(cls, cache: Dict[str, Any], parser: str = "") -> "BlobIndex":
+        """
+        Restore the blob index from a loaded cache document.
+
+        An index recorded for a different parser configuration or layout
+        version is discarded and an empty index returned instead; malformed
+        blob entries are dropped.
+
+        Args:
+            cache: Loaded cache document
+            parser: Fingerprint of the parser settings in effect
+
+        Returns:
+            BlobIndex instance
+        """
+        data = cache.get("blobIndex")
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != BLOB_INDEX_VERSION
+            or data.get("parser") != parser
+            or not isinstance(data.get("blobs"), dict)
+        ):
+            return cls(parser)
+        blobs = {
+            oid: entry
+            for oid, entry in data["blobs"].items()
+            if isinstance(entry, list)
+            and len(entry) == 2
+            and isinstance(entry[0], int)
+            and isinstance(entry[1], list)
+        }
+        return cls(parser, int(data.get("generation", 0)), blobs)
+
+    def to_cache(self, cache: Dict[str, Any]) -> None:
+        """
+        Store the blob index into a cache document.
+
+        Blobs not used in the last BLOB_INDEX_GENERATIONS updates are
+        dropped first.
+
+        Args:
+            cache: Cache document to update in place
+        """
+        self.generation += 1
+        oldest = self.generation - BLOB_INDEX_GENERATIONS
+        self.blobs = {
+            oid: entry for oid, entry in self.blobs.items() if entry[0] >= oldest
+        }
+        cache["blobIndex"] = {
+            "version": BLOB_INDEX_VERSION,
+            "parser": self.parser,
+            "generation": self.generation,
+            "blobs": self.blobs,
+        }
+        # Written by versions that keyed results by directory tree id
+        cache.pop("treeIndex", None)
+        self.dirty = False
+
+    def lookup(self, oid: str) -> Optional[List[str]]:
+        """
+        Return the recorded lore paths of a blob.
+
+        Args:
+            oid: Blob id from the file's git index entry
+
+        Returns:
+            Recorded list of lore paths, or None if the file must be parsed
+        """
+        entry = self.blobs.get(oid)
+        if entry is None:
+            return None
+        entry[0] = self.generation
+        self.hits += 1
+        return entry[1]
+
+    def store(self, oid: str, lore_paths: List[str]) -> None:
+        """
+        Record the extraction result for a blob.
+
+        Args:
+            oid: Blob id from the file's git index entry
+            lore_paths: Lore paths extracted from the file
+        """
+        self.blobs[oid] = [self.generation, lore_paths]
+        self.dirty = True
+
+
+class LoreIndex:
+    """
+    Bidirectional index between lore files and the source files tracking them.
+
+    Built from the mapping produced by a repository scan and persisted next
+    to the scan index, so "which sources does this lore file track?" and
+    "which lore files does this source feed?" are dictionary lookups instead
+    of repository scans.
+
+    An index may carry a checkpoint: the git state (and validation outcome)
+    the mapping was known to match, recorded by dm validate so later runs
+    only need to re-scan files that changed since.
+    """
+
+    def __init__(
+        self,
+        lore_to_sources: Optional[Dict[str, List[str]]] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Build the index from a scan mapping.
+
+        Args:
+            lore_to_sources: Mapping of lore file paths to the source files
+                that reference them, as returned by the scanner
+            checkpoint: Optional git state the mapping matches
+        """
+        self.lore_to_sources: Dict[str, List[str]] = lore_to_sources or {}
+        self.checkpoint: Optional[Dict[str, Any]] = checkpoint
+        self.source_to_lore: Dict[str, List[str]] = {}
+        for lore_path, source_paths in self.lore_to_sources.items():
+            for source_path in source_paths:
+                if source_path not in self.source_to_lore:
+                    self.source_to_lore[source_path] = []
+                self.source_to_lore[source_path].append(lore_path)
+
+    def sources_for(self, lore_path: str) -> List[str]:
+        """
+        Get the source files that reference a lore file.
+
+        Args:
+            lore_path: Lore file path as written in track_lore decorators
+
+        Returns:
+            List of source paths relative to the scanned root
+        """
+        return list(self.lore_to_sources.get(lore_path, []))
+
+    def lore_for(self, source_path: str) -> List[str]:
+        """
+        Get the lore files referenced by a source file.
+
+        Args:
+            source_path: Source path relative to the scanned root, using "/"
+                separators
+
+        Returns:
+            List of lore file paths
+        """
+        return list(self.source_to_lore.get(source_path, []))
+
+    @classmethod
+    def from_cache(
+        cls, cache: Dict[str, Any], root: str, parser: str = ""
+    ) -> Optional["LoreIndex"]:
+        """
+        Restore a persisted lore index.
+
+        Args:
+            cache: Loaded cache document
+            root: Absolute path of the scanned directory
+            parser: Fingerprint of the parser settings in effect
+
+        Returns:
+            LoreIndex, or None if no index was recorded for this root and
+            parser configuration
+        """
+        data = cache.get("loreIndex")
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != LORE_INDEX_VERSION
+            or data.get("root") != root
+            or data.get("parser") != parser
+            or not isinstance(data.get("lore"), dict)
+        ):
+            return None
+        checkpoint = data.get("checkpoint")
+        return cls(data["lore"], checkpoint if isinstance(checkpoint, dict) else None)
+
+    def to_cache(self, cache: Dict[str, Any], root: str, parser: str = "") -> bool:
+        """
+        Store the lore index into a cache document.
+
+        An index without a checkpoint keeps the stored one when the mapping
+        is unchanged, since the checkpoint still describes it.
+
+        Args:
+            cache: Cache document to update in place
+            root: Absolute path of the scanned directory
+            parser: Fingerprint of the parser settings in effect
+
+        Returns:
+            True if the stored index changed
+        """
+        data = {
+            "version": LORE_INDEX_VERSION,
+            "root": root,
+            "parser": parser,
+            "lore": self.lore_to_sources,
+        }
+        checkpoint = self.checkpoint
+        previous = cache.get("loreIndex")
+        if checkpoint is None and isinstance(previous, dict):
+            if all(previous.get(key) == value for key, value in data.items()):
+                checkpoint = previous.get("checkpoint")
+        if checkpoint is not None:
+            data["checkpoint"] = checkpoint
+        if previous == data:
+            return False
+        cache["loreIndex"] = data
+        return True
+
+
+class BlobCache:
+    """
+    Results keyed by the git blob id of the content they were computed from.
+
+    The cache is an SQLite database in the git common directory, so every
+    worktree of a clone (and every branch) shares it: a file whose content
+    was seen anywhere before is not parsed again. Entries are namespaced by
+    kind ("decorators", "lore") and by a fingerprint of the settings that
+    shaped the result.
+
+    Reads go straight to the database; writes and recency updates are
+    collected and applied in one transaction by flush(), which then evicts
+    the least recently used entries beyond max_entries. The database runs
+    in WAL mode, so parallel hooks read while another process writes. Every
+    database error disables the cache for the rest of the run instead of
+    failing the caller, since it only ever holds derived data.
+    """
+
+    def __init__(
+        self, connection: sqlite3.Connection, max_entries: int, empty: bool = False
+    ):
+        self.max_entries = max_entries
+        # Whether the cache held nothing when opened
+        self.empty = empty
+        self.hits = 0
+        self._connection: Optional[sqlite3.Connection] = connection
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str, str], str] = {}
+        self._used: Set[Tuple[str, str, str]] = set()
+
+    @classmethod
+    def open(cls, git_dir: Path, max_entries: int) -> Optional["BlobCache"]:
+        """
+        Open (creating if needed) the blob cache of a repository.
+
+        Args:
+            git_dir: Git common directory of the repository
+            max_entries: Number of entries kept; 0 disables the cache
+
+        Returns:
+            BlobCache, or None if disabled or the database cannot be opened
+        """
+        if max_entries <= 0:
+            return None
+        path = Path(git_dir) / BLOB_CACHE_FILE
+        connection = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                str(path),
+                timeout=BLOB_CACHE_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != BLOB_CACHE_VERSION:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("DROP TABLE IF EXISTS blobs")
+                connection.execute(
+                    "CREATE TABLE blobs (kind TEXT NOT NULL,"
+                    " fingerprint TEXT NOT NULL, oid TEXT NOT NULL,"
+                    " value TEXT NOT NULL, used INTEGER NOT NULL,"
+                    " UNIQUE (kind, fingerprint, oid))"
+                )
+                connection.execute("CREATE INDEX blobs_used ON blobs (used)")
+                connection.execute(f"PRAGMA user_version={BLOB_CACHE_VERSION}")
+                connection.execute("COMMIT")
+            empty = connection.execute("SELECT 1 FROM blobs LIMIT 1").fetchone()
+        except (OSError, sqlite3.Error):
+            if connection is not None:
+                connection.close()
+            return None
+        return cls(connection, max_entries, empty is None)
+
+    def get(self, kind: str, fingerprint: str, oid: str) -> Optional[Any]:
+        """
+        Look up a result.
+
+        Args:
+            kind: Result namespace
+            fingerprint: Fingerprint of the settings the result depends on
+            oid: Blob id of the content
+
+        Returns:
+            The stored result, or None if there is none
+        """
+        key = (kind, fingerprint, oid)
+        with self._lock:
+            value = self._pending.get(key)
+            if value is None and self._connection is not None:
+                try:
+                    row = self._connection.execute(
+                        "SELECT value FROM blobs"
+                        " WHERE kind = ? AND fingerprint = ? AND oid = ?",
+                        key,
+                    ).fetchone()
+                except sqlite3.Error:
+                    self._disable()
+                    row = None
+                if row is not None:
+                    value = row[0]
+                    self._used.add(key)
+        if value is None:
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def put(self, kind: str, fingerprint: str, oid: str, value: Any) -> None:
+        """
+        Record a result; it is written by the next flush().
+
+        Args:
+            kind: Result namespace
+            fingerprint: Fingerprint of the settings the result depends on
+            oid: Blob id of the content
+            value: JSON-serialisable result
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._pending[(kind, fingerprint, oid)] = json.dumps(
+                    value, separators=(",", ":")
+                )
+
+    def flush(self) -> bool:
+        """
+        Write recorded results and recency updates, then evict old entries.
+
+        Returns:
+            True if the database was updated
+        """
+        with self._lock:
+            connection = self._connection
+            if connection is None or not (self._pending or self._used):
+                return False
+            now = time.time_ns()
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    "UPDATE blobs SET used = ?"
+                    " WHERE kind = ? AND fingerprint = ? AND oid = ?",
+                    [(now, *key) for key in self._used if key not in self._pending],
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                    [(*key, value, now) for key, value in self._pending.items()],
+                )
+                count = connection.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+                if count > self.max_entries:
+                    connection.execute(
+                        "DELETE FROM blobs WHERE rowid IN"
+                        " (SELECT rowid FROM blobs ORDER BY used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                self._disable()
+                return False
+            finally:
+                self._pending.clear()
+                self._used.clear()
+            return True
+
+    def close(self) -> None:
+        """Flush pending updates and close the database."""
+        self.flush()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _disable(self) -> None:
+        """Stop using a database that failed (locked for too long, corrupt)."""
+        try:
+            self._connection.close()
+        except sqlite3.Error:
+            pass
+        self._connection = None
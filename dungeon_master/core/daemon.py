@@ -0,0 +1,586 @@
+# track_lore("core/engine.md")
+"""
+Long-running Dungeon Master daemon.
+
+Every dm invocation pays for interpreter start-up, imports, configuration
+loading and reading the cache. The daemon keeps all of that warm for one
+repository: cache documents (scan index, lore index and the validation
+checkpoint) stay in memory, a background poller keeps the checkpoint
+current, and validate/review/impact requests are answered over a Unix
+domain socket by running the usual command functions in-process.
+
+Clients never depend on the daemon: run_in_daemon() returns None whenever no
+compatible daemon answers, and the caller then does the work itself. Sockets
+live in a directory only the user can access, and clients only talk to a
+socket that the user owns in such a directory, so no other local user can
+answer in the daemon's place.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import dungeon_master
+from dungeon_master.core.cache import CACHE_SCHEMA_VERSION
+from dungeon_master.core.git_utils import close_git_sessions
+
+# Bump when requests or responses change shape
+PROTOCOL_VERSION = 1
+
+# Seconds a client waits to connect before falling back to in-process work
+CONNECT_TIMEOUT = 0.5
+
+# Largest request the daemon reads
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# Git variables a hook runs with that change what git commands report (for
+# example the temporary index of "git commit -a"); clients forward them
+FORWARDED_ENVIRONMENT = (
+    "GIT_INDEX_FILE",
+    "GIT_DIR",
+    "GIT_WORK_TREE",
+    "GIT_COMMON_DIR",
+    "GIT_OBJECT_DIRECTORY",
+    "GIT_ALTERNATE_OBJECT_DIRECTORIES",
+)
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon cannot be started."""
+
+
+def is_daemon_supported() -> bool:
+    """
+    Check if the platform supports the daemon's Unix domain sockets.
+
+    Returns:
+        True if AF_UNIX sockets and file ownership checks are available
+    """
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+
+def get_runtime_directory(create: bool = False) -> Path:
+    """
+    Get the private directory holding the user's daemon sockets and logs.
+
+    $XDG_RUNTIME_DIR/dungeon-master is used when the session provides a
+    runtime directory, otherwise a dungeon-master-<uid> directory in the
+    system temporary directory.
+
+    Args:
+        create: Create the directory (mode 0700) if it does not exist
+
+    Returns:
+        Path of the directory
+
+    Raises:
+        DaemonError: With create, if the directory cannot be created or is
+            not private to the user (see is_private_path())
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isabs(runtime_dir):
+        path = Path(runtime_dir) / "dungeon-master"
+    else:
+        path = Path(tempfile.gettempdir()) / f"dungeon-master-{os.getuid()}"
+    if create:
+        try:
+            path.mkdir(mode=0o700)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            raise DaemonError(f"Cannot create {path}: {e}") from e
+        if not is_private_path(path, stat.S_ISDIR):
+            raise DaemonError(f"{path} is not a private directory owned by you")
+    return path
+
+
+def is_private_path(path: Path, is_kind: Callable[[int], bool]) -> bool:
+    """
+    Check that a path is owned by the user and closed to everyone else.
+
+    The path itself is examined (symbolic links are not followed).
+
+    Args:
+        path: Path to check
+        is_kind: stat.S_ISDIR, stat.S_ISSOCK, ... for the expected file type
+
+    Returns:
+        True if the path has that type, belongs to the current user and
+        grants no group or other permissions
+    """
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return (
+        is_kind(info.st_mode)
+        and info.st_uid == os.getuid()
+        and not info.st_mode & 0o077
+    )
+
+
+def is_trusted_socket(socket_path: Path) -> bool:
+    """
+    Check that a daemon socket can only have been created by the user.
+
+    Args:
+        socket_path: Path from get_socket_path()
+
+    Returns:
+        True if both the socket and its directory are private to the user
+    """
+    return is_private_path(socket_path.parent, stat.S_ISDIR) and is_private_path(
+        socket_path, stat.S_ISSOCK
+    )
+
+
+def get_socket_path(repo_path: Optional[Path] = None) -> Path:
+    """
+    Get the socket path of the daemon serving a repository.
+
+    The socket lives in the user's runtime directory (see
+    get_runtime_directory()) under a name derived from the repository's
+    absolute path, which keeps it short enough for AF_UNIX and out of the
+    work tree.
+
+    Args:
+        repo_path: Repository root (defaults to current directory)
+
+    Returns:
+        Path of the Unix domain socket
+    """
+    root = os.fspath(Path(repo_path or Path.cwd()).resolve())
+    digest = hashlib.sha256(root.encode("utf-8", "surrogateescape")).hexdigest()
+    return get_runtime_directory() / f"{digest[:16]}.sock"
+
+
+def get_code_identity() -> str:
+    """
+    Identify the installed Dungeon Master code.
+
+    A daemon only serves clients running the same code, so upgrading the
+    package never leaves stale answers behind.
+
+    Returns:
+        Cache schema version and install location of the dungeon_master
+        package
+    """
+    return f"{CACHE_SCHEMA_VERSION}:{os.path.dirname(dungeon_master.__file__)}"
+
+
+def send_request(
+    request: Dict[str, Any],
+    repo_path: Optional[Path] = None,
+    timeout: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Send one request to the repository's daemon.
+
+    Args:
+        request: JSON-serializable request
+        repo_path: Repository root (defaults to current directory)
+        timeout: Seconds to wait for the response (None waits indefinitely)
+
+    Returns:
+        Response dictionary, or None if no daemon answered or the socket is
+        not private to the user (see is_trusted_socket())
+    """
+    if not is_daemon_supported():
+        return None
+    socket_path = get_socket_path(repo_path)
+    if not is_trusted_socket(socket_path):
+        return None
+
+    request = dict(request, protocol=PROTOCOL_VERSION, code=get_code_identity())
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT)
+        client.connect(os.fspath(socket_path))
+        client.settimeout(timeout)
+        client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        data = _receive_all(client)
+    except OSError:
+        return None
+    finally:
+        client.close()
+
+    try:
+        response = json.loads(data.decode("utf-8"))
+    except ValueError:
+        return None
+    return response if isinstance(response, dict) else None
+
+
+def run_in_daemon(
+    command: str, options: Dict[str, Any], repo_path: Optional[Path] = None
+) -> Optional[bool]:
+    """
+    Run a dm command in the repository's daemon, if one is running.
+
+    The command's output is written to stdout as if it had run in-process.
+
+    Args:
+        command: Command name ("validate", "review" or "impact")
+        options: Keyword arguments for the command's run_* function
+        repo_path: Repository root (defaults to current directory)
+
+    Returns:
+        The command's result, or None if no compatible daemon ran it
+    """
+    stdout_is_terminal = sys.stdout.isatty()
+    response = send_request(
+        {
+            "command": command,
+            "options": options,
+            "environment": {
+                name: os.environ[name]
+                for name in FORWARDED_ENVIRONMENT
+                if name in os.environ
+            },
+            "terminal": {
+                "color": stdout_is_terminal and "NO_COLOR" not in os.environ,
+                "width": (
+                    shutil.get_terminal_size().columns if stdout_is_terminal else 80
+                ),
+            },
+        },
+        repo_path,
+    )
+    if response is None or response.get("status") != "ok":
+        return None
+
+    sys.stdout.write(response.get("output", ""))
+    sys.stdout.flush()
+    return bool(response.get("result"))
+
+
+def get_daemon_status(repo_path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """
+    Ask the repository's daemon for its status.
+
+    Args:
+        repo_path: Repository root (defaults to current directory)
+
+    Returns:
+        Status dictionary (pid, root, uptime, requests, lastRefresh), or None
+        if no compatible daemon is running
+    """
+    response = send_request({"command": "status"}, repo_path, timeout=5)
+    if response is None or response.get("status") != "ok":
+        return None
+    return response.get("info")
+
+
+def stop_daemon(repo_path: Optional[Path] = None) -> bool:
+    """
+    Ask the repository's daemon to shut down.
+
+    Args:
+        repo_path: Repository root (defaults to current directory)
+
+    Returns:
+        True if a daemon acknowledged the request
+    """
+    response = send_request({"command": "stop"}, repo_path, timeout=5)
+    return response is not None and response.get("status") == "ok"
+
+
+def get_command_handlers() -> Dict[str, Callable[..., bool]]:
+    """
+    Get the commands the daemon answers.
+
+    Returns:
+        Mapping of command names to their run_* functions
+    """
+    from dungeon_master.commands.impact import run_impact
+    from dungeon_master.commands.review import run_review
+    from dungeon_master.commands.validate import run_validate
+
+    return {"validate": run_validate, "review": run_review, "impact": run_impact}
+
+
+class DaemonServer:
+    """
+    Serve dm commands for one repository over a Unix domain socket.
+
+    Requests are handled one at a time, and never concurrently with the
+    background refresh, so the command functions run exactly as they would
+    in a fresh process - only with a warm interpreter and cache.
+    """
+
+    def __init__(
+        self,
+        repo_path: Optional[Path] = None,
+        poll_interval: float = 0,
+        handlers: Optional[Dict[str, Callable[..., bool]]] = None,
+    ):
+        """
+        Create a server; call serve_forever() to start answering.
+
+        Args:
+            repo_path: Repository root (defaults to current directory); the
+                process must run with it as working directory
+            poll_interval: Seconds between background refreshes (0 = off)
+            handlers: Command handlers (defaults to get_command_handlers())
+        """
+        self.repo_path = Path(repo_path or Path.cwd()).resolve()
+        self.socket_path = get_socket_path(self.repo_path)
+        self.poll_interval = poll_interval
+        self.handlers = handlers if handlers is not None else get_command_handlers()
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = 0
+        self.last_refresh: Optional[float] = None
+        self._stopping = threading.Event()
+        self._listener: Optional[socket.socket] = None
+
+    def bind(self) -> None:
+        """
+        Create the listening socket.
+
+        Raises:
+            DaemonError: If the platform lacks Unix sockets, the runtime
+                directory is not private, another daemon already serves the
+                repository or the socket path holds something else
+        """
+        if not is_daemon_supported():
+            raise DaemonError("Unix domain sockets are not available on this platform")
+        get_runtime_directory(create=True)
+        if send_request({"command": "ping"}, self.repo_path, timeout=5) is not None:
+            raise DaemonError(f"A daemon is already running for {self.repo_path}")
+
+        # Nothing answered, so an existing socket of ours is left over from a
+        # daemon that did not shut down cleanly
+        if os.path.lexists(self.socket_path):
+            if not is_private_path(self.socket_path, stat.S_ISSOCK):
+                raise DaemonError(
+                    f"{self.socket_path} is not a private socket owned by you"
+                )
+            os.unlink(self.socket_path)
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(os.fspath(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        listener.listen()
+        # Wake up regularly to notice stop requests from other threads
+        listener.settimeout(0.2)
+        self._listener = listener
+
+    def serve_forever(self) -> None:
+        """Answer requests until a stop request arrives or stop() is called."""
+        from dungeon_master.core.cache import enable_memory_cache
+
+        if self._listener is None:
+            self.bind()
+        enable_memory_cache()
+        socket_inode = os.stat(self.socket_path).st_ino
+
+        if self.poll_interval:
+            poller = threading.Thread(target=self._poll, daemon=True)
+            poller.start()
+
+        try:
+            while not self._stopping.is_set():
+                try:
+                    connection, _ = self._listener.accept()
+                except socket.timeout:
+                    continue
+                with connection:
+                    self._handle(connection)
+        finally:
+            self._stopping.set()
+            self._listener.close()
+            enable_memory_cache(False)
+            # Only remove the socket if a newer daemon has not replaced it
+            try:
+                if os.stat(self.socket_path).st_ino == socket_inode:
+                    os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        """Ask serve_forever() to return."""
+        self._stopping.set()
+
+    def info(self) -> Dict[str, Any]:
+        """Describe the running daemon for status requests."""
+        return {
+            "pid": os.getpid(),
+            "root": os.fspath(self.repo_path),
+            "uptime": time.time() - self.started_at,
+            "requests": self.requests,
+            "lastRefresh": self.last_refresh,
+        }
+
+    def refresh(self) -> None:
+        """
+        Bring the in-memory state up to date with the work tree.
+
+        Runs a silent scoped validation, which re-scans only files changed
+        since the last checkpoint and records a new one, so the next request
+        finds next to nothing left to do. The refresh runs while the user
+        works with git, so it never writes (and locks) the git index.
+        """
+        from dungeon_master.commands.validate import run_validate
+
+        with self.lock, _redirect_consoles(io.StringIO(), color=False, width=80):
+            try:
+                run_validate(scoped=True, write_index=False)
+            finally:
+                close_git_sessions()
+            self.last_refresh = time.time()
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer one request.
+
+        Args:
+            request: Decoded request
+
+        Returns:
+            Response dictionary; "status" is "ok", "mismatch" (client runs
+            different code) or "error"
+        """
+        if (
+            request.get("protocol") != PROTOCOL_VERSION
+            or request.get("code") != get_code_identity()
+        ):
+            return {"status": "mismatch"}
+
+        command = request.get("command")
+        if command == "ping":
+            return {"status": "ok"}
+        if command == "status":
+            return {"status": "ok", "info": self.info()}
+        if command == "stop":
+            self.stop()
+            return {"status": "ok"}
+
+        handler = self.handlers.get(command)
+        options = request.get("options") or {}
+        if handler is None or not isinstance(options, dict):
+            return {"status": "error", "error": f"Unsupported request: {command}"}
+
+        terminal = request.get("terminal") or {}
+        output = io.StringIO()
+        with self.lock, _forwarded_environment(request.get("environment") or {}):
+            with _redirect_consoles(
+                output,
+                color=bool(terminal.get("color")),
+                width=int(terminal.get("width") or 80),
+            ):
+                try:
+                    result = handler(**options)
+                except Exception as e:
+                    return {"status": "error", "error": str(e)}
+                finally:
+                    # Git coprocesses captured this request's environment
+                    # and repository state; the next request starts afresh
+                    close_git_sessions()
+            self.requests += 1
+        return {"status": "ok", "result": bool(result), "output": output.getvalue()}
+
+    def _handle(self, connection: socket.socket) -> None:
+        """Read a request from a connection and write the response."""
+        try:
+            connection.settimeout(5)
+            data = _receive_all(connection, MAX_REQUEST_BYTES)
+            connection.settimeout(None)
+            try:
+                request = json.loads(data.decode("utf-8"))
+            except ValueError:
+                request = None
+            response = {"status": "error", "error": "Malformed request"}
+            if isinstance(request, dict):
+                try:
+                    response = self.dispatch(request)
+                except (TypeError, ValueError):
+                    pass
+            connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+        except OSError:
+            # The client went away; it falls back to in-process work
+            pass
+
+    def _poll(self) -> None:
+        """Refresh the in-memory state every poll_interval seconds."""
+        while not self._stopping.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # A failed refresh only means the next request does more work
+                pass
+
+
+def _receive_all(connection: socket.socket, limit: Optional[int] = None) -> bytes:
+    """Read from a socket until the peer closes its side."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise OSError("Request too large")
+
+
+@contextmanager
+def _forwarded_environment(environment: Dict[str, str]) -> Iterator[None]:
+    """Run with the client's git environment in place of the daemon's."""
+    saved = {name: os.environ.get(name) for name in FORWARDED_ENVIRONMENT}
+    try:
+        for name in FORWARDED_ENVIRONMENT:
+            value = environment.get(name)
+            if isinstance(value, str):
+                os.environ[name] = value
+            else:
+                os.environ.pop(name, None)
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def _redirect_consoles(output: io.StringIO, color: bool, width: int) -> Iterator[None]:
+    """Point every dungeon_master module's rich console at output."""
+    from rich.console import Console
+
+    console = Console(
+        file=output,
+        force_terminal=color,
+        no_color=not color,
+        width=width,
+        soft_wrap=False,
+    )
+    saved = {}
+    for name, module in list(sys.modules.items()):
+        if name.startswith("dungeon_master.") and isinstance(
+            getattr(module, "console", None), Console
+        ):
+            saved[module] = module.console
+            module.console = console
+    try:
+        yield
+    finally:
+        for module, original in saved.items():
+            module.console = original
@@ -7,9 +7,40 @@ from Python and TypeScript files. It supports scanning individual files or
 entire repositories to build a mapping of documentation files to source files.
 """
 
+import fnmatch
+import mmap
+import os
 import re
-from pathlib import Path
-from typing import Dict, List, Optional
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dungeon_master.core.cache import (
+    DEFAULT_BLOB_CACHE_ENTRIES,
+    BlobCache,
+    BlobIndex,
+    FileSignature,
+    LoreIndex,
+    ScanIndex,
+    get_cache_path,
+    get_file_signature,
+    load_cache,
+    save_cache,
+)
+from dungeon_master.core.git_utils import (
+    GitBlobReader,
+    IndexEntry,
+    get_git_session,
+    get_staged_entries,
+    get_unstaged_files,
+    grep_repository,
+    list_repository_files,
+    read_git_index,
+)
+from dungeon_master.core.gitignore import GITIGNORE_FILE, GitignoreMatcher
 
 # Regex patterns for track_lore decorators
 # Python: Matches comments at start of line with the track_lore function call syntax
@@ -18,11 +49,47 @@ PY_PATTERN = r'^\s*#\s*track_lore\(\s*["\']([^"\']+)["\']\s*\)'
 # TypeScript/JavaScript: Matches comments at start of line with the track_lore function call syntax
 TS_PATTERN = r'^\s*//\s*track_lore\(\s*["\']([^"\']+)["\']\s*\)'
 
+PY_REGEX = re.compile(PY_PATTERN, re.MULTILINE)
+TS_REGEX = re.compile(TS_PATTERN, re.MULTILINE)
+
+# scanBackend settings that take the file universe from git
+GIT_BACKENDS = ("git", "git-grep")
+
+# Extended regular expression git grep uses to find decorator lines for the
+# "git-grep" scan backend; the language patterns above are applied afterwards
+GREP_DECORATOR_PATTERN = r"track_lore\("
+
+# Every decorator contains this marker; files without it are rejected on the
+# raw bytes, before any decoding or regex work
+DECORATOR_MARKER = b"track_lore"
+
+# Longest span searched for a decorator's closing parenthesis
+MAX_DECORATOR_SPAN = 4096
+
+# Files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 1024 * 1024
+
+# Leading bytes checked for NUL to recognise binary files (the same amount git
+# inspects)
+BINARY_SNIFF_BYTES = 8000
+
+# Header scan limits used when the configuration does not set them
+DEFAULT_HEADER_SCAN_BYTES = 8192
+DEFAULT_HEADER_SCAN_LINES = 100
+
 # Supported file extensions
 PYTHON_EXTENSIONS = {".py", ".pyx", ".pyi"}
 TYPESCRIPT_EXTENSIONS = {".ts", ".tsx", ".js", ".jsx"}
 ALL_SUPPORTED_EXTENSIONS = PYTHON_EXTENSIONS | TYPESCRIPT_EXTENSIONS
 
+# Identifies the extraction rules recorded in the scan index; change it whenever
+# the patterns above change so cached results are re-parsed
+PARSER_VERSION = "2"
+
+# Files queued ahead of the one being consumed, per extraction worker; bounds
+# memory while keeping every worker busy
+SCAN_WINDOW_PER_WORKER = 8
+
 # Default directories to skip during repository scanning (fallback if no config)
 DEFAULT_SKIP_DIRECTORIES = {
     ".git",
@@ -45,7 +112,48 @@ DEFAULT_SKIP_DIRECTORIES = {
     "tests",  # Test files
 }
 
-## TODO: Add in .gitignore file skips during repository scanning
+# Hidden directories that are still scanned
+ALLOWED_HIDDEN_DIRECTORIES = {".lore", ".lore.dev"}
+
+
+class BinaryFileError(ValueError):
+    """Raised when a source file looks binary and is not searched."""
+
+    pass
+
+
+class ScanStats:
+    """
+    Counters describing how a repository scan handled its candidate files.
+
+    Pass an instance to scan_repository_for_lore_decorators() to have it
+    filled in; commands print the summary when verboseOutput is enabled.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.parsed = 0
+        self.cached = 0
+        self.staged = 0
+        self.grepped = 0
+        self.skipped_pattern = 0
+        self.skipped_size = 0
+        self.skipped_binary = 0
+
+    def summary(self) -> str:
+        """Describe the counters in one line."""
+        sources = []
+        if self.staged:
+            sources.append(f"{self.staged} from staged blobs")
+        if self.grepped:
+            sources.append(f"{self.grepped} by git grep")
+        detail = f" ({', '.join(sources)})" if sources else ""
+        return (
+            f"{self.files} candidate files: {self.parsed} parsed{detail}, "
+            f"{self.cached} from cache; skipped {self.skipped_pattern} by "
+            f"excludedFilePatterns, {self.skipped_size} over maxFileSize, "
+            f"{self.skipped_binary} binary"
+        )
 
 
 def get_file_extension(file_path: Path) -> str:
@@ -74,55 +182,459 @@ def is_supported_file(file_path: Path) -> bool:
     return get_file_extension(file_path) in ALL_SUPPORTED_EXTENSIONS
 
 
-def should_skip_directory(
-    dir_path: Path, excluded_directories: Optional[List[str]] = None
-) -> bool:
+def get_excluded_directory_names(
+    excluded_directories: Optional[List[str]] = None,
+) -> Set[str]:
     """
-    Check if a directory should be skipped during repository scanning.
+    Build the lowercase set of directory names to skip while scanning.
 
     Args:
-        dir_path: Path object for the directory
         excluded_directories: Optional list of directory names to exclude (from config)
 
     Returns:
-        True if the directory should be skipped, False otherwise
+        Set of lowercase directory names
     """
-    dir_name = dir_path.name.lower()
-
     # Use provided exclusions or fall back to defaults
     if excluded_directories is None:
         excluded_directories = list(DEFAULT_SKIP_DIRECTORIES)
 
-    # Convert to lowercase for case-insensitive comparison
-    excluded_directories_lower = [d.lower() for d in excluded_directories]
+    return {d.lower() for d in excluded_directories}
+
+
+def is_skipped_directory_name(dir_name: str, excluded_names: Set[str]) -> bool:
+    """
+    Check a single directory name against the exclusion rules.
+
+    Args:
+        dir_name: Name of the directory (not a path)
+        excluded_names: Lowercase names from get_excluded_directory_names()
+
+    Returns:
+        True if the directory should be skipped, False otherwise
+    """
+    dir_name = dir_name.lower()
 
     # Skip known directories that shouldn't contain trackable code
-    if dir_name in excluded_directories_lower:
+    if dir_name in excluded_names:
         return True
 
     # Skip hidden directories (starting with .) except .lore and .lore.dev
-    if dir_name.startswith(".") and dir_name not in {".lore", ".lore.dev"}:
+    if dir_name.startswith(".") and dir_name not in ALLOWED_HIDDEN_DIRECTORIES:
         return True
 
     return False
 
 
-def extract_lore_paths(file_path: Path) -> List[str]:
+def should_skip_directory(
+    dir_path: Path, excluded_directories: Optional[List[str]] = None
+) -> bool:
+    """
+    Check if a directory should be skipped during repository scanning.
+
+    Args:
+        dir_path: Path object for the directory
+        excluded_directories: Optional list of directory names to exclude (from config)
+
+    Returns:
+        True if the directory should be skipped, False otherwise
+    """
+    return is_skipped_directory_name(
+        dir_path.name, get_excluded_directory_names(excluded_directories)
+    )
+
+
+def iter_repository_files(
+    repo_path: Path,
+    excluded_directories: Optional[List[str]] = None,
+    include_patterns: Optional[List[str]] = None,
+    ignore_matcher: Optional[GitignoreMatcher] = None,
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Lazily walk a directory tree and yield candidate source files.
+
+    The walk uses an explicit stack over os.scandir(), so arbitrarily deep
+    trees never hit the recursion limit, and reuses the type information of
+    each DirEntry instead of stat'ing every path. Entries are visited in
+    name order, depth first. Symlinked directories are not followed.
+
+    Args:
+        repo_path: Root directory to walk
+        excluded_directories: Optional list of directory names to exclude (from config)
+        include_patterns: List of glob patterns to include (overrides default
+            extensions)
+        ignore_matcher: Optional gitignore matcher; ignored files are skipped
+            and ignored directories pruned without being read
+
+    Yields:
+        Tuples of (relative_path, DirEntry) where relative_path uses "/"
+        separators and is relative to repo_path
+    """
+    excluded_names = get_excluded_directory_names(excluded_directories)
+    root_chain = ignore_matcher.chain_for("") if ignore_matcher else ()
+    stack = [("", iter(_list_directory(os.fspath(repo_path))), root_chain)]
+
+    while stack:
+        prefix, entries, chain = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        name = entry.name
+        relative_path = prefix + name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                # Skip excluded directories entirely - don't even descend into them
+                if is_skipped_directory_name(name, excluded_names):
+                    continue
+                if chain and GitignoreMatcher.match_chain(chain, relative_path, True):
+                    continue
+                children = _list_directory(entry.path)
+                child_chain = chain
+                if ignore_matcher is not None:
+                    child_chain = ignore_matcher.chain_for(
+                        relative_path + "/",
+                        any(child.name == GITIGNORE_FILE for child in children),
+                    )
+                stack.append((relative_path + "/", iter(children), child_chain))
+                continue
+            if not entry.is_file():
+                continue
+        except OSError:
+            continue
+
+        if include_patterns:
+            # If custom patterns, check against them
+            if not any(PurePosixPath(relative_path).match(p) for p in include_patterns):
+                continue
+        elif os.path.splitext(name)[1].lower() not in ALL_SUPPORTED_EXTENSIONS:
+            # Default: only supported extensions
+            continue
+
+        if chain and GitignoreMatcher.match_chain(chain, relative_path, False):
+            continue
+        yield relative_path, entry
+
+
+def iter_git_files(
+    repo_path: Path,
+    excluded_directories: Optional[List[str]] = None,
+    include_patterns: Optional[List[str]] = None,
+    universe: Optional[List[str]] = None,
+) -> Optional[Iterator[str]]:
+    """
+    Enumerate candidate source files from the git index and work tree.
+
+    The file universe comes from a single ``git ls-files`` call, so ignored
+    build output and vendored environments are never stat'd or opened.
+    Directory exclusions are applied on top, per unique directory. Paths are
+    yielded in the same order as iter_repository_files().
+
+    Args:
+        repo_path: Root directory to list
+        excluded_directories: Optional list of directory names to exclude (from config)
+        include_patterns: List of glob patterns to include (overrides default
+            extensions)
+        universe: Paths to filter instead of listing the work tree (for
+            example the files in the index)
+
+    Returns:
+        Iterator of relative paths using "/" separators, or None if repo_path
+        is not inside a git work tree
+    """
+    if universe is not None:
+        paths = list(universe)
+    else:
+        paths = list_repository_files(repo_path)
+        if paths is None:
+            return None
+
+    # Sorting by path components reproduces the walker's depth-first name order
+    paths.sort(key=lambda path: path.split("/"))
+    return _filter_git_paths(paths, excluded_directories, include_patterns)
+
+
+def _filter_git_paths(
+    paths: List[str],
+    excluded_directories: Optional[List[str]],
+    include_patterns: Optional[List[str]],
+) -> Iterator[str]:
+    """Apply directory exclusions and file type filters to git paths."""
+    excluded_names = get_excluded_directory_names(excluded_directories)
+    # Memoized exclusion status per directory ("" is the root)
+    excluded_dirs: Dict[str, bool] = {"": False}
+
+    for relative_path in paths:
+        directory, _, name = relative_path.rpartition("/")
+
+        if directory not in excluded_dirs:
+            # Resolve the nearest memoized ancestor, then fill in the chain
+            pending = []
+            current = directory
+            while current not in excluded_dirs:
+                pending.append(current)
+                current = current.rpartition("/")[0]
+            excluded = excluded_dirs[current]
+            for current in reversed(pending):
+                excluded = excluded or is_skipped_directory_name(
+                    current.rpartition("/")[2], excluded_names
+                )
+                excluded_dirs[current] = excluded
+
+        if excluded_dirs[directory]:
+            continue
+
+        if include_patterns:
+            if any(PurePosixPath(relative_path).match(p) for p in include_patterns):
+                yield relative_path
+        elif os.path.splitext(name)[1].lower() in ALL_SUPPORTED_EXTENSIONS:
+            yield relative_path
+
+
+def compile_file_patterns(patterns: Optional[List[str]]):
+    """
+    Compile fnmatch-style file name patterns into a single regular expression.
+
+    Args:
+        patterns: Glob patterns matched against file names (not paths)
+
+    Returns:
+        Compiled expression matching a normcase'd file name, or None if there
+        are no patterns
+    """
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns)
+    )
+
+
+def iter_candidate_files(
+    repo_path: Path,
+    config: Optional[Dict] = None,
+    include_patterns: Optional[List[str]] = None,
+    stats: Optional[ScanStats] = None,
+    universe: Optional[List[str]] = None,
+) -> Iterator[Tuple[str, str, Optional[os.DirEntry]]]:
+    """
+    Yield the source files a repository scan should parse.
+
+    Uses the backend selected by the scanBackend setting: "git" (default)
+    takes the file universe from git and falls back to the filesystem walker
+    outside a git work tree; "filesystem" always walks the directory tree.
+    "git-grep" lists files like "git" here; scans only call this for it when
+    git grep cannot run (see grep_lore_decorators()).
+    The filesystem walker honours .gitignore files itself unless
+    respectGitignore is disabled. excludedDirectories and
+    excludedFilePatterns apply to both backends.
+
+    Args:
+        repo_path: Root directory to scan
+        config: Optional configuration dictionary with scan settings
+        include_patterns: List of glob patterns to include (overrides default
+            extensions)
+        stats: Optional ScanStats to count candidates and pattern skips in
+        universe: Git paths to consider instead of the work tree files; this
+            selects the git backend regardless of scanBackend
+
+    Yields:
+        Tuples of (relative_path, full_path, DirEntry or None)
+    """
+    config = config or {}
+    excluded_directories = config.get("excludedDirectories")
+    excluded_file_regex = compile_file_patterns(config.get("excludedFilePatterns"))
+
+    candidates = None
+    if universe is not None or config.get("scanBackend", "git") in GIT_BACKENDS:
+        git_paths = iter_git_files(
+            repo_path, excluded_directories, include_patterns, universe
+        )
+        if git_paths is not None:
+            root = os.fspath(repo_path)
+            candidates = ((path, os.path.join(root, path), None) for path in git_paths)
+
+    if candidates is None:
+        ignore_matcher = None
+        if config.get("respectGitignore", True):
+            ignore_matcher = GitignoreMatcher(repo_path)
+        candidates = (
+            (path, entry.path, entry)
+            for path, entry in iter_repository_files(
+                repo_path, excluded_directories, include_patterns, ignore_matcher
+            )
+        )
+
+    for relative_path, full_path, entry in candidates:
+        if stats is not None:
+            stats.files += 1
+        if excluded_file_regex is not None:
+            name = os.path.normcase(relative_path.rpartition("/")[2])
+            if excluded_file_regex.match(name):
+                if stats is not None:
+                    stats.skipped_pattern += 1
+                continue
+        yield relative_path, full_path, entry
+
+
+def _list_directory(path: str) -> List[os.DirEntry]:
+    """Read a directory's entries sorted by name, or none if unreadable."""
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        # Skip directories we can't read
+        return []
+
+
+def find_decorator_segments(data) -> List[bytes]:
+    """
+    Find the raw lines of a file that may hold track_lore decorators.
+
+    Searches the undecoded content for DECORATOR_MARKER and returns each
+    occurrence's line, extended to the line holding the next closing
+    parenthesis, so only these segments ever need decoding.
+
+    Args:
+        data: File content as bytes or a read-only mmap
+
+    Returns:
+        List of byte segments, in file order
+    """
+    segments = []
+    position = data.find(DECORATOR_MARKER)
+    while position != -1:
+        start = data.rfind(b"\n", 0, position) + 1
+        close = data.find(b")", position, position + MAX_DECORATOR_SPAN)
+        end = data.find(b"\n", close if close != -1 else position)
+        if end == -1:
+            end = len(data)
+        segments.append(data[start:end])
+        position = data.find(DECORATOR_MARKER, end)
+    return segments
+
+
+def read_decorator_segments(
+    file_path: Path,
+    header_bytes: Optional[int] = None,
+    header_lines: Optional[int] = None,
+) -> List[bytes]:
+    """
+    Read a file's raw bytes and return its decorator segments.
+
+    Large files are memory-mapped so they are searched without being copied
+    into memory. With header_bytes set, only the start of the file is read.
+
+    Args:
+        file_path: Path to the source file
+        header_bytes: Read at most this many bytes (None reads the whole file)
+        header_lines: With header_bytes, also stop after this many lines
+            (None or 0 for no line limit)
+
+    Returns:
+        List of byte segments from find_decorator_segments()
+    """
+    with open(file_path, "rb") as f:
+        if header_bytes is not None:
+            return get_decorator_segments(
+                f.read(header_bytes), file_path, header_bytes, header_lines
+            )
+        mapped = None
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Not mappable (e.g. special files); fall back to reading
+                pass
+        if mapped is not None:
+            with mapped:
+                _check_not_binary(mapped, file_path)
+                return find_decorator_segments(mapped)
+        return get_decorator_segments(f.read(), file_path)
+
+
+def get_decorator_segments(
+    data: bytes,
+    file_path: Path,
+    header_bytes: Optional[int] = None,
+    header_lines: Optional[int] = None,
+) -> List[bytes]:
+    """
+    Return the decorator segments of file content that is already in memory.
+
+    Args:
+        data: The whole file content (or at least its first header_bytes)
+        file_path: Path the content belongs to (used in error messages)
+        header_bytes: Only search the first header_bytes bytes (None searches
+            all of data)
+        header_lines: With header_bytes, also stop after this many lines
+
+    Returns:
+        List of byte segments from find_decorator_segments()
+
+    Raises:
+        BinaryFileError: If the content looks binary
+    """
+    if header_bytes is not None:
+        data = data[:header_bytes]
+        _check_not_binary(data, file_path)
+        return find_decorator_segments(_trim_header(data, header_bytes, header_lines))
+    _check_not_binary(data, file_path)
+    return find_decorator_segments(data)
+
+
+def _check_not_binary(data, file_path: Path) -> None:
+    """Raise BinaryFileError if the first block of data contains a NUL byte."""
+    if data.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+        raise BinaryFileError(f"Binary file: {file_path}")
+
+
+def _trim_header(data: bytes, header_bytes: int, header_lines: Optional[int]) -> bytes:
+    """Cut a file header to whole lines within the header scan limits."""
+    if header_lines:
+        end = -1
+        for _ in range(header_lines):
+            end = data.find(b"\n", end + 1)
+            if end == -1:
+                break
+        else:
+            return data[: end + 1]
+
+    if len(data) >= header_bytes:
+        # The read stopped mid-file; drop the partial last line
+        data = data[: data.rfind(b"\n") + 1]
+    return data
+
+
+def extract_lore_paths(
+    file_path: Path,
+    header_bytes: Optional[int] = None,
+    header_lines: Optional[int] = None,
+    data: Optional[bytes] = None,
+) -> List[str]:
     """
     Extract all lore file paths from track_lore decorators in a file.
 
+    The file is searched as raw bytes first; only the lines containing
+    "track_lore" are decoded and matched against the language pattern.
+
     Args:
         file_path: Path to the source file to parse
+        header_bytes: Only search the first header_bytes bytes (header scan
+            mode); None searches the whole file
+        header_lines: With header_bytes, only search this many lines
+        data: Content to search instead of reading file_path (for example a
+            staged blob); file_path then only selects the language
 
     Returns:
         List of lore file paths found in the file
 
     Raises:
         ValueError: If the file type is not supported
+        BinaryFileError: If the file looks binary (NUL in its first block)
         FileNotFoundError: If the file doesn't exist
-        UnicodeDecodeError: If the file contains invalid UTF-8
+        UnicodeDecodeError: If a decorator line contains invalid UTF-8
     """
-    if not file_path.exists():
+    if data is None and not file_path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
 
     if not is_supported_file(file_path):
@@ -131,35 +643,43 @@ def extract_lore_paths(file_path: Path) -> List[str]:
     lore_paths = []
 
     try:
-        # Read file content with UTF-8 encoding
-        content = file_path.read_text(encoding="utf-8")
-
         # Select regex pattern based on file extension
         ext = get_file_extension(file_path)
         if ext in PYTHON_EXTENSIONS:
-            pattern = PY_PATTERN
+            regex = PY_REGEX
         elif ext in TYPESCRIPT_EXTENSIONS:
-            pattern = TS_PATTERN
+            regex = TS_REGEX
         else:
             # This shouldn't happen due to is_supported_file check, but just in case
             return []
 
-        # Find all matches
-        matches = re.findall(pattern, content, re.MULTILINE)
+        if data is not None:
+            segments = get_decorator_segments(
+                data, file_path, header_bytes, header_lines
+            )
+        else:
+            segments = read_decorator_segments(file_path, header_bytes, header_lines)
 
-        # Clean up and validate the paths
-        for match in matches:
-            # Strip whitespace and normalize path separators
-            lore_path = match.strip().replace("\\", "/")
+        # Find all matches, decoding only the candidate lines
+        for segment in segments:
+            for match in regex.findall(segment.decode("utf-8")):
+                # Strip whitespace and normalize path separators
+                lore_path = match.strip().replace("\\", "/")
 
-            # Skip empty paths
-            if lore_path:
-                lore_paths.append(lore_path)
+                # Skip empty paths
+                if lore_path:
+                    lore_paths.append(lore_path)
 
     except UnicodeDecodeError as e:
         raise UnicodeDecodeError(
-            f"File {file_path} contains invalid UTF-8 encoding: {e}"
+            e.encoding,
+            e.object,
+            e.start,
+            e.end,
+            f"File {file_path} contains invalid UTF-8 encoding: {e.reason}",
         )
+    except BinaryFileError:
+        raise
     except Exception as e:
         # Re-raise other exceptions with context
         raise Exception(f"Error processing {file_path}: {e}") from e
@@ -167,7 +687,11 @@ def extract_lore_paths(file_path: Path) -> List[str]:
     return lore_paths
 
 
-def extract_lore_paths_safe(file_path: Path) -> List[str]:
+def extract_lore_paths_safe(
+    file_path: Path,
+    header_bytes: Optional[int] = None,
+    header_lines: Optional[int] = None,
+) -> List[str]:
     """
     Safely extract lore paths from a file, returning empty list on any error.
 
@@ -176,32 +700,273 @@ def extract_lore_paths_safe(file_path: Path) -> List[str]:
 
     Args:
         file_path: Path to the source file to parse
+        header_bytes: Header scan byte limit (see extract_lore_paths())
+        header_lines: Header scan line limit (see extract_lore_paths())
 
     Returns:
         List of lore file paths found in the file, or empty list if any error occurs
     """
     try:
-        return extract_lore_paths(file_path)
+        return extract_lore_paths(file_path, header_bytes, header_lines)
     except Exception:
         # Silently ignore errors during repository scanning
         # Individual files with issues shouldn't stop the entire process
         return []
 
 
+def extract_lore_paths_for_scan(
+    file_path: Path,
+    header_bytes: Optional[int] = None,
+    header_lines: Optional[int] = None,
+    data: Optional[bytes] = None,
+) -> Optional[List[str]]:
+    """
+    Extract lore paths for a repository scan.
+
+    Like extract_lore_paths_safe(), but reports binary files separately so
+    the scan can count them.
+
+    Args:
+        file_path: Path to the source file to parse
+        header_bytes: Header scan byte limit (see extract_lore_paths())
+        header_lines: Header scan line limit (see extract_lore_paths())
+        data: Content to search instead of the file (see extract_lore_paths())
+
+    Returns:
+        List of lore file paths, an empty list on error, or None if the file
+        is binary
+    """
+    try:
+        return extract_lore_paths(file_path, header_bytes, header_lines, data)
+    except BinaryFileError:
+        return None
+    except Exception:
+        return []
+
+
+def grep_lore_decorators(
+    repo_path: Path, include_untracked: bool = True
+) -> Optional[Dict[str, Optional[List[str]]]]:
+    """
+    Find track_lore decorators with a single ``git grep`` run.
+
+    git reports every line containing "track_lore(" in tracked (and
+    optionally untracked) files; each line is then matched against the
+    language pattern exactly as extract_lore_paths() would match it. Files
+    whose result cannot be settled from the reported lines alone (a
+    decorator continued on a later line, or undecodable text) map to None
+    and have to be parsed normally. Files git does not report hold no
+    decorators.
+
+    Args:
+        repo_path: Directory to search
+        include_untracked: Also search untracked files that are not ignored
+
+    Returns:
+        Lore paths keyed by file path relative to repo_path (None for files
+        that need parsing), or None if git grep cannot run here
+    """
+    matches = grep_repository(GREP_DECORATOR_PATTERN, repo_path, include_untracked)
+    if matches is None:
+        return None
+
+    results: Dict[str, Optional[List[str]]] = {}
+    for relative_path, lines in matches.items():
+        ext = get_file_extension(PurePosixPath(relative_path))
+        if ext in PYTHON_EXTENSIONS:
+            regex = PY_REGEX
+        elif ext in TYPESCRIPT_EXTENSIONS:
+            regex = TS_REGEX
+        else:
+            # extract_lore_paths() rejects other file types
+            results[relative_path] = []
+            continue
+
+        lore_paths: Optional[List[str]] = []
+        for _, line in lines:
+            # find_decorator_segments() extends a decorator without a closing
+            # parenthesis on its own line into the following lines
+            if line.find(b")", line.find(DECORATOR_MARKER)) == -1:
+                lore_paths = None
+                break
+            try:
+                text = line.decode("utf-8")
+            except UnicodeDecodeError:
+                lore_paths = None
+                break
+            for match in regex.findall(text):
+                lore_path = match.strip().replace("\\", "/")
+                if lore_path:
+                    lore_paths.append(lore_path)
+        results[relative_path] = lore_paths
+    return results
+
+
+def get_header_scan_limits(
+    config: Optional[Dict] = None, scan_mode: Optional[str] = None
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Resolve the decorator scan mode into header read limits.
+
+    Args:
+        config: Optional configuration dictionary with decoratorScanMode,
+            headerScanBytes and headerScanLines settings
+        scan_mode: "full" or "header", overriding decoratorScanMode
+
+    Returns:
+        Tuple of (header_bytes, header_lines), or (None, None) in full mode
+    """
+    config = config or {}
+    if scan_mode is None:
+        scan_mode = config.get("decoratorScanMode", "full")
+    if scan_mode != "header":
+        return None, None
+    return (
+        config.get("headerScanBytes", DEFAULT_HEADER_SCAN_BYTES),
+        config.get("headerScanLines", DEFAULT_HEADER_SCAN_LINES),
+    )
+
+
+def get_parser_fingerprint(
+    header_bytes: Optional[int], header_lines: Optional[int]
+) -> str:
+    """
+    Identify the extraction rules in effect, for the scan index.
+
+    Results recorded in header mode can miss decorators further down a file,
+    so they are never reused by a full scan (or a header scan with different
+    limits).
+
+    Args:
+        header_bytes: Header byte limit from get_header_scan_limits()
+        header_lines: Header line limit from get_header_scan_limits()
+
+    Returns:
+        Fingerprint string
+    """
+    if header_bytes is None:
+        return PARSER_VERSION
+    return f"{PARSER_VERSION}/header:{header_bytes}:{header_lines or 0}"
+
+
+def resolve_scan_workers(workers: int, executor: str = "thread") -> int:
+    """
+    Turn a scanWorkers setting into a concrete worker count.
+
+    Args:
+        workers: Requested worker count; 0 selects a count automatically
+        executor: "thread" or "process"
+
+    Returns:
+        Number of workers to use (at least 1)
+    """
+    if workers > 0:
+        return workers
+
+    cpu_count = os.cpu_count() or 1
+    if executor == "process":
+        return cpu_count
+    # Threads mostly wait on I/O, so use more of them than there are CPUs
+    return min(32, cpu_count + 4)
+
+
+def _iter_extracted(
+    work: Iterable[Tuple[str, str, Optional[FileSignature], Optional[List[str]]]],
+    workers: int,
+    executor: str,
+    extract=None,
+) -> Iterator[Tuple[str, Optional[FileSignature], List[str], bool]]:
+    """
+    Extract lore paths for scan work items, yielding results in input order.
+
+    With more than one worker, files are parsed concurrently in a thread or
+    process pool. At most SCAN_WINDOW_PER_WORKER items per worker are in
+    flight, and results are released strictly in submission order, so the
+    output matches a serial scan exactly.
+
+    Args:
+        work: Tuples of (relative_path, full_path, signature, cached_lore_paths);
+            cached_lore_paths is None for files that must be parsed
+        workers: Number of workers (1 parses serially in the calling thread)
+        executor: "thread" or "process"
+        extract: Function extracting lore paths from a Path without raising
+            (defaults to extract_lore_paths_for_scan); it must be picklable
+            for the process executor
+
+    Yields:
+        Tuples of (relative_path, signature, lore_paths, parsed); lore_paths
+        is None for binary files
+    """
+    if extract is None:
+        extract = extract_lore_paths_for_scan
+
+    if workers <= 1:
+        for relative_path, full_path, signature, cached in work:
+            if cached is not None:
+                yield relative_path, signature, cached, False
+            else:
+                lore_paths = extract(Path(full_path))
+                yield relative_path, signature, lore_paths, True
+        return
+
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    window_size = workers * SCAN_WINDOW_PER_WORKER
+    window = deque()
+    with pool_class(max_workers=workers) as pool:
+        for relative_path, full_path, signature, cached in work:
+            if cached is None:
+                cached = pool.submit(extract, Path(full_path))
+            window.append((relative_path, signature, cached))
+            while len(window) > window_size:
+                yield _collect_extracted(*window.popleft())
+        while window:
+            yield _collect_extracted(*window.popleft())
+
+
+def _collect_extracted(relative_path, signature, result):
+    """Wait for a queued extraction result and unpack it."""
+    if not isinstance(result, Future):
+        return relative_path, signature, result, False
+    try:
+        lore_paths = result.result()
+    except Exception:
+        # A worker failure (e.g. a crashed process) only loses this file
+        lore_paths = []
+    return relative_path, signature, lore_paths, True
+
+
 def scan_repository_for_lore_decorators(
     repo_path: Optional[Path] = None,
     include_patterns: Optional[List[str]] = None,
     exclude_patterns: Optional[List[str]] = None,
     config: Optional[Dict] = None,
+    use_cache: Optional[bool] = None,
+    rebuild_cache: bool = False,
+    workers: Optional[int] = None,
+    scan_mode: Optional[str] = None,
+    stats: Optional[ScanStats] = None,
 ) -> Dict[str, List[str]]:
     """
     Scan a repository for track_lore decorators and build a mapping.
 
+    Collects the pairs produced by iter_lore_decorators(), which describes the
+    scan itself; use that generator directly to act on references as they are
+    found.
+
     Args:
         repo_path: Root path to scan (defaults to current directory)
-        include_patterns: List of glob patterns to include (overrides default extensions)
+        include_patterns: List of glob patterns to include (overrides default
+            extensions)
         exclude_patterns: List of glob patterns to exclude
         config: Optional configuration dictionary with exclusion settings
+        use_cache: Whether to use the persistent scan index (defaults to
+            True when a config is provided, False otherwise)
+        rebuild_cache: Ignore any existing scan index and re-parse every file
+        workers: Number of extraction workers, 0 for automatic (defaults to
+            the scanWorkers setting, or 1 without a config)
+        scan_mode: "full" or "header", overriding the decoratorScanMode
+            setting
+        stats: Optional ScanStats to record file counts and skips in
 
     Returns:
         Dictionary mapping lore file paths to lists of source files that reference them
@@ -212,6 +977,101 @@ def scan_repository_for_lore_decorators(
             "auth.md": ["src/auth/login.py"]
         }
     """
+    lore_mapping: Dict[str, List[str]] = {}
+    for source_path, lore_path in iter_lore_decorators(
+        repo_path,
+        include_patterns,
+        exclude_patterns,
+        config,
+        use_cache,
+        rebuild_cache,
+        workers,
+        scan_mode,
+        stats,
+    ):
+        if lore_path not in lore_mapping:
+            lore_mapping[lore_path] = []
+        lore_mapping[lore_path].append(source_path)
+
+    return lore_mapping
+
+
+def iter_lore_decorators(
+    repo_path: Optional[Path] = None,
+    include_patterns: Optional[List[str]] = None,
+    exclude_patterns: Optional[List[str]] = None,
+    config: Optional[Dict] = None,
+    use_cache: Optional[bool] = None,
+    rebuild_cache: bool = False,
+    workers: Optional[int] = None,
+    scan_mode: Optional[str] = None,
+    stats: Optional[ScanStats] = None,
+    staged: bool = False,
+    blob_reader: Optional[GitBlobReader] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Scan a repository for track_lore decorators, yielding them as found.
+
+    Candidate files come from git when the repository is a git work tree
+    (so ignored files are never visited) and from a filesystem walk otherwise;
+    see iter_candidate_files(). When a configuration is provided, extraction
+    results are persisted per source file in the cache file (cacheFile
+    setting) keyed by the file's stat signature, so later scans only re-parse
+    files that changed, together with the resulting LoreIndex (see
+    load_lore_index()). Results of files whose content is what the git index
+    holds are also kept by the blob id the index records (see BlobIndex),
+    so files rewritten by a checkout are only re-parsed if their content
+    changed, and by blob id in the blob cache shared by every
+    worktree of the clone (see open_blob_cache()). Files are parsed by a
+    pool of scanWorkers workers (scanExecutor selects threads or processes);
+    results are yielded in the same order as a serial scan. In "header" scan
+    mode (decoratorScanMode setting) only the start of each file is
+    searched. Files matching excludedFilePatterns, larger than maxFileSize or
+    that look binary (a NUL byte in the first block) are skipped.
+
+    With scanBackend set to "git-grep", one ``git grep`` run finds the
+    decorator lines of the whole work tree (untracked files included unless
+    grepUntracked is disabled) and only the files it reports are visited;
+    see grep_lore_decorators(). Files with decorators git grep cannot settle
+    on its own, and every reported file in header scan mode, are parsed as
+    usual.
+
+    Callers may stop iterating early. Results parsed so far are still saved
+    to the scan index; the lore index is only updated by complete scans.
+
+    With staged set, the scan reports what the git index holds instead of
+    the working tree: only files in the index are candidates, and files whose
+    working tree copy differs from the index are read from their staged
+    blobs through a single ``git cat-file --batch`` process. Unmodified files
+    still come from disk and the scan index. Staged scans leave the lore
+    index untouched.
+
+    Args:
+        repo_path: Root path to scan (defaults to current directory)
+        include_patterns: List of glob patterns to include (overrides default
+            extensions)
+        exclude_patterns: List of glob patterns to exclude
+        config: Optional configuration dictionary with exclusion settings
+        use_cache: Whether to use the persistent scan index (defaults to
+            True when a config is provided, False otherwise)
+        rebuild_cache: Ignore any existing scan index and re-parse every file
+        workers: Number of extraction workers, 0 for automatic (defaults to
+            the scanWorkers setting, or 1 without a config)
+        scan_mode: "full" or "header", overriding the decoratorScanMode
+            setting
+        stats: Optional ScanStats to record file counts and skips in
+        staged: Scan the staged content instead of the working tree
+        blob_reader: GitBlobReader to read staged blobs through (defaults to
+            the repository's shared GitSession reader)
+
+    Returns:
+        Iterator of (source_path, lore_path) pairs, in source file order
+
+    Raises:
+        FileNotFoundError: If repo_path does not exist (raised immediately,
+            not on first iteration)
+        ValueError: If staged is set outside a git work tree
+    """
     if repo_path is None:
         repo_path = Path.cwd()
     else:
@@ -220,90 +1080,642 @@ def scan_repository_for_lore_decorators(
     if not repo_path.exists():
         raise FileNotFoundError(f"Repository path not found: {repo_path}")
 
-    # Get exclusion settings from config if provided
-    excluded_directories = None
-    if config:
-        excluded_directories = config.get(
-            "excludedDirectories", list(DEFAULT_SKIP_DIRECTORIES)
+    staged_files = None
+    if staged:
+        entries = get_staged_entries(repo_path)
+        unstaged = get_unstaged_files(repo_path)
+        if entries is None or unstaged is None:
+            raise ValueError(f"Staged scans need a git work tree: {repo_path}")
+        staged_files = _StagedFiles(repo_path, entries, unstaged, blob_reader)
+
+    return _iter_lore_decorators(
+        repo_path,
+        include_patterns,
+        exclude_patterns,
+        config,
+        use_cache,
+        rebuild_cache,
+        workers,
+        scan_mode,
+        stats if stats is not None else ScanStats(),
+        staged_files,
+    )
+
+
+class _StagedFiles:
+    """The index entries and blob reader behind a staged scan."""
+
+    def __init__(
+        self,
+        repo_path: Path,
+        entries: Dict[str, str],
+        unstaged: List[str],
+        blob_reader: Optional[GitBlobReader],
+    ):
+        self.repo_path = repo_path
+        self.entries = entries
+        # Files whose staged content is not what the working tree holds
+        self.blobs = {path: entries[path] for path in unstaged if path in entries}
+        self.reader = blob_reader
+        self.results: Optional[_BlobResults] = None
+
+    def read(
+        self, relative_path: str, max_size: Optional[int]
+    ) -> Tuple[Optional[int], Optional[bytes]]:
+        """Read a file's staged blob (see GitBlobReader.read())."""
+        if self.reader is None:
+            self.reader = get_git_session(self.repo_path).blob_reader
+        return self.reader.read(self.blobs[relative_path], max_size)
+
+
+class _BlobResults:
+    """Extraction results kept in the blob cache as [size, lore paths]."""
+
+    KIND = "decorators"
+
+    def __init__(self, blob_cache: BlobCache, fingerprint: str, reuse: bool = True):
+        self.blob_cache = blob_cache
+        self.fingerprint = fingerprint
+        # A rebuild records fresh results without reading old ones
+        self.reuse = reuse
+
+    def lookup(self, oid: str) -> Optional[Tuple[int, List[str]]]:
+        """Return the (size, lore paths) recorded for a blob, if any."""
+        if not self.reuse:
+            return None
+        cached = self.blob_cache.get(self.KIND, self.fingerprint, oid)
+        if not isinstance(cached, list) or len(cached) != 2:
+            return None
+        return cached[0], cached[1]
+
+    def store(self, oid: str, size: int, lore_paths: List[str]) -> None:
+        """Record the result extracted from a blob."""
+        self.blob_cache.put(self.KIND, self.fingerprint, oid, [size, lore_paths])
+
+
+class _IndexedFiles:
+    """
+    The git index state behind blob index lookups during a scan.
+
+    A file is looked up by the blob id of its index entry, first in the blob
+    index and then in the blob cache, only when its stat data matches that
+    entry (and is not racily clean), i.e. when its content is the blob the
+    index records. The index is read on first use.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        blob_index: BlobIndex,
+        blob_results: Optional[_BlobResults] = None,
+    ):
+        self.repo_path = repo_path
+        self.blob_index = blob_index
+        self.blob_results = blob_results
+        # Empty indexes are filled from scan index hits as well, so they
+        # cover the whole repository after one scan
+        self.populate = not blob_index.blobs or (
+            blob_results is not None and blob_results.blob_cache.empty
         )
+        self.index = None
+        self.prefix = ""
+        self.entries: Optional[Dict[str, IndexEntry]] = None
+        # Files being parsed, with the blob id and size they were read with
+        self.pending: Dict[str, Tuple[str, int]] = {}
+
+    def lookup(
+        self,
+        relative_path: str,
+        stat_result: os.stat_result,
+        known: Optional[List[str]] = None,
+    ) -> Optional[List[str]]:
+        """
+        Resolve a file's lore paths through the blob index.
+
+        Args:
+            relative_path: File path relative to the scanned root
+            stat_result: Current stat data of the file
+            known: Result the scan index already had, if any
+
+        Returns:
+            Lore paths, or None if the file must be parsed
+        """
+        if known is not None and not self.populate:
+            return known
+        entry = self._get_entry(relative_path, stat_result)
+        if entry is None:
+            return known
+        lore_paths = self.blob_index.lookup(entry.oid)
+        if known is not None:
+            if lore_paths is None:
+                self.blob_index.store(entry.oid, known)
+            if self.blob_results is not None:
+                self.blob_results.store(entry.oid, stat_result.st_size, known)
+            return known
+
+        if lore_paths is None and self.blob_results is not None:
+            cached = self.blob_results.lookup(entry.oid)
+            if cached is not None:
+                lore_paths = cached[1]
+                self.blob_index.store(entry.oid, lore_paths)
+        if lore_paths is None:
+            self.pending[relative_path] = (entry.oid, stat_result.st_size)
+        return lore_paths
+
+    def store(self, relative_path: str, lore_paths: List[str]) -> None:
+        """Record a parsed file's result under its blob id, if clean."""
+        pending = self.pending.pop(relative_path, None)
+        if pending is None:
+            return
+        oid, size = pending
+        self.blob_index.store(oid, lore_paths)
+        if self.blob_results is not None:
+            self.blob_results.store(oid, size, lore_paths)
+
+    def _get_entry(
+        self, relative_path: str, stat_result: os.stat_result
+    ) -> Optional[IndexEntry]:
+        """Find the index entry of a file whose content is what it records."""
+        if self.entries is None:
+            self.index = read_git_index(self.repo_path)
+            self.entries = {}
+            if self.index is not None:
+                prefix = os.path.relpath(
+                    os.path.abspath(self.repo_path), self.index.root
+                )
+                self.prefix = "" if prefix == "." else Path(prefix).as_posix() + "/"
+                self.entries = {
+                    entry.path: entry
+                    for entry in self.index.entries
+                    if entry.stage == 0 and entry.is_regular_file
+                }
+
+        path = self.prefix + relative_path
+        entry = self.entries.get(path)
+        if (
+            entry is None
+            or entry.intent_to_add
+            or not entry.matches_stat(stat_result)
+            or self.index.is_racy(entry)
+        ):
+            return None
+        return entry
+
+
+def open_blob_cache(
+    repo_path: Optional[Path] = None, config: Optional[Dict] = None
+) -> Optional[BlobCache]:
+    """
+    Open the blob cache shared by every worktree of a repository's clone.
 
-    lore_mapping: Dict[str, List[str]] = {}
+    The cache lives in the git common directory and holds at most
+    blobCacheEntries entries (0 disables it).
 
-    # Use custom directory walker that respects exclusions from the start
-    # This avoids the performance issue of globbing through virtual environments
-    def walk_directory(current_path: Path) -> List[Path]:
-        """Walk directory tree, skipping excluded directories."""
-        files = []
+    Args:
+        repo_path: Directory inside the work tree (defaults to current directory)
+        config: Optional configuration dictionary
 
-        try:
-            for item in current_path.iterdir():
-                if item.is_dir():
-                    # Skip excluded directories entirely - don't even recurse into them
-                    if should_skip_directory(item, excluded_directories):
-                        continue
-                    # Recursively walk non-excluded directories
-                    files.extend(walk_directory(item))
-                elif item.is_file():
-                    # Only include supported file types (unless custom include_patterns)
-                    if include_patterns:
-                        # If custom patterns, check against them
-                        if any(item.match(pattern) for pattern in include_patterns):
-                            files.append(item)
-                    else:
-                        # Default: only supported extensions
-                        if is_supported_file(item):
-                            files.append(item)
-        except (PermissionError, OSError):
-            # Skip directories we can't read
-            pass
-
-        return files
-
-    # Get all files using our custom walker (no more glob performance issues!)
-    file_paths = walk_directory(repo_path)
-
-    for file_path in file_paths:
+    Returns:
+        BlobCache the caller must close(), or None when disabled, outside a
+        git work tree or if the database cannot be opened
+    """
+    max_entries = (config or {}).get("blobCacheEntries", DEFAULT_BLOB_CACHE_ENTRIES)
+    if not max_entries:
+        return None
+    common_dir = get_git_session(repo_path).common_dir
+    if common_dir is None:
+        return None
+    return BlobCache.open(common_dir, max_entries)
+
+
+def _iter_lore_decorators(
+    repo_path: Path,
+    include_patterns: Optional[List[str]],
+    exclude_patterns: Optional[List[str]],
+    config: Optional[Dict],
+    use_cache: Optional[bool],
+    rebuild_cache: bool,
+    workers: Optional[int],
+    scan_mode: Optional[str],
+    stats: ScanStats,
+    staged_files: Optional[_StagedFiles] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Generator behind iter_lore_decorators()."""
+    header_bytes, header_lines = get_header_scan_limits(config, scan_mode)
+    parser_fingerprint = get_parser_fingerprint(header_bytes, header_lines)
+
+    # Load the persistent scan index if caching is enabled
+    if use_cache is None:
+        use_cache = config is not None
+    cache_path = get_cache_path(config, repo_path) if use_cache else None
+    cache: Dict = {}
+    scan_index = None
+    indexed_files = None
+    blob_cache = None
+    scan_started_ns = time.time_ns()
+    if cache_path is not None:
+        root_key = str(repo_path.resolve())
+        cache = load_cache(cache_path)
+        if rebuild_cache:
+            # Start from empty indexes so every file is re-parsed
+            scan_index = ScanIndex(root_key, parser_fingerprint)
+            scan_index.dirty = True
+            blob_index = BlobIndex(parser_fingerprint)
+        else:
+            scan_index = ScanIndex.from_cache(cache, root_key, parser_fingerprint)
+            blob_index = BlobIndex.from_cache(cache, parser_fingerprint)
+        blob_cache = open_blob_cache(repo_path, config)
+        blob_results = None
+        if blob_cache is not None:
+            blob_results = _BlobResults(
+                blob_cache, parser_fingerprint, reuse=not rebuild_cache
+            )
+        if staged_files is None:
+            indexed_files = _IndexedFiles(repo_path, blob_index, blob_results)
+        else:
+            staged_files.results = blob_results
+
+    config = config or {}
+    executor = config.get("scanExecutor", "thread")
+    if workers is None:
+        workers = config.get("scanWorkers", 1)
+    workers = resolve_scan_workers(workers, executor)
+    extract = extract_lore_paths_for_scan
+    if header_bytes is not None:
+        extract = partial(
+            extract_lore_paths_for_scan,
+            header_bytes=header_bytes,
+            header_lines=header_lines,
+        )
+
+    grep_hits = None
+    if staged_files is None and config.get("scanBackend") == "git-grep":
+        grep_hits = grep_lore_decorators(repo_path, config.get("grepUntracked", True))
+
+    work = _iter_scan_work(
+        repo_path,
+        config,
+        include_patterns,
+        exclude_patterns,
+        scan_index,
+        stats,
+        staged_files,
+        (header_bytes, header_lines),
+        grep_hits,
+        indexed_files,
+    )
+    extracted = _iter_extracted(work, workers, executor, extract)
+
+    lore_mapping: Dict[str, List[str]] = {}
+    completed = False
+    try:
+        for relative_path, signature, lore_paths, parsed in extracted:
+            if parsed:
+                stats.parsed += 1
+                if lore_paths is None:
+                    # Binary files are remembered as having no decorators
+                    stats.skipped_binary += 1
+                    lore_paths = []
+                if signature is not None:
+                    scan_index.store(relative_path, signature, lore_paths)
+                if indexed_files is not None:
+                    indexed_files.store(relative_path, lore_paths)
+            elif signature is not None:
+                stats.cached += 1
+
+            for lore_path in lore_paths:
+                if lore_path not in lore_mapping:
+                    lore_mapping[lore_path] = []
+                lore_mapping[lore_path].append(relative_path)
+                yield relative_path, lore_path
+        completed = True
+    finally:
+        # Stop the worker pool before saving if the caller stopped early
+        extracted.close()
+
+        if scan_index is not None:
+            # A staged scan neither sees the whole working tree nor describes
+            # it, so it only contributes the files it read from disk
+            if completed and staged_files is None:
+                # Drop files that disappeared and record the full mapping; a
+                # git grep scan only visits files with decorators, so it
+                # cannot tell which files disappeared
+                if grep_hits is None:
+                    scan_index.prune()
+                if LoreIndex(lore_mapping).to_cache(
+                    cache, root_key, parser_fingerprint
+                ):
+                    scan_index.dirty = True
+            if indexed_files is not None and indexed_files.blob_index.dirty:
+                indexed_files.blob_index.to_cache(cache)
+                scan_index.dirty = True
+            if scan_index.dirty:
+                scan_index.to_cache(cache, scan_started_ns)
+                save_cache(cache, cache_path)
+        if blob_cache is not None:
+            blob_cache.close()
+
+
+def _iter_scan_work(
+    repo_path: Path,
+    config: Dict,
+    include_patterns: Optional[List[str]],
+    exclude_patterns: Optional[List[str]],
+    scan_index: Optional[ScanIndex],
+    stats: ScanStats,
+    staged_files: Optional[_StagedFiles] = None,
+    header_limits: Tuple[Optional[int], Optional[int]] = (None, None),
+    grep_hits: Optional[Dict[str, Optional[List[str]]]] = None,
+    indexed_files: Optional[_IndexedFiles] = None,
+) -> Iterator[Tuple[str, str, Optional[FileSignature], Optional[List[str]]]]:
+    """
+    Yield scan work items, resolving unchanged files from the scan index.
+
+    Files a staged scan has to read from the index are parsed here, in the
+    calling thread, since they all share one blob reader; they are yielded
+    with a result and no signature so they never reach the scan index.
+    Results settled by git grep are yielded the same way; with grep_hits
+    only the files git grep reported are candidates. Files the scan index
+    misses are looked up in the blob index next, and kept in the scan index
+    when found there.
+    """
+    max_file_size = config.get("maxFileSize")
+    universe = None
+    if staged_files is not None:
+        universe = list(staged_files.entries)
+    elif grep_hits is not None:
+        universe = list(grep_hits)
+
+    # Stream candidate files from the backend so parsing starts immediately
+    for relative_path, full_path, entry in iter_candidate_files(
+        repo_path, config, include_patterns, stats, universe
+    ):
         # Apply additional exclude patterns if specified
         if exclude_patterns:
-            if any(file_path.match(pattern) for pattern in exclude_patterns):
+            path_match = PurePosixPath(relative_path).match
+            if any(path_match(pattern) for pattern in exclude_patterns):
                 continue
 
-        # Extract lore paths from this file
-        lore_paths = extract_lore_paths_safe(file_path)
-
-        # Add to mapping
-        for lore_path in lore_paths:
-            if lore_path not in lore_mapping:
-                lore_mapping[lore_path] = []
+        if staged_files is not None and relative_path in staged_files.blobs:
+            oid = staged_files.blobs[relative_path]
+            results = staged_files.results
+            cached = results.lookup(oid) if results is not None else None
+            if cached is not None:
+                size, lore_paths = cached
+                if max_file_size and size > max_file_size:
+                    stats.skipped_size += 1
+                    continue
+                stats.cached += 1
+                yield relative_path, full_path, None, lore_paths
+                continue
 
-            # Store relative path from repo root for consistency
+            size, data = staged_files.read(relative_path, max_file_size)
+            if data is None:
+                if size is not None:
+                    stats.skipped_size += 1
+                continue
+            stats.parsed += 1
+            stats.staged += 1
+            lore_paths = extract_lore_paths_for_scan(
+                Path(full_path), *header_limits, data=data
+            )
+            if lore_paths is None:
+                stats.skipped_binary += 1
+                lore_paths = []
+            if results is not None:
+                results.store(oid, size, lore_paths)
+            yield relative_path, full_path, None, lore_paths
+            continue
+
+        grepped = None
+        if grep_hits is not None and header_limits[0] is None:
+            # Header mode limits depend on byte offsets git grep does not
+            # report, so there every reported file is parsed
+            grepped = grep_hits[relative_path]
+
+        # Reuse cached results for files whose stat signature is unchanged
+        lore_paths = None
+        signature = None
+        if scan_index is not None or max_file_size:
             try:
-                relative_path = file_path.relative_to(repo_path)
-                lore_mapping[lore_path].append(str(relative_path))
-            except ValueError:
-                # File is outside repo_path, use absolute path
-                lore_mapping[lore_path].append(str(file_path))
+                stat_result = entry.stat() if entry else os.stat(full_path)
+            except OSError:
+                continue
 
-    return lore_mapping
+            # Skip oversized files (minified bundles, generated code) unread
+            if max_file_size and stat_result.st_size > max_file_size:
+                stats.skipped_size += 1
+                continue
+
+            if scan_index is not None and grepped is None:
+                signature = get_file_signature(stat_result)
+                lore_paths = scan_index.lookup(relative_path, signature)
+                if indexed_files is not None:
+                    known = lore_paths
+                    lore_paths = indexed_files.lookup(relative_path, stat_result, known)
+                    if known is None and lore_paths is not None:
+                        scan_index.store(relative_path, signature, lore_paths)
+
+        if grepped is not None:
+            stats.parsed += 1
+            stats.grepped += 1
+            yield relative_path, full_path, None, grepped
+            continue
+
+        yield relative_path, full_path, signature, lore_paths
+
+
+def load_lore_index(
+    repo_path: Optional[Path] = None,
+    config: Optional[Dict] = None,
+    scan_mode: Optional[str] = None,
+) -> Optional[LoreIndex]:
+    """
+    Load the lore index persisted by the last cached scan, without scanning.
+
+    The index reflects the repository as of that scan; files edited since
+    may have gained or lost decorators.
+
+    Args:
+        repo_path: Scanned root (defaults to current directory)
+        config: Optional configuration dictionary (cacheFile and scan settings)
+        scan_mode: "full" or "header", overriding the decoratorScanMode setting
+
+    Returns:
+        LoreIndex, or None if caching is disabled or no matching index exists
+    """
+    repo_path = Path.cwd() if repo_path is None else Path(repo_path)
+    cache_path = get_cache_path(config, repo_path)
+    if cache_path is None:
+        return None
+
+    header_bytes, header_lines = get_header_scan_limits(config, scan_mode)
+    return LoreIndex.from_cache(
+        load_cache(cache_path),
+        str(repo_path.resolve()),
+        get_parser_fingerprint(header_bytes, header_lines),
+    )
+
+
+def build_lore_index(
+    repo_path: Optional[Path] = None, config: Optional[Dict] = None, **scan_options
+) -> LoreIndex:
+    """
+    Scan a repository and return its lore index.
+
+    With a configuration the scan is incremental and the index is persisted
+    for load_lore_index().
+
+    Args:
+        repo_path: Root path to scan (defaults to current directory)
+        config: Optional configuration dictionary
+        **scan_options: Extra arguments for scan_repository_for_lore_decorators()
+
+    Returns:
+        LoreIndex for the current state of the repository
+    """
+    return LoreIndex(
+        scan_repository_for_lore_decorators(repo_path, config=config, **scan_options)
+    )
+
+
+def save_lore_index(
+    index: LoreIndex,
+    repo_path: Optional[Path] = None,
+    config: Optional[Dict] = None,
+    scan_mode: Optional[str] = None,
+) -> bool:
+    """
+    Persist a lore index (and its checkpoint) for load_lore_index().
 
+    Args:
+        index: Lore index to store
+        repo_path: Scanned root (defaults to current directory)
+        config: Optional configuration dictionary (cacheFile and scan settings)
+        scan_mode: "full" or "header", overriding the decoratorScanMode setting
 
-def find_files_for_lore(lore_file: str, repo_path: Optional[Path] = None) -> List[str]:
+    Returns:
+        True if the index was saved, False if caching is disabled or the
+        cache could not be written
+    """
+    repo_path = Path.cwd() if repo_path is None else Path(repo_path)
+    cache_path = get_cache_path(config, repo_path)
+    if cache_path is None:
+        return False
+
+    header_bytes, header_lines = get_header_scan_limits(config, scan_mode)
+    cache = load_cache(cache_path)
+    if not index.to_cache(
+        cache,
+        str(repo_path.resolve()),
+        get_parser_fingerprint(header_bytes, header_lines),
+    ):
+        return True
+    return save_cache(cache, cache_path)
+
+
+def refresh_lore_index(
+    index: LoreIndex,
+    paths: Iterable[str],
+    repo_path: Optional[Path] = None,
+    config: Optional[Dict] = None,
+    scan_mode: Optional[str] = None,
+) -> Optional[LoreIndex]:
+    """
+    Re-extract decorators from some source files and update a lore index.
+
+    Each path is re-read if a git-backed scan would visit it now (same
+    directory, pattern and size exclusions) and dropped from the index
+    otherwise, so when paths covers every file that changed since the index
+    was built the result equals a full scan, in the same order.
+
+    Args:
+        index: Lore index built by a git-backed scan
+        paths: Source paths relative to repo_path, using "/" separators
+        repo_path: Repository root (defaults to current directory)
+        config: Optional configuration dictionary with scan settings
+        scan_mode: "full" or "header", overriding the decoratorScanMode setting
+
+    Returns:
+        Updated LoreIndex (without a checkpoint), or None if repo_path is
+        not inside a git work tree
+    """
+    repo_path = Path.cwd() if repo_path is None else Path(repo_path)
+    config = config or {}
+    paths = set(paths)
+
+    universe = list_repository_files(repo_path, sorted(paths))
+    if universe is None:
+        return None
+
+    header_bytes, header_lines = get_header_scan_limits(config, scan_mode)
+    excluded_file_regex = compile_file_patterns(config.get("excludedFilePatterns"))
+    max_file_size = config.get("maxFileSize")
+    root = os.fspath(repo_path)
+
+    source_to_lore = {
+        source_path: lore_paths
+        for source_path, lore_paths in index.source_to_lore.items()
+        if source_path not in paths
+    }
+    for relative_path in _filter_git_paths(
+        universe, config.get("excludedDirectories"), None
+    ):
+        if excluded_file_regex is not None:
+            name = os.path.normcase(relative_path.rpartition("/")[2])
+            if excluded_file_regex.match(name):
+                continue
+        full_path = os.path.join(root, relative_path)
+        try:
+            size = os.stat(full_path).st_size
+        except OSError:
+            continue
+        if max_file_size and size > max_file_size:
+            continue
+        lore_paths = extract_lore_paths_for_scan(
+            Path(full_path), header_bytes, header_lines
+        )
+        if lore_paths:
+            source_to_lore[relative_path] = lore_paths
+
+    # Rebuild in scan order: sources sorted like iter_git_files(), lore files
+    # in order of first reference
+    lore_to_sources: Dict[str, List[str]] = {}
+    for source_path in sorted(source_to_lore, key=lambda path: path.split("/")):
+        for lore_path in source_to_lore[source_path]:
+            if lore_path not in lore_to_sources:
+                lore_to_sources[lore_path] = []
+            lore_to_sources[lore_path].append(source_path)
+    return LoreIndex(lore_to_sources)
+
+
+def find_files_for_lore(
+    lore_file: str,
+    repo_path: Optional[Path] = None,
+    index: Optional[LoreIndex] = None,
+) -> List[str]:
     """
     Find all source files that reference a specific lore file.
 
     Args:
         lore_file: The lore file path to search for
         repo_path: Root path to scan (defaults to current directory)
+        index: Optional LoreIndex to answer from instead of scanning
 
     Returns:
         List of source file paths that reference the lore file
     """
+    if index is not None:
+        return index.sources_for(lore_file)
+
     mapping = scan_repository_for_lore_decorators(repo_path)
     return mapping.get(lore_file, [])
 
 
 def get_lore_files_for_source(
-    source_file: Path, repo_path: Optional[Path] = None
+    source_file: Path,
+    repo_path: Optional[Path] = None,
+    index: Optional[LoreIndex] = None,
 ) -> List[str]:
     """
     Get all lore files referenced by a specific source file.
@@ -311,11 +1723,37 @@ def get_lore_files_for_source(
     Args:
         source_file: Path to the source file
         repo_path: Root path (used for relative path calculation)
+        index: Optional LoreIndex to answer from instead of parsing the file
 
     Returns:
         List of lore file paths referenced by the source file
     """
+    if index is not None:
+        return index.lore_for(get_relative_source_path(source_file, repo_path))
+
     if not source_file.exists():
         raise FileNotFoundError(f"Source file not found: {source_file}")
 
     return extract_lore_paths(source_file)
+
+
+def get_relative_source_path(
+    source_file: Path, repo_path: Optional[Path] = None
+) -> str:
+    """
+    Express a source path the way the scanner records it.
+
+    Args:
+        source_file: Absolute path, or path relative to the current directory
+        repo_path: Scanned root (defaults to current directory)
+
+    Returns:
+        Path relative to repo_path with "/" separators (unchanged apart from
+        separators if it lies outside repo_path)
+    """
+    root = Path.cwd() if repo_path is None else Path(repo_path)
+    source_path = Path(os.path.abspath(source_file))
+    try:
+        return source_path.relative_to(os.path.abspath(root)).as_posix()
+    except ValueError:
+        return Path(source_file).as_posix()
@@ -0,0 +1,255 @@
+# track_lore("core/engine.md")
+"""
+Mermaid Diagram Checker
+
+This module checks the structure of the Mermaid diagrams in lore files
+without running Mermaid itself. It understands the flowchart, sequence,
+class and state diagrams the lore template suggests: each diagram is parsed
+line by line into the nodes and edges it declares, so empty diagrams and
+diagrams that are still the template's example skeleton can be rejected.
+Other diagram types are accepted as they are.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, FrozenSet, List, Optional, Set, Tuple
+
+# Diagram kinds by the keyword of their header line
+DIAGRAM_KINDS = {
+    "flowchart": "flowchart",
+    "graph": "flowchart",
+    "sequenceDiagram": "sequence",
+    "classDiagram": "class",
+    "classDiagram-v2": "class",
+    "stateDiagram": "state",
+    "stateDiagram-v2": "state",
+}
+
+# Flowchart statements that declare neither nodes nor edges
+_FLOWCHART_KEYWORDS = {
+    "subgraph",
+    "end",
+    "direction",
+    "classDef",
+    "class",
+    "style",
+    "linkStyle",
+    "click",
+}
+
+# Flowchart node: id, optional shape with its text and optional :::class
+_FLOW_NODE_REGEX = re.compile(
+    r"\s*(\w+)(?:\[+[^\]]*\]+|\(+[^)]*\)+|\{+[^}]*\}+|>[^\]]*\])?(?::::\w+)?\s*"
+)
+
+# Flowchart link, with an optional "-- text -->" or "-->|text|" label
+_FLOW_LINK_REGEX = re.compile(
+    r"(?:(?:--|==|-\.)\s+[^|]*?\s+)?"
+    r"(?:[<xo]?(?:-{2,}|={2,}|-\.+-)[>xo]?|~~~)"
+    r"(?:\|[^|]*\|)?"
+)
+
+_SEQUENCE_PARTICIPANT_REGEX = re.compile(r"(?:participant|actor)\s+(.+?)(?:\s+as\s|$)")
+_SEQUENCE_MESSAGE_REGEX = re.compile(
+    r"([^-<>+:]+?)\s*(?:-->>|->>|-->|->|--x|-x|--\)|-\))\s*[+-]?\s*([^:]+?)\s*:"
+)
+
+_CLASS_DECLARATION_REGEX = re.compile(r"class\s+(\w+)")
+_CLASS_RELATION_REGEX = re.compile(
+    r"(\w+)\s*(?:\"[^\"]*\"\s*)?"
+    r"(?:<\|--|\*--|o--|<--|--\|>|--\*|--o|-->|--|<\|\.\.|<\.\.|\.\.\|>|\.\.>|\.\.)"
+    r"\s*(?:\"[^\"]*\"\s*)?(\w+)"
+)
+_CLASS_MEMBER_REGEX = re.compile(r"(\w+)\s*:")
+
+_STATE_TRANSITION_REGEX = re.compile(r"(\[\*\]|[\w.]+)\s*-->\s*(\[\*\]|[\w.]+)")
+_STATE_DECLARATION_REGEX = re.compile(r"state\s+(?:\"[^\"]*\"\s+as\s+)?([\w.]+)")
+_STATE_DESCRIPTION_REGEX = re.compile(r"([\w.]+)\s*:")
+
+
+class DiagramCheck:
+    """
+    Structure of one Mermaid diagram and the problem found with it, if any.
+
+    kind is "flowchart", "sequence", "class", "state" or "other" (a diagram
+    type that is not checked); problem is None for an acceptable diagram.
+    """
+
+    __slots__ = ("kind", "nodes", "edges", "problem")
+
+    def __init__(self, kind: str, nodes: int, edges: int, problem: Optional[str]):
+        self.kind = kind
+        self.nodes = nodes
+        self.edges = edges
+        self.problem = problem
+
+    def to_json(self) -> List[Any]:
+        """Convert the check into a JSON-serialisable list."""
+        return [self.kind, self.nodes, self.edges, self.problem]
+
+    @classmethod
+    def from_json(cls, data: List[Any]) -> "DiagramCheck":
+        """Restore a check saved with to_json()."""
+        return cls(*data)
+
+    def __repr__(self) -> str:
+        return (
+            f"DiagramCheck({self.kind!r}, nodes={self.nodes}, edges={self.edges}, "
+            f"problem={self.problem!r})"
+        )
+
+
+def check_diagram(source: str) -> DiagramCheck:
+    """
+    Check the structure of a Mermaid diagram.
+
+    Flowchart, sequence and state diagrams need at least one edge, class
+    diagrams at least one class. Diagrams made only of statements of the
+    template's example diagrams are reported as the template skeleton.
+
+    Args:
+        source: Content of a mermaid code block (without the fences)
+
+    Returns:
+        DiagramCheck of the diagram
+    """
+    statements = _statements(source)
+    if not statements:
+        return DiagramCheck("other", 0, 0, "empty diagram")
+
+    header = statements[0].split()[0]
+    kind = DIAGRAM_KINDS.get(header)
+    if kind is None:
+        return DiagramCheck("other", 0, 0, None)
+
+    nodes: Set[str] = set()
+    edges = 0
+    parse = _PARSERS[kind]
+    depth = 0
+    for statement in statements[1:]:
+        # Class bodies ("class A {" ... "}") only list members
+        if depth:
+            depth -= statement.count("}")
+            continue
+        if kind == "class" and statement.endswith("{"):
+            depth = 1
+        edges += parse(statement, nodes)
+
+    if kind == "class":
+        problem = None if nodes else "no classes"
+    else:
+        problem = None if edges else "no edges"
+    if problem is None and _is_skeleton(kind, statements):
+        problem = "template skeleton"
+    return DiagramCheck(kind, len(nodes), edges, problem)
+
+
+def _statements(source: str) -> List[str]:
+    """Split a diagram into statements, without comments or blank lines."""
+    statements = []
+    for line in source.splitlines():
+        line = line.strip()
+        if not line or line.startswith("%%"):
+            continue
+        statements.extend(" ".join(part.split()) for part in line.split(";") if part)
+    return [statement for statement in statements if statement]
+
+
+def _parse_flowchart(statement: str, nodes: Set[str]) -> int:
+    """Record the nodes of a flowchart statement; returns its edge count."""
+    if statement.split()[0] in _FLOWCHART_KEYWORDS:
+        return 0
+    groups: List[List[str]] = []
+    position = 0
+    while True:
+        group = []
+        while True:
+            match = _FLOW_NODE_REGEX.match(statement, position)
+            if match is None:
+                return 0
+            group.append(match.group(1))
+            position = match.end()
+            if not statement.startswith("&", position):
+                break
+            position += 1
+        groups.append(group)
+        if position == len(statement):
+            break
+        match = _FLOW_LINK_REGEX.match(statement, position)
+        if match is None:
+            return 0
+        position = match.end()
+
+    for group in groups:
+        nodes.update(group)
+    return sum(len(a) * len(b) for a, b in zip(groups, groups[1:]))
+
+
+def _parse_sequence(statement: str, nodes: Set[str]) -> int:
+    """Record the participants of a sequence statement; returns its edges."""
+    match = _SEQUENCE_MESSAGE_REGEX.match(statement)
+    if match is not None:
+        nodes.update(match.groups())
+        return 1
+    match = _SEQUENCE_PARTICIPANT_REGEX.match(statement)
+    if match is not None:
+        nodes.add(match.group(1))
+    return 0
+
+
+def _parse_class(statement: str, nodes: Set[str]) -> int:
+    """Record the classes of a class diagram statement; returns its edges."""
+    match = _CLASS_RELATION_REGEX.match(statement)
+    if match is not None:
+        nodes.update(match.groups())
+        return 1
+    match = _CLASS_DECLARATION_REGEX.match(statement) or _CLASS_MEMBER_REGEX.match(
+        statement
+    )
+    if match is not None:
+        nodes.add(match.group(1))
+    return 0
+
+
+def _parse_state(statement: str, nodes: Set[str]) -> int:
+    """Record the states of a state diagram statement; returns its edges."""
+    match = _STATE_TRANSITION_REGEX.match(statement)
+    if match is not None:
+        nodes.update(match.groups())
+        return 1
+    match = _STATE_DECLARATION_REGEX.match(statement) or (
+        _STATE_DESCRIPTION_REGEX.match(statement)
+    )
+    if match is not None:
+        nodes.add(match.group(1))
+    return 0
+
+
+_PARSERS = {
+    "flowchart": _parse_flowchart,
+    "sequence": _parse_sequence,
+    "class": _parse_class,
+    "state": _parse_state,
+}
+
+
+def _is_skeleton(kind: str, statements: List[str]) -> bool:
+    """Check whether a diagram only repeats a template example diagram."""
+    body = frozenset(statements[1:])
+    return any(
+        kind == skeleton_kind and body <= skeleton_body
+        for skeleton_kind, skeleton_body in _template_skeletons()
+    )
+
+
+@lru_cache(maxsize=None)
+def _template_skeletons() -> Tuple[Tuple[str, FrozenSet[str]], ...]:
+    """Kind and statements of each example diagram of the default template."""
+    from dungeon_master.core.template import DEFAULT_TEMPLATE
+
+    skeletons = []
+    for block in re.findall(r"```mermaid\n(.*?)```", DEFAULT_TEMPLATE, re.DOTALL):
+        statements = _statements(block)
+        kind = DIAGRAM_KINDS[statements[0].split()[0]]
+        skeletons.append((kind, frozenset(statements[1:])))
+    return tuple(skeletons)
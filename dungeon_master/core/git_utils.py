@@ -6,9 +6,16 @@ This module provides git-related functionality for tracking file changes,
 determining modified files, and integrating with git workflows.
 """
 
+import atexit
+import hashlib
+import os
+import re
+import stat
+import struct
 import subprocess
+import threading
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 
 def is_git_repository() -> bool:
@@ -34,6 +41,9 @@ def get_changed_files(include_staged=True, include_unstaged=True) -> List[str]:
     """
     Get list of changed files in the git repository.
 
+    Prefer GitStatusSnapshot.capture() when more than one question about the
+    working tree is asked; this is a thin wrapper around it.
+
     Args:
         include_staged (bool): Include staged changes
         include_unstaged (bool): Include unstaged changes
@@ -41,45 +51,164 @@ def get_changed_files(include_staged=True, include_unstaged=True) -> List[str]:
     Returns:
         List[str]: List of changed file paths relative to repository root
     """
-    if not is_git_repository():
+    status = GitStatusSnapshot.capture()
+    if status is None:
         return []
+    return sorted(status.get_changed(include_staged, include_unstaged))
 
-    changed_files = set()
 
-    try:
-        # Get staged changes
-        if include_staged:
-            result = subprocess.run(
-                ["git", "diff", "--cached", "--name-only"],
-                capture_output=True,
-                text=True,
-                check=True,
-            )
-            staged_files = (
-                result.stdout.strip().split("\n") if result.stdout.strip() else []
-            )
-            changed_files.update(staged_files)
+class GitStatusSnapshot:
+    """
+    The state of the index and working tree from one ``git status`` call.
 
-        # Get unstaged changes
-        if include_unstaged:
+    Parses ``git status --porcelain=v2 -z --untracked-files=all`` into sets
+    of paths relative to the repository root, so callers can ask about
+    staged, unstaged and untracked files with set lookups instead of
+    spawning a git process per question. The snapshot does not change after
+    it is taken.
+
+    Attributes:
+        staged: Paths whose index entry differs from HEAD
+        unstaged: Tracked paths whose working tree copy differs from the index
+        untracked: Untracked paths that are not ignored
+        renamed: Renamed paths, mapped to the path they were renamed from
+        deleted: Paths deleted from the index or the working tree
+        unmerged: Paths with unresolved merge conflicts (also counted as
+            staged and unstaged)
+    """
+
+    def __init__(self):
+        self.staged: Set[str] = set()
+        self.unstaged: Set[str] = set()
+        self.untracked: Set[str] = set()
+        self.renamed: Dict[str, str] = {}
+        self.deleted: Set[str] = set()
+        self.unmerged: Set[str] = set()
+
+    @classmethod
+    def capture(cls, repo_path: Optional[Path] = None) -> Optional["GitStatusSnapshot"]:
+        """
+        Take a snapshot of a repository.
+
+        Runs with --no-optional-locks so a snapshot taken while another git
+        command (or a pre-commit hook's commit) holds the index lock never
+        interferes with it.
+
+        Args:
+            repo_path (Path, optional): Directory inside the repository
+                (defaults to current directory)
+
+        Returns:
+            Optional[GitStatusSnapshot]: The snapshot, or None outside a git
+            work tree
+        """
+        try:
             result = subprocess.run(
-                ["git", "diff", "--name-only"],
+                [
+                    "git",
+                    "--no-optional-locks",
+                    "status",
+                    "--porcelain=v2",
+                    "-z",
+                    "--untracked-files=all",
+                ],
+                cwd=repo_path,
                 capture_output=True,
-                text=True,
-                check=True,
+                check=False,
             )
-            unstaged_files = (
-                result.stdout.strip().split("\n") if result.stdout.strip() else []
-            )
-            changed_files.update(unstaged_files)
+        except (FileNotFoundError, OSError):
+            return None
+        if result.returncode != 0:
+            return None
+        return cls.parse(result.stdout)
 
-        # Remove empty strings
-        changed_files.discard("")
+    @classmethod
+    def parse(cls, output: bytes) -> "GitStatusSnapshot":
+        """
+        Build a snapshot from ``git status --porcelain=v2 -z`` output.
 
-        return list(changed_files)
+        Args:
+            output (bytes): Raw command output
 
-    except subprocess.CalledProcessError:
-        return []
+        Returns:
+            GitStatusSnapshot: The parsed snapshot
+        """
+        snapshot = cls()
+        records = iter(output.split(b"\0"))
+        for record in records:
+            if not record:
+                continue
+            kind = record[:1]
+            if kind == b"?":
+                snapshot.untracked.add(os.fsdecode(record[2:]))
+                continue
+            if kind == b"1":
+                # 1 XY sub mH mI mW hH hI path
+                fields = record.split(b" ", 8)
+            elif kind == b"2":
+                # 2 XY sub mH mI mW hH hI score path, then the original path
+                fields = record.split(b" ", 9)
+                snapshot.renamed[os.fsdecode(fields[9])] = os.fsdecode(
+                    next(records, b"")
+                )
+            elif kind == b"u":
+                # u XY sub m1 m2 m3 mW h1 h2 h3 path
+                fields = record.split(b" ", 10)
+                path = os.fsdecode(fields[10])
+                snapshot.unmerged.add(path)
+                snapshot.staged.add(path)
+                snapshot.unstaged.add(path)
+                continue
+            else:
+                # Headers ("#") and ignored files ("!") are not tracked changes
+                continue
+
+            path = os.fsdecode(fields[-1])
+            index_status, worktree_status = fields[1][:1], fields[1][1:2]
+            if index_status != b".":
+                snapshot.staged.add(path)
+            if worktree_status != b".":
+                snapshot.unstaged.add(path)
+            if b"D" in (index_status, worktree_status):
+                snapshot.deleted.add(path)
+        return snapshot
+
+    @property
+    def changed(self) -> Set[str]:
+        """Paths with staged or unstaged changes."""
+        return self.staged | self.unstaged
+
+    @property
+    def dirty(self) -> Set[str]:
+        """
+        Paths whose working tree content may differ from HEAD.
+
+        Like get_worktree_changes(), untracked files are included and renames
+        count as both of their paths.
+        """
+        return self.staged | self.unstaged | self.untracked | set(self.renamed.values())
+
+    def get_changed(self, include_staged=True, include_unstaged=True) -> Set[str]:
+        """
+        Select changed paths the way get_changed_files() does.
+
+        Args:
+            include_staged (bool): Include staged changes
+            include_unstaged (bool): Include unstaged changes
+
+        Returns:
+            Set[str]: Changed paths relative to the repository root
+        """
+        changed: Set[str] = set()
+        if include_staged:
+            changed |= self.staged
+        if include_unstaged:
+            changed |= self.unstaged
+        return changed
+
+    def has_changes(self) -> bool:
+        """Check for staged or unstaged changes (untracked files aside)."""
+        return bool(self.staged or self.unstaged)
 
 
 def get_tracked_files() -> List[str]:
@@ -131,30 +260,1346 @@ def get_untracked_files() -> List[str]:
         return []
 
 
-def is_file_tracked(file_path: str) -> bool:
+def list_repository_files(
+    repo_path: Optional[Path] = None, paths: Optional[List[str]] = None
+) -> Optional[List[str]]:
     """
-    Check if a specific file is tracked by git.
+    List every file git considers part of the working tree in one call.
+
+    Runs ``git ls-files -z --cached --others --exclude-standard`` so tracked
+    files and untracked files that are not ignored are both included, while
+    anything matched by .gitignore, .git/info/exclude or core.excludesFile
+    is left out without ever being visited.
 
     Args:
-        file_path (str): Path to the file to check
+        repo_path (Path, optional): Directory to list (defaults to current directory)
+        paths (List[str], optional): Only list these paths (taken literally,
+            not as patterns); an empty list lists nothing
 
     Returns:
-        bool: True if file is tracked, False otherwise
+        Optional[List[str]]: File paths relative to repo_path using "/" separators,
+        or None if repo_path is not inside a git work tree
     """
-    if not is_git_repository():
+    command = ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"]
+    if paths is not None:
+        if not paths:
+            return [] if is_git_work_tree(repo_path) else None
+        command = ["git", "--literal-pathspecs"] + command[1:] + ["--"] + paths
+
+    try:
+        result = subprocess.run(
+            command,
+            cwd=repo_path,
+            capture_output=True,
+            check=False,
+        )
+    except (FileNotFoundError, OSError):
+        return None
+
+    if result.returncode != 0:
+        return None
+
+    # Unmerged paths are listed once per stage; keep the first occurrence
+    paths = dict.fromkeys(os.fsdecode(p) for p in result.stdout.split(b"\0") if p)
+    return list(paths)
+
+
+def is_git_work_tree(repo_path: Optional[Path] = None) -> bool:
+    """
+    Check if a directory is inside a git work tree.
+
+    Args:
+        repo_path (Path, optional): Directory to check (defaults to current directory)
+
+    Returns:
+        bool: True if git commands can run against a work tree there
+    """
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--is-inside-work-tree"],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except (FileNotFoundError, OSError):
         return False
+    return result.returncode == 0 and result.stdout.strip() == "true"
+
 
+def get_head_commit(repo_path: Optional[Path] = None) -> Optional[str]:
+    """
+    Get the commit id HEAD points to.
+
+    Args:
+        repo_path (Path, optional): Directory inside the repository (defaults
+            to current directory)
+
+    Returns:
+        Optional[str]: Full commit id, or None outside a repository or before
+        the first commit
+    """
     try:
         result = subprocess.run(
-            ["git", "ls-files", "--error-unmatch", file_path],
+            ["git", "rev-parse", "--verify", "--quiet", "HEAD^{commit}"],
+            cwd=repo_path,
             capture_output=True,
             text=True,
             check=False,
         )
-        return result.returncode == 0
+    except (FileNotFoundError, OSError):
+        return None
+    head = result.stdout.strip()
+    return head if result.returncode == 0 and head else None
 
-    except subprocess.CalledProcessError:
-        return False
+
+def _run_path_list(
+    command: List[str], repo_path: Optional[Path]
+) -> Optional[List[str]]:
+    """Run a git command printing NUL-separated paths, or None on failure."""
+    try:
+        result = subprocess.run(
+            command, cwd=repo_path, capture_output=True, check=False
+        )
+    except (FileNotFoundError, OSError):
+        return None
+    if result.returncode != 0:
+        return None
+    return [os.fsdecode(p) for p in result.stdout.split(b"\0") if p]
+
+
+def get_files_changed_between(
+    old_commit: str, new_commit: str, repo_path: Optional[Path] = None
+) -> Optional[List[str]]:
+    """
+    List the files that differ between two commits.
+
+    Renames are reported as a deletion plus an addition, so both paths are
+    included.
+
+    Args:
+        old_commit (str): Commit to compare from
+        new_commit (str): Commit to compare to
+        repo_path (Path, optional): Repository root (defaults to current directory)
+
+    Returns:
+        Optional[List[str]]: Paths relative to the repository root, or None if
+        either commit is unknown (for example after garbage collection)
+    """
+    return _run_path_list(
+        ["git", "diff", "--name-only", "-z", "--no-renames", old_commit, new_commit],
+        repo_path,
+    )
+
+
+def get_worktree_changes(repo_path: Optional[Path] = None) -> Optional[List[str]]:
+    """
+    List the files whose working tree content differs from HEAD.
+
+    Covers staged and unstaged modifications, deletions and untracked files
+    that are not ignored - every path where reading the working tree may give
+    a different answer than reading HEAD.
+
+    Args:
+        repo_path (Path, optional): Repository root (defaults to current directory)
+
+    Returns:
+        Optional[List[str]]: Sorted paths relative to the repository root, or
+        None outside a repository or before the first commit
+    """
+    modified = _run_path_list(
+        ["git", "diff", "--name-only", "-z", "--no-renames", "HEAD"], repo_path
+    )
+    if modified is None:
+        return None
+    untracked = _run_path_list(
+        ["git", "ls-files", "-z", "--others", "--exclude-standard"], repo_path
+    )
+    if untracked is None:
+        return None
+    return sorted(set(modified) | set(untracked))
+
+
+# Chunk size used to skip over blob content that is not wanted
+BLOB_DRAIN_CHUNK = 64 * 1024
+
+# Index file format versions read_git_index() understands
+SUPPORTED_INDEX_VERSIONS = (2, 3, 4)
+
+# With any of these set git may find the repository somewhere a directory walk
+# would not, so the index is left to git itself
+RELOCATING_ENVIRONMENT = ("GIT_DIR", "GIT_WORK_TREE", "GIT_COMMON_DIR")
+
+# Index header: signature, version, entry count
+INDEX_HEADER = struct.Struct(">4sLL")
+
+# Cached stat data at the start of every entry: ctime s/ns, mtime s/ns, dev,
+# ino, mode, uid, gid, size
+INDEX_ENTRY_STAT = struct.Struct(">10L")
+
+# Bits of an entry's flags and extended flags
+INDEX_FLAG_EXTENDED = 0x4000
+INDEX_FLAG_STAGE_SHIFT = 12
+INDEX_EXTENDED_SKIP_WORKTREE = 0x4000
+INDEX_EXTENDED_INTENT_TO_ADD = 0x2000
+
+# File type bits of an entry's mode
+MODE_TYPE_MASK = 0o170000
+MODE_REGULAR_FILE = 0o100000
+MODE_SYMLINK = 0o120000
+MODE_DIRECTORY = 0o040000
+
+# Stat fields are stored as 32-bit values
+STAT_FIELD_MASK = 0xFFFFFFFF
+
+# Blob hash size for each repository object format
+HASH_SIZES = {"sha1": 20, "sha256": 32}
+
+
+class IndexFormatError(ValueError):
+    """Raised for index files that cannot be read without git."""
+
+    pass
+
+
+class IndexEntry:
+    """
+    One entry of the git index.
+
+    Entries listed through the ``git ls-files`` fallback carry no stat data;
+    their stat fields are None.
+    """
+
+    __slots__ = (
+        "path",
+        "oid",
+        "mode",
+        "stage",
+        "ctime_ns",
+        "mtime_ns",
+        "ino",
+        "size",
+        "skip_worktree",
+        "intent_to_add",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        oid: str,
+        mode: int,
+        stage: int = 0,
+        ctime_ns: Optional[int] = None,
+        mtime_ns: Optional[int] = None,
+        ino: Optional[int] = None,
+        size: Optional[int] = None,
+        skip_worktree: bool = False,
+        intent_to_add: bool = False,
+    ):
+        self.path = path
+        self.oid = oid
+        self.mode = mode
+        self.stage = stage
+        self.ctime_ns = ctime_ns
+        self.mtime_ns = mtime_ns
+        self.ino = ino
+        self.size = size
+        self.skip_worktree = skip_worktree
+        self.intent_to_add = intent_to_add
+
+    @property
+    def is_regular_file(self) -> bool:
+        """Whether the entry's blob holds a regular file's content."""
+        return self.mode & MODE_TYPE_MASK == MODE_REGULAR_FILE
+
+    def matches_stat(self, stat_result: os.stat_result) -> bool:
+        """
+        Check a file's stat data against what git recorded for the entry.
+
+        Like git (which is built to ignore nanoseconds by default, and then
+        never refreshes them), timestamps are compared to the second, and
+        only the low 32 bits of each field are compared. A match means the
+        file is unchanged since it was staged, unless the entry is racily
+        clean (see GitIndex.is_racy()).
+
+        Args:
+            stat_result (os.stat_result): Current stat data of the file
+
+        Returns:
+            bool: True if mtime, ctime, size and inode all match
+        """
+        if self.mtime_ns is None:
+            return False
+        return (
+            _index_seconds(self.mtime_ns) == _index_seconds(stat_result.st_mtime_ns)
+            and _index_seconds(self.ctime_ns) == _index_seconds(stat_result.st_ctime_ns)
+            and self.size == stat_result.st_size & STAT_FIELD_MASK
+            and self.ino == stat_result.st_ino & STAT_FIELD_MASK
+        )
+
+
+class GitIndex:
+    """
+    Contents of a git index file, read without running git.
+
+    Attributes:
+        root: Top-level directory of the work tree entry paths are relative to
+        version: Index format version
+        entries: Entries in index order (by path, then stage)
+        cache_tree: Tree ids cached by the TREE extension, keyed by directory
+            ("" for the root), as (tree id, number of entries covered); the
+            tree id is None for directories changed since it was computed
+        extensions: Raw data of the other optional extensions, by signature
+        mtime_ns: Modification time of the index file
+        hash_size: Object id size in bytes (20 for SHA-1, 32 for SHA-256)
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        version: int = 2,
+        entries: Optional[List[IndexEntry]] = None,
+        cache_tree: Optional[Dict[str, Tuple[Optional[str], int]]] = None,
+        extensions: Optional[Dict[str, bytes]] = None,
+        mtime_ns: int = 0,
+        hash_size: int = 20,
+    ):
+        self.root = root
+        self.version = version
+        self.entries = entries if entries is not None else []
+        self.cache_tree = cache_tree if cache_tree is not None else {}
+        self.extensions = extensions if extensions is not None else {}
+        self.mtime_ns = mtime_ns
+        self.hash_size = hash_size
+
+    def is_racy(self, entry: IndexEntry) -> bool:
+        """
+        Check whether an entry's stat data cannot be trusted.
+
+        A file modified in the same second as the index was written may have
+        changed without its stat data showing it, so its content has to be
+        compared instead.
+        """
+        return entry.mtime_ns is None or _index_seconds(
+            entry.mtime_ns
+        ) >= _index_seconds(self.mtime_ns)
+
+    @classmethod
+    def parse(
+        cls, data: bytes, root: Path, hash_size: int = 20, mtime_ns: int = 0
+    ) -> "GitIndex":
+        """
+        Parse the bytes of an index file.
+
+        Versions 2 to 4 are supported, including version 4 path prefix
+        compression. Split indexes ("link") and sparse indexes ("sdir") are
+        not, and neither is any other required extension.
+
+        Args:
+            data (bytes): Index file content
+            root (Path): Top-level directory of the work tree
+            hash_size (int): Object id size in bytes
+            mtime_ns (int): Modification time of the index file
+
+        Returns:
+            GitIndex: The parsed index
+
+        Raises:
+            IndexFormatError: If the file is malformed or uses unsupported
+                features
+        """
+        # The file ends with a checksum of everything before it
+        end = len(data) - hash_size
+        if end < INDEX_HEADER.size:
+            raise IndexFormatError("Index file is truncated")
+        signature, version, count = INDEX_HEADER.unpack_from(data, 0)
+        if signature != b"DIRC":
+            raise IndexFormatError("Not an index file")
+        if version not in SUPPORTED_INDEX_VERSIONS:
+            raise IndexFormatError(f"Unsupported index version {version}")
+
+        entries = []
+        offset = INDEX_HEADER.size
+        header_size = INDEX_ENTRY_STAT.size + hash_size + 2
+        previous_path = b""
+        try:
+            for _ in range(count):
+                if offset + header_size > end:
+                    raise IndexFormatError("Index file is truncated")
+                (
+                    ctime_s,
+                    ctime_ns,
+                    mtime_s,
+                    mtime_ns_part,
+                    _dev,
+                    ino,
+                    mode,
+                    _uid,
+                    _gid,
+                    size,
+                ) = INDEX_ENTRY_STAT.unpack_from(data, offset)
+                oid_start = offset + INDEX_ENTRY_STAT.size
+                oid = data[oid_start : oid_start + hash_size].hex()
+                position = offset + header_size
+                flags = int.from_bytes(data[oid_start + hash_size : position], "big")
+                extended_flags = 0
+                if flags & INDEX_FLAG_EXTENDED:
+                    if version < 3:
+                        raise IndexFormatError("Extended flags in a version 2 index")
+                    extended_flags = int.from_bytes(
+                        data[position : position + 2], "big"
+                    )
+                    position += 2
+
+                if version == 4:
+                    # The path repeats the previous one minus a stripped suffix
+                    strip, position = _read_index_varint(data, position)
+                    name_end = data.index(b"\0", position, end)
+                    if strip > len(previous_path):
+                        raise IndexFormatError("Corrupt path compression")
+                    path = previous_path[: len(previous_path) - strip]
+                    path += data[position:name_end]
+                    offset = name_end + 1
+                else:
+                    # Entries are NUL-padded to a multiple of eight bytes
+                    name_end = data.index(b"\0", position, end)
+                    path = data[position:name_end]
+                    offset += (position - offset + len(path) + 8) & ~7
+                previous_path = path
+
+                if mode & MODE_TYPE_MASK == MODE_DIRECTORY:
+                    raise IndexFormatError("Sparse index directory entries")
+                entries.append(
+                    IndexEntry(
+                        os.fsdecode(path),
+                        oid,
+                        mode,
+                        (flags >> INDEX_FLAG_STAGE_SHIFT) & 3,
+                        ctime_s * 1_000_000_000 + ctime_ns,
+                        mtime_s * 1_000_000_000 + mtime_ns_part,
+                        ino,
+                        size,
+                        bool(extended_flags & INDEX_EXTENDED_SKIP_WORKTREE),
+                        bool(extended_flags & INDEX_EXTENDED_INTENT_TO_ADD),
+                    )
+                )
+
+            cache_tree = {}
+            extensions = {}
+            while offset < end:
+                if offset + 8 > end:
+                    raise IndexFormatError("Index file is truncated")
+                name = data[offset : offset + 4]
+                length = int.from_bytes(data[offset + 4 : offset + 8], "big")
+                body = data[offset + 8 : offset + 8 + length]
+                if len(body) != length or offset + 8 + length > end:
+                    raise IndexFormatError("Index file is truncated")
+                if name == b"TREE":
+                    cache_tree = _parse_cache_tree(body, hash_size)
+                elif b"A" <= name[:1] <= b"Z":
+                    # Optional extension: kept, but not needed to read entries
+                    extensions[name.decode("ascii", "replace")] = body
+                else:
+                    raise IndexFormatError(
+                        f"Unsupported index extension {name.decode('ascii', 'replace')}"
+                    )
+                offset += 8 + length
+        except ValueError as e:
+            if isinstance(e, IndexFormatError):
+                raise
+            # bytes.index() found no terminating NUL
+            raise IndexFormatError("Index file is truncated") from e
+
+        return cls(root, version, entries, cache_tree, extensions, mtime_ns, hash_size)
+
+
+def _index_seconds(time_ns: int) -> int:
+    """Reduce a timestamp to the 32-bit seconds the index compares."""
+    return (time_ns // 1_000_000_000) & STAT_FIELD_MASK
+
+
+def _read_index_varint(data: bytes, position: int) -> Tuple[int, int]:
+    """Decode a version 4 offset-encoded integer; return it and the new position."""
+    byte = data[position]
+    position += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[position]
+        position += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, position
+
+
+def _parse_cache_tree(
+    body: bytes, hash_size: int
+) -> Dict[str, Tuple[Optional[str], int]]:
+    """Parse the TREE extension into directory -> (tree id, entry count)."""
+    trees: Dict[str, Tuple[Optional[str], int]] = {}
+    # Directories whose subtrees are still being read, with how many remain
+    parents: List[List] = []
+    offset = 0
+    try:
+        while offset < len(body):
+            name_start = offset
+            name_end = body.index(b"\0", offset)
+            line_end = body.index(b"\n", name_end)
+            entry_count, subtree_count = (
+                int(value) for value in body[name_end + 1 : line_end].split(b" ")
+            )
+            offset = line_end + 1
+            oid = None
+            if entry_count >= 0:
+                oid = body[offset : offset + hash_size].hex()
+                offset += hash_size
+
+            while parents and parents[-1][1] == 0:
+                parents.pop()
+            if parents:
+                parents[-1][1] -= 1
+                parent = parents[-1][0]
+                name = os.fsdecode(body[name_start:name_end])
+                path = f"{parent}/{name}" if parent else name
+            else:
+                path = ""
+            trees[path] = (oid, entry_count)
+            parents.append([path, subtree_count])
+    except ValueError as e:
+        raise IndexFormatError("Corrupt TREE extension") from e
+    return trees
+
+
+def _find_index_file(repo_path: Path) -> Optional[Tuple[Path, Path, int]]:
+    """
+    Locate the work tree top level, index file and hash size without git.
+
+    Returns None whenever git could resolve the repository differently
+    (relocating environment variables, core.worktree, unusual .git files),
+    so callers ask git instead.
+    """
+    if any(name in os.environ for name in RELOCATING_ENVIRONMENT):
+        return None
+
+    current = Path(os.path.abspath(repo_path))
+    for toplevel in (current, *current.parents):
+        dot_git = toplevel / ".git"
+        if dot_git.is_dir():
+            git_dir = dot_git
+            break
+        if dot_git.is_file():
+            # Linked worktrees and submodules: "gitdir: <path>"
+            content = dot_git.read_text(encoding="utf-8").strip()
+            if not content.startswith("gitdir: "):
+                return None
+            git_dir = toplevel / content[len("gitdir: ") :]
+            break
+    else:
+        return None
+
+    common_dir = git_dir
+    commondir_file = git_dir / "commondir"
+    if commondir_file.is_file():
+        common_dir = git_dir / commondir_file.read_text(encoding="utf-8").strip()
+
+    try:
+        config = (common_dir / "config").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    if re.search(r"^\s*worktree\s*=", config, re.MULTILINE | re.IGNORECASE):
+        return None
+    match = re.search(
+        r"^\s*objectformat\s*=\s*(\w+)", config, re.MULTILINE | re.IGNORECASE
+    )
+    hash_size = HASH_SIZES.get(match.group(1).lower() if match else "sha1")
+    if hash_size is None:
+        return None
+
+    index_file = os.environ.get("GIT_INDEX_FILE")
+    index_path = Path(os.path.abspath(index_file)) if index_file else git_dir / "index"
+    return toplevel, index_path, hash_size
+
+
+def read_git_index(repo_path: Optional[Path] = None) -> Optional[GitIndex]:
+    """
+    Read the git index of the repository containing a directory, without git.
+
+    The repository is found by walking up to the nearest .git, and
+    GIT_INDEX_FILE (set by git for hooks such as pre-commit) is honoured.
+
+    Args:
+        repo_path (Path, optional): Directory inside the work tree (defaults
+            to current directory)
+
+    Returns:
+        Optional[GitIndex]: The index (empty before anything was staged), or
+        None if it cannot be read this way and git has to be asked instead
+    """
+    location = _find_index_file(Path.cwd() if repo_path is None else repo_path)
+    if location is None:
+        return None
+    toplevel, index_path, hash_size = location
+
+    try:
+        with open(index_path, "rb") as f:
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            data = f.read()
+    except FileNotFoundError:
+        return GitIndex(toplevel, hash_size=hash_size)
+    except OSError:
+        return None
+
+    try:
+        return GitIndex.parse(data, toplevel, hash_size, mtime_ns)
+    except IndexFormatError:
+        return None
+
+
+def get_index_tree(
+    repo_path: Optional[Path] = None, write: bool = True
+) -> Optional[str]:
+    """
+    Get the id of the tree the git index would be committed as.
+
+    The root of the index's cached tree (TREE extension) answers without
+    running git when it is still valid; otherwise ``git write-tree``
+    computes it, storing any missing tree objects as a commit would.
+    write-tree updates the index under its lock, so callers running
+    alongside the user's git commands pass write=False.
+
+    Args:
+        repo_path (Path, optional): Directory inside the work tree (defaults
+            to current directory)
+        write (bool): Run git write-tree when the cached tree is not valid
+
+    Returns:
+        Optional[str]: Tree id, or None outside a git work tree, while the
+        index has unresolved conflicts or, without write, when the cached
+        tree is not valid
+    """
+    index = read_git_index(repo_path)
+    if index is not None:
+        root_tree = index.cache_tree.get("", (None, -1))[0]
+        if root_tree is not None:
+            return root_tree
+    if not write:
+        return None
+
+    try:
+        result = subprocess.run(
+            ["git", "write-tree"],
+            cwd=repo_path,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except (FileNotFoundError, OSError):
+        return None
+    tree = result.stdout.strip()
+    return tree if result.returncode == 0 and tree else None
+
+
+def read_index_entries(
+    repo_path: Optional[Path] = None, paths: Optional[List[str]] = None
+) -> Optional[Dict[str, IndexEntry]]:
+    """
+    List index entries the way ``git ls-files -s`` does, preferably without git.
+
+    The index is parsed directly when read_git_index() can; otherwise (split
+    or sparse indexes, relocated repositories) ``git ls-files -s -z`` is run
+    and the entries carry no stat data.
+
+    Args:
+        repo_path (Path, optional): Directory to list (defaults to current directory)
+        paths (List[str], optional): Only list these paths or directories
+            (taken literally, not as patterns); without them only entries
+            under repo_path are listed
+
+    Returns:
+        Optional[Dict[str, IndexEntry]]: Entries keyed by path relative to
+        repo_path using "/" separators, in index order (the first stage of an
+        unmerged path), or None if repo_path is not inside a git work tree
+    """
+    repo_path = Path.cwd() if repo_path is None else Path(repo_path)
+    index = read_git_index(repo_path)
+    if index is None:
+        return _list_index_entries(repo_path, paths)
+
+    prefix = Path(os.path.relpath(os.path.abspath(repo_path), index.root)).as_posix()
+    prefix = "" if prefix == "." else prefix + "/"
+    if paths is None:
+        specs = [prefix]
+    else:
+        specs = []
+        for path in paths:
+            spec = os.path.normpath(os.path.join(prefix, path)).replace(os.sep, "/")
+            if spec == ".." or spec.startswith("../"):
+                # Like git, refuse paths outside the repository
+                return None
+            specs.append("" if spec == "." else spec)
+    specs = [spec.rstrip("/") for spec in specs]
+
+    entries: Dict[str, IndexEntry] = {}
+    for entry in index.entries:
+        path = entry.path
+        if not any(
+            not spec or path == spec or path.startswith(spec + "/") for spec in specs
+        ):
+            continue
+        if path.startswith(prefix):
+            key = path[len(prefix) :]
+        else:
+            key = Path(os.path.relpath(path, prefix or ".")).as_posix()
+        if key not in entries:
+            entries[key] = entry
+    return entries
+
+
+def _list_index_entries(
+    repo_path: Path, paths: Optional[List[str]]
+) -> Optional[Dict[str, IndexEntry]]:
+    """Fallback for read_index_entries() that asks ``git ls-files -s``."""
+    command = ["git", "--literal-pathspecs", "ls-files", "-s", "-z"]
+    if paths is not None:
+        command += ["--"] + paths
+
+    try:
+        result = subprocess.run(
+            command, cwd=repo_path, capture_output=True, check=False
+        )
+    except (FileNotFoundError, OSError):
+        return None
+
+    if result.returncode != 0:
+        return None
+
+    entries: Dict[str, IndexEntry] = {}
+    for record in result.stdout.split(b"\0"):
+        if not record:
+            continue
+        # "<mode> <oid> <stage>\t<path>"
+        info, _, path = record.partition(b"\t")
+        mode, oid, stage = info.decode("ascii").split(" ")
+        path = os.fsdecode(path)
+        # Unmerged paths are listed once per stage; keep the first occurrence
+        if path not in entries:
+            entries[path] = IndexEntry(path, oid, int(mode, 8), int(stage))
+    return entries
+
+
+def get_staged_entries(
+    repo_path: Optional[Path] = None, paths: Optional[List[str]] = None
+) -> Optional[Dict[str, str]]:
+    """
+    Map the regular files in the git index to their staged blob ids.
+
+    The result describes exactly what the next commit would contain.
+    Symlinks and submodules are left out. See read_index_entries().
+
+    Args:
+        repo_path (Path, optional): Directory to list (defaults to current directory)
+        paths (List[str], optional): Only list these paths or directories
+            (taken literally, not as patterns)
+
+    Returns:
+        Optional[Dict[str, str]]: Blob ids keyed by file path relative to
+        repo_path using "/" separators, in index order, or None if repo_path
+        is not inside a git work tree
+    """
+    entries = read_index_entries(repo_path, paths)
+    if entries is None:
+        return None
+    return {path: entry.oid for path, entry in entries.items() if entry.is_regular_file}
+
+
+def get_unstaged_files(repo_path: Optional[Path] = None) -> Optional[List[str]]:
+    """
+    List the tracked files whose working tree content differs from the index.
+
+    For every other tracked file the working tree copy is byte-for-byte what
+    is staged, so it can be read from disk instead of from the index.
+
+    When the index can be parsed this needs no git process: files whose stat
+    data matches the index are unchanged, and the others (or racily clean
+    ones) are hashed and compared with their staged blob id, as git does.
+    Content filters such as end-of-line conversion are not applied, so a
+    filtered file may be reported even though git would consider it clean.
+    Otherwise ``git diff --name-only`` is run.
+
+    Args:
+        repo_path (Path, optional): Directory inside the repository (defaults
+            to current directory)
+
+    Returns:
+        Optional[List[str]]: Modified or deleted paths relative to repo_path,
+        or None outside a git work tree
+    """
+    repo_path = Path.cwd() if repo_path is None else Path(repo_path)
+    index = read_git_index(repo_path)
+    if index is None:
+        return _run_path_list(
+            ["git", "diff", "--name-only", "-z", "--no-renames", "--relative"],
+            repo_path,
+        )
+
+    prefix = Path(os.path.relpath(os.path.abspath(repo_path), index.root)).as_posix()
+    prefix = "" if prefix == "." else prefix + "/"
+    hash_name = "sha256" if index.hash_size == HASH_SIZES["sha256"] else "sha1"
+    unstaged: Dict[str, None] = {}
+    for entry in index.entries:
+        if not entry.path.startswith(prefix):
+            continue
+        path = entry.path[len(prefix) :]
+        if entry.stage or entry.intent_to_add:
+            # Unresolved conflicts and intent-to-add entries always differ
+            unstaged[path] = None
+            continue
+        if entry.skip_worktree:
+            continue
+        file_type = entry.mode & MODE_TYPE_MASK
+        if file_type not in (MODE_REGULAR_FILE, MODE_SYMLINK):
+            continue
+
+        full_path = os.path.join(index.root, entry.path)
+        try:
+            stat_result = os.lstat(full_path)
+        except OSError:
+            unstaged[path] = None
+            continue
+        if entry.matches_stat(stat_result) and not index.is_racy(entry):
+            continue
+        oid = _hash_worktree_object(full_path, stat_result, file_type, hash_name)
+        if oid != entry.oid:
+            unstaged[path] = None
+    return list(unstaged)
+
+
+def hash_blob(data: bytes, hash_name: str = "sha1") -> str:
+    """
+    Compute the id git gives a blob with the given content.
+
+    Args:
+        data (bytes): Blob content
+        hash_name (str): Object format of the repository ("sha1" or "sha256")
+
+    Returns:
+        str: Hex blob id, as ``git hash-object`` prints it
+    """
+    digest = hashlib.new(hash_name, b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _hash_worktree_object(
+    full_path: str, stat_result: os.stat_result, file_type: int, hash_name: str
+) -> Optional[str]:
+    """Compute the blob id git would give a working tree file or symlink."""
+    try:
+        if file_type == MODE_SYMLINK:
+            if not stat.S_ISLNK(stat_result.st_mode):
+                return None
+            return hash_blob(os.fsencode(os.readlink(full_path)), hash_name)
+
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        with open(full_path, "rb") as f:
+            digest = hashlib.new(hash_name, b"blob %d\0" % stat_result.st_size)
+            size = 0
+            for chunk in iter(lambda: f.read(BLOB_DRAIN_CHUNK), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        # Changed while being read: report it as modified
+        return digest.hexdigest() if size == stat_result.st_size else None
+    except OSError:
+        return None
+
+
+def grep_repository(
+    pattern: str,
+    repo_path: Optional[Path] = None,
+    include_untracked: bool = False,
+) -> Optional[Dict[str, List[Tuple[int, bytes]]]]:
+    """
+    Find the lines matching an extended regular expression with ``git grep``.
+
+    git searches the working tree copies of tracked files (plus untracked,
+    non-ignored files if requested) with its own threads, skipping binary
+    files the same way the scanner does (a NUL in the first 8000 bytes).
+
+    Args:
+        pattern (str): POSIX extended regular expression
+        repo_path (Path, optional): Directory to search (defaults to current directory)
+        include_untracked (bool): Also search untracked files that are not ignored
+
+    Returns:
+        Optional[Dict[str, List[Tuple[int, bytes]]]]: Matching (line number,
+        line) pairs keyed by file path relative to repo_path, in git's path
+        order, or None if git grep cannot run here
+    """
+    command = [
+        "git",
+        # User settings must not change the output format
+        "-c",
+        "grep.fullName=false",
+        "-c",
+        "grep.column=false",
+        "grep",
+        "--no-color",
+        "-z",
+        "-n",
+        "-I",
+        "-E",
+        "-e",
+        pattern,
+    ]
+    if include_untracked:
+        command.append("--untracked")
+
+    try:
+        result = subprocess.run(
+            command, cwd=repo_path, capture_output=True, check=False
+        )
+    except (FileNotFoundError, OSError):
+        return None
+
+    # Exit status 1 means nothing matched
+    if result.returncode not in (0, 1):
+        return None
+
+    matches: Dict[str, List[Tuple[int, bytes]]] = {}
+    output = result.stdout
+    position = 0
+    while position < len(output):
+        # "<path>\0<line number>\0<line>\n"; the line itself may hold NULs
+        path_end = output.index(b"\0", position)
+        number_end = output.index(b"\0", path_end + 1)
+        line_end = output.find(b"\n", number_end + 1)
+        if line_end == -1:
+            line_end = len(output)
+        path = os.fsdecode(output[position:path_end])
+        line_number = int(output[path_end + 1 : number_end])
+        matches.setdefault(path, []).append(
+            (line_number, output[number_end + 1 : line_end])
+        )
+        position = line_end + 1
+    return matches
+
+
+class GitBlobReader:
+    """
+    Read blob contents through one long-lived ``git cat-file --batch`` process.
+
+    Starting git once per file dominates the cost of reading many small
+    blobs; a batch process answers every request over the same pipe. Use it
+    as a context manager, or call close() when done. Requests from several
+    threads are serialised, since they share the pipe.
+    """
+
+    def __init__(self, repo_path: Optional[Path] = None):
+        """
+        Start the batch process.
+
+        Args:
+            repo_path (Path, optional): Directory inside the repository
+                (defaults to current directory)
+
+        Raises:
+            OSError: If git cannot be started
+        """
+        self._process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._lock = threading.Lock()
+
+    def read(
+        self, oid: str, max_size: Optional[int] = None
+    ) -> Tuple[Optional[int], Optional[bytes]]:
+        """
+        Read one blob.
+
+        Args:
+            oid (str): Object id of the blob
+            max_size (int, optional): Skip blobs larger than this many bytes
+                without buffering them (None or 0 for no limit)
+
+        Returns:
+            Tuple[Optional[int], Optional[bytes]]: (size, content); size is
+            None if the object does not exist, content is None if it does
+            not exist or is larger than max_size
+
+        Raises:
+            OSError: If the batch process has exited
+        """
+        with self._lock:
+            return self._read(oid, max_size)
+
+    def _read(
+        self, oid: str, max_size: Optional[int]
+    ) -> Tuple[Optional[int], Optional[bytes]]:
+        stdin, stdout = self._process.stdin, self._process.stdout
+        try:
+            stdin.write(oid.encode("ascii") + b"\n")
+            stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise OSError(f"git cat-file is not running: {e}") from e
+
+        # "<oid> <type> <size>\n" followed by the content, or "<oid> missing\n"
+        header = stdout.readline()
+        if not header:
+            raise OSError("git cat-file exited unexpectedly")
+        fields = header.split()
+        if len(fields) != 3:
+            return None, None
+
+        size = int(fields[2])
+        if max_size and size > max_size:
+            remaining = size + 1
+            while remaining:
+                chunk = stdout.read(min(remaining, BLOB_DRAIN_CHUNK))
+                if not chunk:
+                    raise OSError("git cat-file exited unexpectedly")
+                remaining -= len(chunk)
+            return size, None
+
+        content = stdout.read(size)
+        stdout.read(1)  # Trailing newline
+        if len(content) != size:
+            raise OSError("git cat-file exited unexpectedly")
+        return size, content
+
+    def close(self) -> None:
+        """Stop the batch process."""
+        if self._process.stdin and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        if self._process.stdout:
+            self._process.stdout.close()
+
+    def __enter__(self) -> "GitBlobReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class GitSession:
+    """
+    Long-lived git helpers for one repository.
+
+    Per-path questions - ignore status, attributes, blob contents and
+    tracked-ness - are answered by coprocesses that start on first use and
+    serve every later query over the same pipes (``git check-ignore --stdin
+    -z``, ``git check-attr --stdin -z`` and ``git cat-file --batch``), so a
+    thousand lookups cost one fork instead of a thousand. rev-parse answers
+    (git dir, top-level directory and HEAD) are computed once.
+
+    Git reads .gitignore, .gitattributes and the index when a coprocess
+    starts, so a session describes the repository as of its first query of
+    each kind. Obtain sessions from get_git_session(); close_git_sessions()
+    ends them at exit (and after every daemon request).
+    """
+
+    def __init__(self, repo_path: Optional[Path] = None):
+        """
+        Create a session; nothing is started until it is first queried.
+
+        Args:
+            repo_path (Path, optional): Directory paths are relative to
+                (defaults to current directory)
+        """
+        self.repo_path = Path.cwd() if repo_path is None else Path(repo_path)
+        self._lock = threading.RLock()
+        self._processes: Dict[Tuple[str, ...], subprocess.Popen] = {}
+        self._blob_reader: Optional[GitBlobReader] = None
+        self._locations: Optional[Tuple[Optional[str], Optional[Path], ...]] = None
+        self._head: Optional[Tuple[Optional[str]]] = None
+        self._tracked: Optional[Set[str]] = None
+
+    @property
+    def git_dir(self) -> Optional[str]:
+        """Absolute path of the git directory, or None outside a repository."""
+        return self._rev_parse()[0]
+
+    @property
+    def toplevel(self) -> Optional[Path]:
+        """Top-level directory of the work tree, or None outside one."""
+        return self._rev_parse()[1]
+
+    @property
+    def common_dir(self) -> Optional[Path]:
+        """Git directory shared by all worktrees, or None outside a work tree."""
+        return self._rev_parse()[2]
+
+    @property
+    def head(self) -> Optional[str]:
+        """Commit HEAD pointed to when first asked (see get_head_commit())."""
+        with self._lock:
+            if self._head is None:
+                self._head = (get_head_commit(self.repo_path),)
+            return self._head[0]
+
+    def _rev_parse(self) -> Tuple[Optional[str], Optional[Path], Optional[Path]]:
+        """Look up the git dirs and top-level directory with one rev-parse."""
+        with self._lock:
+            if self._locations is None:
+                self._locations = (None, None, None)
+                try:
+                    result = subprocess.run(
+                        [
+                            "git",
+                            "rev-parse",
+                            "--absolute-git-dir",
+                            "--show-toplevel",
+                            "--git-common-dir",
+                        ],
+                        cwd=self.repo_path,
+                        capture_output=True,
+                        text=True,
+                        check=False,
+                    )
+                except (FileNotFoundError, OSError):
+                    return self._locations
+                lines = result.stdout.splitlines()
+                if result.returncode == 0 and len(lines) == 3:
+                    # Older git prints the common dir relative to the cwd
+                    common_dir = os.path.join(os.path.abspath(self.repo_path), lines[2])
+                    self._locations = (
+                        lines[0],
+                        Path(lines[1]),
+                        Path(os.path.normpath(common_dir)),
+                    )
+            return self._locations
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Check whether git ignores a path.
+
+        Tracked files are never reported as ignored, as with ``git
+        check-ignore``.
+
+        Args:
+            path (str): Path relative to the session directory
+
+        Returns:
+            bool: True if a .gitignore rule (or other exclude source) matches
+
+        Raises:
+            OSError: If git cannot answer (for example outside a repository)
+        """
+        command = (
+            "git",
+            "check-ignore",
+            "--stdin",
+            "-z",
+            "--verbose",
+            "--non-matching",
+        )
+        with self._lock:
+            # Every path gets a "source, line, pattern, path" record; the
+            # source is empty when nothing matched
+            source, _, pattern, _ = self._query(command, path, 4)
+            return bool(source) and not pattern.startswith(b"!")
+
+    def get_ignored(self, paths: Iterable[str]) -> Set[str]:
+        """
+        Select the ignored paths from many (see is_ignored()).
+
+        Args:
+            paths (Iterable[str]): Paths relative to the session directory
+
+        Returns:
+            Set[str]: The paths that are ignored
+        """
+        return {path for path in paths if self.is_ignored(path)}
+
+    def get_attributes(self, path: str, attributes: Sequence[str]) -> Dict[str, str]:
+        """
+        Look up gitattributes for a path.
+
+        Args:
+            path (str): Path relative to the session directory
+            attributes (Sequence[str]): Attribute names to look up
+
+        Returns:
+            Dict[str, str]: Value of each attribute as ``git check-attr``
+            reports it: "set", "unset", "unspecified" or the assigned value
+
+        Raises:
+            OSError: If git cannot answer
+        """
+        command = ("git", "check-attr", "--stdin", "-z") + tuple(attributes)
+        with self._lock:
+            # One "path, attribute, value" record per requested attribute
+            fields = self._query(command, path, 3 * len(attributes))
+        return {
+            fields[i + 1].decode("utf-8"): fields[i + 2].decode("utf-8")
+            for i in range(0, len(fields), 3)
+        }
+
+    @property
+    def blob_reader(self) -> GitBlobReader:
+        """The session's ``git cat-file --batch`` reader, started on first use."""
+        with self._lock:
+            if self._blob_reader is None:
+                self._blob_reader = GitBlobReader(self.repo_path)
+            return self._blob_reader
+
+    def read_blob(
+        self, oid: str, max_size: Optional[int] = None
+    ) -> Tuple[Optional[int], Optional[bytes]]:
+        """Read a blob through the session's reader (see GitBlobReader.read())."""
+        with self._lock:
+            return self.blob_reader.read(oid, max_size)
+
+    def is_tracked(self, path: str) -> bool:
+        """
+        Check whether a file is in the index.
+
+        The first call reads the index once (see read_index_entries()); later
+        calls are set lookups.
+
+        Args:
+            path (str): Path relative to the session directory, or absolute
+
+        Returns:
+            bool: True if the file is tracked
+        """
+        toplevel = self.toplevel
+        if toplevel is None:
+            return False
+        with self._lock:
+            if self._tracked is None:
+                tracked = read_index_entries(toplevel)
+                self._tracked = set(tracked or ())
+        full_path = os.path.abspath(os.path.join(self.repo_path, path))
+        relative = Path(os.path.relpath(full_path, toplevel)).as_posix()
+        return relative in self._tracked
+
+    def close(self) -> None:
+        """Stop every coprocess the session started."""
+        with self._lock:
+            processes = list(self._processes.values())
+            self._processes.clear()
+            for process in processes:
+                _stop_process(process)
+            if self._blob_reader is not None:
+                self._blob_reader.close()
+                self._blob_reader = None
+
+    def _query(self, command: Tuple[str, ...], path: str, count: int) -> List[bytes]:
+        """Send a path to a -z coprocess and read its NUL-terminated reply."""
+        process = self._processes.get(command)
+        if process is None:
+            process = subprocess.Popen(
+                command,
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self._processes[command] = process
+
+        try:
+            process.stdin.write(os.fsencode(path) + b"\0")
+            process.stdin.flush()
+            return _read_nul_fields(process.stdout, count)
+        except (OSError, ValueError) as e:
+            # Git rejected the path (e.g. outside the repository) and exited
+            del self._processes[command]
+            _stop_process(process)
+            raise OSError(f"{' '.join(command[:2])} failed for {path}: {e}") from e
+
+
+def _read_nul_fields(stream, count: int) -> List[bytes]:
+    """Read count NUL-terminated fields from a pipe."""
+    fields = []
+    field = bytearray()
+    while len(fields) < count:
+        byte = stream.read(1)
+        if not byte:
+            raise OSError("git exited unexpectedly")
+        if byte == b"\0":
+            fields.append(bytes(field))
+            field.clear()
+        else:
+            field += byte
+    return fields
+
+
+def _stop_process(process: subprocess.Popen) -> None:
+    """Close a coprocess's pipes and wait for it to exit."""
+    try:
+        process.stdin.close()
+    except OSError:
+        pass
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    process.stdout.close()
+
+
+_sessions: Dict[str, GitSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_git_session(repo_path: Optional[Path] = None) -> GitSession:
+    """
+    Get the shared GitSession for a directory, creating it on first use.
+
+    Args:
+        repo_path (Path, optional): Directory the session works in (defaults
+            to current directory)
+
+    Returns:
+        GitSession: Session reused by every caller in this process until
+        close_git_sessions()
+    """
+    key = os.path.abspath(os.getcwd() if repo_path is None else repo_path)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = GitSession(Path(key))
+        return session
+
+
+def close_git_sessions() -> None:
+    """Close every shared GitSession; later calls start fresh sessions."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_git_sessions)
+
+
+def is_file_tracked(file_path: str) -> bool:
+    """
+    Check if a specific file is tracked by git.
+
+    Args:
+        file_path (str): Path to the file to check
+
+    Returns:
+        bool: True if file is tracked, False otherwise
+
+    Note:
+        Uses the shared GitSession, so the index is listed once however
+        many files are checked.
+    """
+    return get_git_session().is_tracked(file_path)
 
 
 def get_git_root() -> Path:
@@ -213,8 +1658,5 @@ def has_uncommitted_changes() -> bool:
     Returns:
         bool: True if there are uncommitted changes, False otherwise
     """
-    if not is_git_repository():
-        return False
-
-    changed_files = get_changed_files(include_staged=True, include_unstaged=True)
-    return len(changed_files) > 0
+    status = GitStatusSnapshot.capture()
+    return status is not None and status.has_changes()
@@ -0,0 +1,382 @@
+# track_lore("core/engine.md")
+"""
+Gitignore Matcher
+
+This module implements .gitignore semantics in pure Python so repository
+scans can skip ignored paths when git itself is not available, such as in
+exported source tarballs or before a repository has been initialized.
+
+It supports nested .gitignore files, .git/info/exclude, negation, anchored
+patterns, directory-only patterns, character classes and "**" wildcards.
+The patterns of each ignore file are compiled once into a single combined
+regular expression, and callers walking a tree can prune whole ignored
+directories because nothing below an ignored directory can be re-included.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Name of the per-directory ignore file
+GITIGNORE_FILE = ".gitignore"
+
+# POSIX character classes supported inside bracket expressions
+_POSIX_CLASSES = {
+    "alnum": r"a-zA-Z0-9",
+    "alpha": r"a-zA-Z",
+    "blank": r" \t",
+    "cntrl": r"\x00-\x1f\x7f",
+    "digit": r"0-9",
+    "graph": r"!-~",
+    "lower": r"a-z",
+    "print": r" -~",
+    "punct": r"!-/:-@\[-`{-~",
+    "space": r" \t\n\r\f\v",
+    "upper": r"A-Z",
+    "xdigit": r"0-9A-Fa-f",
+}
+
+
+def parse_ignore_line(line: str) -> Optional[Tuple[str, bool, bool]]:
+    """
+    Parse one line of an ignore file.
+
+    Args:
+        line: Raw line without its newline
+
+    Returns:
+        Tuple of (pattern, negate, directory_only), or None for blank lines
+        and comments
+    """
+    line = line.rstrip("\r")
+    if not line or line.startswith("#"):
+        return None
+
+    # Trailing spaces are ignored unless escaped with a backslash
+    stripped = line.rstrip(" ")
+    if len(stripped) < len(line) and stripped.endswith("\\"):
+        stripped += " "
+    line = stripped
+    if not line:
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+
+    directory_only = line.endswith("/")
+    if directory_only:
+        line = line[:-1]
+
+    if not line:
+        return None
+    return line, negate, directory_only
+
+
+def translate_pattern(pattern: str) -> str:
+    """
+    Translate a gitignore pattern into a regular expression.
+
+    The expression matches paths relative to the directory containing the
+    ignore file, using "/" separators. Patterns without a slash match at any
+    depth; patterns containing one are anchored to the ignore file's
+    directory.
+
+    Args:
+        pattern: Pattern with negation and trailing slash already removed
+
+    Returns:
+        Regular expression source (without anchors)
+    """
+    anchored = "/" in pattern
+    if pattern.startswith("/"):
+        pattern = pattern[1:]
+
+    out: List[str] = [] if anchored else ["(?:.*/)?"]
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            j = i
+            while j < n and pattern[j] == "*":
+                j += 1
+            whole_segment = (i == 0 or pattern[i - 1] == "/") and (
+                j == n or pattern[j] == "/"
+            )
+            if j - i >= 2 and whole_segment:
+                if j == n:
+                    # Trailing "**" matches everything inside
+                    out.append(".*")
+                else:
+                    # Leading or inner "**/" matches zero or more directories
+                    out.append("(?:.*/)?")
+                    j += 1
+            else:
+                # Any other run of asterisks behaves like a single "*"
+                out.append("[^/]*")
+            i = j
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            bracket, consumed = _translate_bracket(pattern, i)
+            out.append(bracket)
+            i += consumed
+            continue
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return "".join(out)
+
+
+def _translate_bracket(pattern: str, start: int) -> Tuple[str, int]:
+    """Translate a bracket expression starting at pattern[start] == "["."""
+    i = start + 1
+    n = len(pattern)
+    negate = False
+    if i < n and pattern[i] in "!^":
+        negate = True
+        i += 1
+
+    parts: List[str] = []
+    first = True
+    while i < n and (pattern[i] != "]" or first):
+        first = False
+        if pattern.startswith("[:", i):
+            end = pattern.find(":]", i + 2)
+            if end != -1 and pattern[i + 2 : end] in _POSIX_CLASSES:
+                parts.append(_POSIX_CLASSES[pattern[i + 2 : end]])
+                i = end + 2
+                continue
+        c = pattern[i]
+        if c == "\\" and i + 1 < n:
+            c = pattern[i + 1]
+            i += 1
+        if i + 2 < n and pattern[i + 1] == "-" and pattern[i + 2] != "]":
+            high = pattern[i + 2]
+            if high == "\\" and i + 3 < n:
+                high = pattern[i + 3]
+                i += 1
+            parts.append(re.escape(c) + "-" + re.escape(high))
+            i += 3
+            continue
+        parts.append(re.escape(c))
+        i += 1
+
+    if i >= n:
+        # Unterminated bracket: treat "[" literally
+        return re.escape("["), 1
+
+    body = "".join(parts)
+    # Bracket expressions never match the path separator
+    return f"(?!/)[{'^' if negate else ''}{body}]", i + 1 - start
+
+
+class IgnoreRules:
+    """
+    Compiled patterns from a single ignore file.
+
+    All patterns are folded into one alternation, in reverse order, so the
+    first alternative that matches is the last matching pattern in the file,
+    which is the one git gives precedence to.
+    """
+
+    def __init__(self, base: str, lines: Iterable[str], source: str = ""):
+        """
+        Compile ignore patterns.
+
+        Args:
+            base: Directory containing the ignore file, relative to the root,
+                as "" or a prefix ending in "/"
+            lines: Lines of the ignore file
+            source: Name of the ignore file, for diagnostics
+        """
+        self.base = base
+        self.source = source
+        self.negated: Dict[str, bool] = {}
+
+        file_alternatives: List[str] = []
+        dir_alternatives: List[str] = []
+        rules = [parsed for parsed in map(parse_ignore_line, lines) if parsed]
+        for index in range(len(rules) - 1, -1, -1):
+            pattern, negate, directory_only = rules[index]
+            group = f"p{index}"
+            self.negated[group] = negate
+            alternative = f"(?P<{group}>{translate_pattern(pattern)})"
+            dir_alternatives.append(alternative)
+            if not directory_only:
+                file_alternatives.append(alternative)
+
+        self.pattern_count = len(rules)
+        self._file_regex = _compile(file_alternatives)
+        self._dir_regex = _compile(dir_alternatives)
+
+    @classmethod
+    def from_file(cls, file_path: str, base: str) -> Optional["IgnoreRules"]:
+        """
+        Load and compile an ignore file.
+
+        Args:
+            file_path: Path to the ignore file
+            base: Directory containing the ignore file, relative to the root
+
+        Returns:
+            IgnoreRules, or None if the file is missing, unreadable or empty
+        """
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if data.startswith(b"\xef\xbb\xbf"):
+            data = data[3:]
+        rules = cls(base, data.decode("utf-8", "surrogateescape").split("\n"))
+        rules.source = file_path
+        return rules if rules.pattern_count else None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a path against these rules.
+
+        Args:
+            path: Path relative to the scan root, using "/" separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if ignored, False if re-included by a negated pattern, or
+            None if no pattern matches
+        """
+        if self.base:
+            if not path.startswith(self.base):
+                return None
+            path = path[len(self.base) :]
+
+        regex = self._dir_regex if is_dir else self._file_regex
+        if regex is None:
+            return None
+        match = regex.fullmatch(path)
+        if match is None:
+            return None
+        return not self.negated[match.lastgroup]
+
+
+def _compile(alternatives: List[str]):
+    """Combine alternatives into one compiled expression, or None if empty."""
+    if not alternatives:
+        return None
+    return re.compile("|".join(alternatives), re.DOTALL)
+
+
+# Ordered ignore rules in effect for a directory, lowest precedence first
+RuleChain = Tuple[IgnoreRules, ...]
+
+
+class GitignoreMatcher:
+    """
+    Answers whether paths below a root directory are ignored.
+
+    Rules come from .git/info/exclude (lowest precedence), the root
+    .gitignore and the .gitignore of every directory between the root and
+    the path (deeper files take precedence). The rule chain for each
+    directory is built once and cached.
+    """
+
+    def __init__(self, root: Path):
+        """
+        Create a matcher for a directory tree.
+
+        Args:
+            root: Root directory of the tree
+        """
+        self.root = os.fspath(root)
+        base_rules = []
+        exclude_rules = IgnoreRules.from_file(
+            os.path.join(self.root, ".git", "info", "exclude"), ""
+        )
+        if exclude_rules is not None:
+            base_rules.append(exclude_rules)
+        root_rules = IgnoreRules.from_file(os.path.join(self.root, GITIGNORE_FILE), "")
+        if root_rules is not None:
+            base_rules.append(root_rules)
+        self._chains: Dict[str, RuleChain] = {"": tuple(base_rules)}
+
+    def chain_for(
+        self, directory: str, has_gitignore: Optional[bool] = None
+    ) -> RuleChain:
+        """
+        Get the rules in effect for paths directly inside a directory.
+
+        Args:
+            directory: Directory relative to the root, as "" or a prefix
+                ending in "/"
+            has_gitignore: Whether the directory contains a .gitignore, if
+                already known (avoids an extra filesystem check)
+
+        Returns:
+            Tuple of IgnoreRules, lowest precedence first
+        """
+        chain = self._chains.get(directory)
+        if chain is not None:
+            return chain
+
+        parent = directory[:-1].rpartition("/")[0]
+        parent_chain = self.chain_for(parent + "/" if parent else "")
+        rules = None
+        if has_gitignore is not False:
+            rules = IgnoreRules.from_file(
+                os.path.join(self.root, directory, GITIGNORE_FILE), directory
+            )
+        chain = parent_chain + (rules,) if rules is not None else parent_chain
+        self._chains[directory] = chain
+        return chain
+
+    @staticmethod
+    def match_chain(chain: Sequence[IgnoreRules], path: str, is_dir: bool) -> bool:
+        """
+        Check a single path against a rule chain, ignoring its ancestors.
+
+        Args:
+            chain: Rules from chain_for() for the path's directory
+            path: Path relative to the root, using "/" separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path itself is ignored
+        """
+        for rules in reversed(chain):
+            result = rules.match(path, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Check whether a path is ignored, including through its ancestors.
+
+        A path inside an ignored directory is always ignored, since git does
+        not descend into excluded directories to apply negated patterns.
+
+        Args:
+            path: Path relative to the root, using "/" separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path is ignored
+        """
+        parts = path.strip("/").split("/")
+        directory = ""
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            current = directory + part
+            chain = self.chain_for(directory)
+            if self.match_chain(chain, current, is_dir if last else True):
+                return True
+            directory = current + "/"
+        return False
@@ -6,8 +6,11 @@ This module provides functionality for creating and managing lore file templates
 It handles template population, file creation, and validation of lore content.
 """
 
+import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from dungeon_master.core.diagrams import DiagramCheck, check_diagram
 
 # Default template as defined in the PRD
 DEFAULT_TEMPLATE = """# Documentation for {filename}
@@ -97,6 +100,21 @@ DIAGRAM_PLACEHOLDERS = [
     "%% Replace with actual architecture relevant to this component",
 ]
 
+# Every placeholder in one alternation, so a single pass over a lore file
+# finds all of them
+PLACEHOLDER_REGEX = re.compile(
+    "|".join(re.escape(p) for p in REQUIRED_PLACEHOLDERS + DIAGRAM_PLACEHOLDERS)
+)
+
+# Sections a lore file must complete when no requiredSections are configured
+DEFAULT_REQUIRED_SECTIONS = ["Overview", "Functions/Components", "Diagrams"]
+
+# ATX heading ("## Title", optionally closed by #s)
+HEADING_REGEX = re.compile(r" {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+
+# Opening or closing line of a fenced code block
+FENCE_REGEX = re.compile(r" {0,3}(`{3,}|~{3,})")
+
 
 def get_default_template() -> str:
     """
@@ -137,6 +155,25 @@ def get_custom_template(template_path: Path) -> str:
         )
 
 
+def get_configured_template(config: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Get the template configured by customTemplatePath, for fingerprinting.
+
+    Args:
+        config: Optional configuration dictionary
+
+    Returns:
+        The custom template ("" if it cannot be read) or the default one
+    """
+    template_path = (config or {}).get("customTemplatePath")
+    if not template_path:
+        return DEFAULT_TEMPLATE
+    try:
+        return get_custom_template(Path(template_path))
+    except (OSError, UnicodeDecodeError):
+        return ""
+
+
 def populate_template(
     template: str,
     filename: str,
@@ -350,17 +387,220 @@ def is_template_file(file_path: Path) -> bool:
             f"Lore file {file_path} contains invalid UTF-8 encoding: {e.reason}",
         )
 
-    # Check for required placeholders that haven't been filled out
-    for placeholder in REQUIRED_PLACEHOLDERS:
-        if placeholder in content:
-            return True
+    return _is_template_content(content)
+
+
+def _is_template_content(content: str) -> bool:
+    """Check lore file content for unfilled template placeholders."""
+    return PLACEHOLDER_REGEX.search(content) is not None
+
+
+def find_placeholders(content: str) -> Set[str]:
+    """
+    Find the template placeholders left in lore file content in one pass.
+
+    Args:
+        content: Lore file content
+
+    Returns:
+        Set of the REQUIRED_PLACEHOLDERS and DIAGRAM_PLACEHOLDERS present
+    """
+    return set(PLACEHOLDER_REGEX.findall(content))
+
+
+class LoreSection:
+    """
+    One heading of a lore file and the extent of its section.
+
+    start and end are character offsets of the heading line and of the next
+    heading of the same or a higher level (or the end of the file); length
+    counts the non-whitespace characters of the section, subsections
+    included, outside HTML comments, headings and code fence lines.
+    """
+
+    __slots__ = ("level", "title", "start", "end", "length")
+
+    def __init__(self, level: int, title: str, start: int, end: int = 0, length=0):
+        self.level = level
+        self.title = title
+        self.start = start
+        self.end = end
+        self.length = length
+
+    def __repr__(self) -> str:
+        return f"LoreSection({self.level}, {self.title!r}, length={self.length})"
+
+
+class LoreOutline:
+    """
+    Section table, placeholders and diagram checks of a lore file, built by
+    index_sections().
+
+    Everything validation needs is in the table, so checks never look at the
+    text again, and the table can be cached by the content's hash.
+    """
+
+    __slots__ = ("sections", "placeholders", "diagrams")
+
+    def __init__(
+        self,
+        sections: List[LoreSection],
+        placeholders: Set[str],
+        diagrams: Optional[List[DiagramCheck]] = None,
+    ):
+        self.sections = sections
+        self.placeholders = placeholders
+        self.diagrams = diagrams or []
+
+    def find(self, name: str) -> Optional[LoreSection]:
+        """
+        Find the first section whose heading names the given section.
+
+        A heading matches when its title is the name or ends with it as a
+        separate word, ignoring case, so "Functions/Components" matches
+        "## Key Functions/Components".
+
+        Args:
+            name: Section name, as in the requiredSections setting
+
+        Returns:
+            The matching section, or None
+        """
+        name = name.strip().casefold()
+        for section in self.sections:
+            title = section.title.casefold()
+            if title == name or title.endswith(" " + name):
+                return section
+        return None
+
+    def to_json(self) -> Dict[str, Any]:
+        """Convert the outline into a JSON-serialisable dictionary."""
+        return {
+            "sections": [
+                [s.level, s.title, s.start, s.end, s.length] for s in self.sections
+            ],
+            "placeholders": sorted(self.placeholders),
+            "diagrams": [diagram.to_json() for diagram in self.diagrams],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "LoreOutline":
+        """Restore an outline saved with to_json()."""
+        return cls(
+            [LoreSection(*entry) for entry in data["sections"]],
+            set(data["placeholders"]),
+            [DiagramCheck.from_json(entry) for entry in data["diagrams"]],
+        )
+
 
-    # Check for diagram placeholders that haven't been replaced
-    for placeholder in DIAGRAM_PLACEHOLDERS:
-        if placeholder in content:
-            return True
+def index_sections(
+    content: str,
+    diagram_checker: Optional[Callable[[str], DiagramCheck]] = None,
+) -> LoreOutline:
+    """
+    Build the section table of lore file content in a single pass.
 
-    return False
+    Lines inside HTML comments and fenced code blocks never start a
+    section; comments do not count towards section lengths, code does.
+    Placeholders and mermaid code blocks are collected in the same pass.
+    Only ATX headings ("#") are recognised.
+
+    Args:
+        content: Lore file content
+        diagram_checker: Function checking the source of each mermaid block
+            (defaults to check_diagram())
+
+    Returns:
+        LoreOutline with every heading and diagram in document order
+    """
+    if diagram_checker is None:
+        diagram_checker = check_diagram
+    sections: List[LoreSection] = []
+    open_sections: List[LoreSection] = []
+    placeholders: Set[str] = set()
+    diagrams: List[DiagramCheck] = []
+    diagram_lines: Optional[List[str]] = None
+    in_comment = False
+    fence = None
+    offset = 0
+
+    def close(level: int) -> None:
+        """Close open sections of the given level or deeper at offset."""
+        while open_sections and open_sections[-1].level >= level:
+            section = open_sections.pop()
+            section.end = offset
+            if open_sections:
+                open_sections[-1].length += section.length
+
+    for line in content.splitlines(keepends=True):
+        placeholders.update(PLACEHOLDER_REGEX.findall(line))
+        length = 0
+
+        if fence is not None:
+            match = FENCE_REGEX.match(line)
+            if (
+                match
+                and match.group(1)[0] == fence[0]
+                and len(match.group(1)) >= len(fence)
+                and not line[match.end() :].strip()
+            ):
+                fence = None
+                if diagram_lines is not None:
+                    diagrams.append(diagram_checker("".join(diagram_lines)))
+                    diagram_lines = None
+            else:
+                length = len("".join(line.split()))
+                if diagram_lines is not None:
+                    diagram_lines.append(line)
+        else:
+            starts_in_comment = in_comment
+            visible, in_comment = _strip_comments(line, in_comment)
+            heading = None if starts_in_comment else HEADING_REGEX.match(visible)
+            fence_match = None if starts_in_comment else FENCE_REGEX.match(visible)
+            if heading is not None:
+                level = len(heading.group(1))
+                close(level)
+                section = LoreSection(level, (heading.group(2) or "").strip(), offset)
+                sections.append(section)
+                open_sections.append(section)
+            elif fence_match is not None:
+                fence = fence_match.group(1)
+                info = visible[fence_match.end() :].split()
+                if info and info[0].lower() == "mermaid":
+                    diagram_lines = []
+            else:
+                length = len("".join(visible.split()))
+
+        if open_sections:
+            open_sections[-1].length += length
+        offset += len(line)
+
+    close(1)
+    if diagram_lines is not None:
+        diagrams.append(diagram_checker("".join(diagram_lines)))
+    return LoreOutline(sections, placeholders, diagrams)
+
+
+def _strip_comments(line: str, in_comment: bool):
+    """Remove HTML comment text from a line; returns (text, still in comment)."""
+    visible = []
+    position = 0
+    while position < len(line):
+        if in_comment:
+            end = line.find("-->", position)
+            if end < 0:
+                break
+            position = end + 3
+            in_comment = False
+        else:
+            start = line.find("<!--", position)
+            if start < 0:
+                visible.append(line[position:])
+                break
+            visible.append(line[position:start])
+            position = start + 4
+            in_comment = True
+    return "".join(visible), in_comment
 
 
 def get_template_sections(file_path: Path) -> Dict[str, bool]:
@@ -391,53 +631,166 @@ def get_template_sections(file_path: Path) -> Dict[str, bool]:
             f"Lore file {file_path} contains invalid UTF-8 encoding: {e.reason}",
         )
 
+    return _get_content_sections(content)
+
+
+def _get_content_sections(
+    content: str, placeholders: Optional[Set[str]] = None
+) -> Dict[str, bool]:
+    """Report which template sections of lore file content are complete."""
+    if placeholders is None:
+        placeholders = find_placeholders(content)
     sections = {
-        "Overview": "[PLEASE FILL OUT: Overview]" not in content,
-        "Dependencies": "[PLEASE FILL OUT: Dependencies]" not in content,
+        "Overview": "[PLEASE FILL OUT: Overview]" not in placeholders,
+        "Dependencies": "[PLEASE FILL OUT: Dependencies]" not in placeholders,
         "Functions/Components": "[PLEASE FILL OUT: Functions/Components]"
-        not in content,
-        "Examples": "[PLEASE FILL OUT: Examples]" not in content,
-        "Diagrams": all(
-            placeholder not in content for placeholder in DIAGRAM_PLACEHOLDERS
-        ),
+        not in placeholders,
+        "Examples": "[PLEASE FILL OUT: Examples]" not in placeholders,
+        "Diagrams": placeholders.isdisjoint(DIAGRAM_PLACEHOLDERS),
     }
 
     return sections
 
 
-def validate_lore_file(file_path: Path) -> Dict[str, Any]:
+def validate_lore_file(file_path: Path, **rules: Any) -> Dict[str, Any]:
     """
     Validate a lore file and return detailed status information.
 
     Args:
         file_path: Path to the lore file to validate
+        **rules: Validation rules, see check_outline()
 
     Returns:
         Dictionary containing validation results:
         - is_template: Whether the file is still template-only
         - sections: Section completion status
         - missing_sections: List of sections that need completion
+        - section_problems: Why each incomplete required section fails
+        - diagram_problems: Problems found with the Mermaid diagrams
         - is_valid: Overall validation status
 
     Raises:
         FileNotFoundError: If the file doesn't exist
         UnicodeDecodeError: If the file contains invalid UTF-8
     """
-    sections = get_template_sections(file_path)
-    is_template = is_template_file(file_path)
+    if not file_path.exists():
+        raise FileNotFoundError(f"Lore file not found: {file_path}")
+
+    try:
+        content = file_path.read_text(encoding="utf-8")
+    except UnicodeDecodeError as e:
+        raise UnicodeDecodeError(
+            e.encoding,
+            e.object,
+            e.start,
+            e.end,
+            f"Lore file {file_path} contains invalid UTF-8 encoding: {e.reason}",
+        )
+
+    return validate_lore_content(content, file_path, **rules)
+
+
+def validate_lore_content(
+    content: str, file_path: Path, **rules: Any
+) -> Dict[str, Any]:
+    """
+    Validate lore file content that has already been read.
+
+    Applies the same checks as validate_lore_file() to content obtained
+    elsewhere, such as the staged version of a lore file. The content is
+    indexed in a single pass (see index_sections()).
+
+    Args:
+        content: Lore file content
+        file_path: Path the content belongs to (reported in the results)
+        **rules: Validation rules, see check_outline()
+
+    Returns:
+        Dictionary of validation results (see validate_lore_file())
+    """
+    return check_outline(index_sections(content), file_path, **rules)
+
+
+def check_outline(
+    outline: LoreOutline,
+    file_path: Path,
+    required_sections: Optional[Iterable[str]] = None,
+    min_section_length: int = 0,
+    require_diagrams: bool = False,
+    validate_diagram_content: bool = False,
+) -> Dict[str, Any]:
+    """
+    Validate a lore file from its section table alone.
+
+    A required section is complete when it has no placeholders left, its
+    heading exists and it holds at least min_section_length non-whitespace
+    characters. Diagram problems mark the Diagrams section incomplete.
+
+    Args:
+        outline: Section table from index_sections()
+        file_path: Path the outline belongs to (reported in the results)
+        required_sections: Sections that must be present and filled out
+            (defaults to DEFAULT_REQUIRED_SECTIONS)
+        min_section_length: Minimum non-whitespace characters of each
+            required section
+        require_diagrams: Require at least one Mermaid diagram (a valid one
+            when validate_diagram_content is set)
+        validate_diagram_content: Reject diagrams without nodes and edges
+            or still showing the template's example (see check_diagram())
+
+    Returns:
+        Dictionary of validation results (see validate_lore_file())
+    """
+    if required_sections is None:
+        required_sections = DEFAULT_REQUIRED_SECTIONS
+
+    sections = _get_content_sections("", outline.placeholders)
+    is_template = bool(outline.placeholders)
+
+    # File is considered valid if all required sections are complete
+    is_valid = True
+    section_problems = []
+    for name in required_sections:
+        section = outline.find(name)
+        if not sections.get(name, True):
+            section_problems.append(f"{name}: placeholder text left")
+        elif section is None:
+            section_problems.append(f"{name}: missing")
+        elif section.length < min_section_length:
+            section_problems.append(
+                f"{name}: {section.length} of {min_section_length} characters"
+            )
+        else:
+            sections[name] = True
+            continue
+        sections[name] = False
+        is_valid = False
+
+    diagram_problems = []
+    usable_diagrams = outline.diagrams
+    if validate_diagram_content:
+        for number, diagram in enumerate(outline.diagrams, 1):
+            if diagram.problem is not None:
+                diagram_problems.append(
+                    f"diagram {number} ({diagram.kind}): {diagram.problem}"
+                )
+        usable_diagrams = [d for d in outline.diagrams if d.problem is None]
+    if require_diagrams and not usable_diagrams:
+        diagram_problems.append("no Mermaid diagram")
+    if diagram_problems:
+        sections["Diagrams"] = False
+        is_valid = False
 
     missing_sections = [
         section for section, complete in sections.items() if not complete
     ]
 
-    # File is considered valid if all required sections are complete
-    required_sections = ["Overview", "Functions/Components", "Diagrams"]
-    is_valid = all(sections.get(section, False) for section in required_sections)
-
     return {
         "is_template": is_template,
         "sections": sections,
         "missing_sections": missing_sections,
+        "section_problems": section_problems,
+        "diagram_problems": diagram_problems,
         "is_valid": is_valid,
         "file_path": str(file_path),
     }
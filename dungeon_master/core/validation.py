@@ -1 +1,603 @@
 # track_lore("core/engine.md")
+"""
+Lore Validation Engine
+
+This module computes the status of the lore files referenced by a scan. Each
+lore file is read once - from the working tree, or from the git index for
+staged runs - indexed into a section table in a single pass, checked against
+the required sections and reported as a LoreStatus. dm validate and dm review
+both render these statuses, so a run computes each of them exactly once.
+Lore files can be checked by a thread pool, which mostly overlaps waiting on
+slow (e.g. network) file systems; statuses are still reported in order.
+
+Results are fingerprinted with the validation rules, the placeholders and
+the template. They are remembered per lore file by stat signature in
+dmcache.json, so unchanged lore files are not even read, and by content in
+the blob cache, so content seen in any worktree is not checked again.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dungeon_master.core.cache import (
+    CACHE_SCHEMA_VERSION,
+    BlobCache,
+    LoreResultIndex,
+    get_file_signature,
+    load_cache,
+    save_cache,
+)
+from dungeon_master.core.decorator_parser import resolve_scan_workers
+from dungeon_master.core.diagrams import DiagramCheck, check_diagram
+from dungeon_master.core.git_utils import GitBlobReader, get_staged_entries, hash_blob
+from dungeon_master.core.template import (
+    DEFAULT_REQUIRED_SECTIONS,
+    DIAGRAM_PLACEHOLDERS,
+    REQUIRED_PLACEHOLDERS,
+    LoreOutline,
+    check_outline,
+    get_configured_template,
+    index_sections,
+)
+
+# Blob cache namespace of lore file section tables
+LORE_OUTLINE_KIND = "outline"
+
+# Blob cache namespace of lore file validation results, keyed by content
+LORE_RESULT_KIND = "lore"
+
+# Blob cache namespace of Mermaid diagram checks, keyed by code block
+DIAGRAM_KIND = "mermaid"
+
+# Lore file checks queued per validation worker
+VALIDATION_WINDOW_PER_WORKER = 4
+
+
+def get_rules_fingerprint(rules: Dict[str, Any], template: str) -> str:
+    """
+    Digest everything besides a lore file's content that decides its results.
+
+    Args:
+        rules: Validation rules (keyword arguments of check_outline())
+        template: Lore template in effect
+
+    Returns:
+        Hex digest of the rules, the placeholders, the template and the
+        cache schema version
+    """
+    digest = hashlib.sha256()
+    for part in (
+        json.dumps(rules, sort_keys=True, default=list),
+        json.dumps(REQUIRED_PLACEHOLDERS + DIAGRAM_PLACEHOLDERS),
+        template,
+        str(CACHE_SCHEMA_VERSION),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def resolve_validation_workers(workers: int, lore_files: Optional[int] = None) -> int:
+    """
+    Turn a validationWorkers setting into a concrete worker count.
+
+    Args:
+        workers: Requested worker count; 0 selects a count automatically
+            (as for an I/O-bound scan)
+        lore_files: Number of lore files to check, when known up front; the
+            pool never gets more workers than that, so small change sets
+            (such as a scoped pre-commit run) are checked with a small pool
+            or serially
+
+    Returns:
+        Number of workers to use (at least 1)
+    """
+    workers = resolve_scan_workers(workers, "thread")
+    if lore_files is not None:
+        workers = min(workers, lore_files)
+    return max(1, workers)
+
+
+class LoreStatus:
+    """
+    Validation status of one lore file.
+
+    state is MISSING, TEMPLATE (placeholders left), INCOMPLETE (required
+    sections missing or too short, or diagram problems) or VALID; problems
+    says why a file is incomplete. tracked_files lists the source files that
+    reference the lore file; during a streaming scan the list keeps growing
+    after the status has been reported.
+    """
+
+    MISSING = "missing"
+    TEMPLATE = "template"
+    INCOMPLETE = "incomplete"
+    VALID = "valid"
+
+    __slots__ = (
+        "lore_path",
+        "tracked_files",
+        "state",
+        "sections",
+        "missing_sections",
+        "section_problems",
+        "diagram_problems",
+    )
+
+    def __init__(
+        self,
+        lore_path: str,
+        tracked_files: List[str],
+        state: str,
+        sections: Optional[Dict[str, bool]] = None,
+        missing_sections: Optional[List[str]] = None,
+        section_problems: Optional[List[str]] = None,
+        diagram_problems: Optional[List[str]] = None,
+    ):
+        self.lore_path = lore_path
+        self.tracked_files = tracked_files
+        self.state = state
+        self.sections = sections or {}
+        self.missing_sections = missing_sections or []
+        self.section_problems = section_problems or []
+        self.diagram_problems = diagram_problems or []
+
+    @classmethod
+    def from_validation(
+        cls, lore_path: str, tracked_files: List[str], validation: Dict[str, Any]
+    ) -> "LoreStatus":
+        """
+        Build the status of an existing lore file from its validation results.
+
+        Args:
+            lore_path: Lore file path as written in decorators
+            tracked_files: Source files referencing it
+            validation: Results of check_outline()
+
+        Returns:
+            LoreStatus instance
+        """
+        if validation["is_template"]:
+            state = cls.TEMPLATE
+        elif not validation["is_valid"]:
+            state = cls.INCOMPLETE
+        else:
+            state = cls.VALID
+        return cls(
+            lore_path,
+            tracked_files,
+            state,
+            validation["sections"],
+            validation["missing_sections"],
+            validation.get("section_problems"),
+            validation.get("diagram_problems"),
+        )
+
+    @property
+    def exists(self) -> bool:
+        """Whether the lore file exists."""
+        return self.state != self.MISSING
+
+    @property
+    def is_problem(self) -> bool:
+        """Whether the lore file blocks a commit."""
+        return self.state != self.VALID
+
+    @property
+    def problems(self) -> List[str]:
+        """Section and diagram problems making the lore file incomplete."""
+        return self.section_problems + self.diagram_problems
+
+    def __repr__(self) -> str:
+        return f"LoreStatus({self.lore_path!r}, {self.state!r})"
+
+
+class StagedLore:
+    """
+    Read lore files as staged in the git index.
+
+    Lore file contents come from their staged blobs, read through the same
+    GitBlobReader as the staged source files.
+    """
+
+    def __init__(self, lore_root: str, blob_reader: GitBlobReader):
+        """
+        Look up the staged lore files.
+
+        Args:
+            lore_root: Lore directory
+            blob_reader: Reader for the staged blobs
+
+        Raises:
+            ValueError: Outside a git work tree
+        """
+        self.prefix = Path(os.path.normpath(lore_root)).as_posix() + "/"
+        self.entries = get_staged_entries(paths=[self.prefix])
+        if self.entries is None:
+            raise ValueError("--staged needs a git work tree")
+        self.reader = blob_reader
+
+    def exists(self, lore_file_path: str) -> bool:
+        """Check whether a lore file is staged."""
+        return self._key(lore_file_path) in self.entries
+
+    def oid(self, lore_file_path: str) -> Optional[str]:
+        """Get the blob id of a staged lore file (None if it is not staged)."""
+        return self.entries.get(self._key(lore_file_path))
+
+    def read(self, lore_file_path: str) -> Optional[bytes]:
+        """
+        Read a staged lore file.
+
+        Args:
+            lore_file_path: Lore file path as written in decorators
+
+        Returns:
+            Staged content, or None if the lore file is not staged
+        """
+        oid = self.oid(lore_file_path)
+        if oid is None:
+            return None
+        return self.reader.read(oid)[1]
+
+    def _key(self, lore_file_path: str) -> str:
+        return Path(os.path.normpath(self.prefix + lore_file_path)).as_posix()
+
+
+def index_lore(
+    data: bytes, blob_cache: Optional[BlobCache] = None, oid: Optional[str] = None
+) -> LoreOutline:
+    """
+    Index lore file content, reusing the section table recorded for it.
+
+    Section tables are kept in the blob cache by the blob id of the content,
+    so a lore file indexed in any worktree or on any branch of the clone is
+    not parsed again. They do not depend on the configured rules, so
+    changing requiredSections or minSectionLength keeps them valid. When a
+    lore file did change, its Mermaid diagrams are still looked up by the
+    blob id of each code block, so only edited diagrams are checked again.
+
+    Args:
+        data: Lore file content
+        blob_cache: Cache of section tables keyed by blob id
+        oid: Blob id of the content, if already known
+
+    Returns:
+        LoreOutline of the content
+
+    Raises:
+        UnicodeDecodeError: If the content is not valid UTF-8
+    """
+    if blob_cache is None:
+        return index_sections(data.decode("utf-8"))
+
+    if oid is None:
+        oid = hash_blob(data)
+    version = str(CACHE_SCHEMA_VERSION)
+    cached = blob_cache.get(LORE_OUTLINE_KIND, version, oid)
+    if isinstance(cached, dict):
+        try:
+            return LoreOutline.from_json(cached)
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    def check_cached_diagram(source: str) -> DiagramCheck:
+        diagram_oid = hash_blob(source.encode("utf-8"))
+        cached = blob_cache.get(DIAGRAM_KIND, version, diagram_oid)
+        if isinstance(cached, list):
+            try:
+                return DiagramCheck.from_json(cached)
+            except TypeError:
+                pass
+        diagram = check_diagram(source)
+        blob_cache.put(DIAGRAM_KIND, version, diagram_oid, diagram.to_json())
+        return diagram
+
+    outline = index_sections(data.decode("utf-8"), check_cached_diagram)
+    blob_cache.put(LORE_OUTLINE_KIND, version, oid, outline.to_json())
+    return outline
+
+
+def validate_lore(
+    full_path: Path, data: bytes, blob_cache: Optional[BlobCache] = None, **rules: Any
+) -> Dict[str, Any]:
+    """
+    Validate lore file content against the configured rules.
+
+    Args:
+        full_path: Path the content belongs to (reported in the results)
+        data: Lore file content
+        blob_cache: Cache of section tables and diagram checks
+        **rules: Validation rules, see check_outline()
+
+    Returns:
+        Validation results (see check_outline())
+
+    Raises:
+        UnicodeDecodeError: If the content is not valid UTF-8
+    """
+    return check_outline(index_lore(data, blob_cache), full_path, **rules)
+
+
+class LoreValidator:
+    """
+    Compute lore file statuses for one run.
+
+    Each lore file is read and validated once, the first time its status is
+    asked for; later requests return the same LoreStatus. Results recorded
+    by earlier runs are reused: from the lore result index (load_results())
+    for unchanged working tree files, and from the blob cache by content.
+    """
+
+    def __init__(
+        self,
+        lore_root: str,
+        staged: Optional[StagedLore] = None,
+        blob_cache: Optional[BlobCache] = None,
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Set up a validator; nothing is read until a status is asked for.
+
+        Args:
+            lore_root: Lore directory
+            staged: Check lore files as staged instead of the working tree
+            blob_cache: Reuse results and section tables of content seen
+                before
+            config: Configuration providing requiredSections,
+                minSectionLength, requireDiagrams, validateDiagramContent
+                and customTemplatePath (defaults: the template's required
+                sections, no minimum length, no diagram checks)
+        """
+        config = config or {}
+        self.lore_root = lore_root
+        self.staged = staged
+        self.blob_cache = blob_cache
+        self.rules = {
+            "required_sections": config.get(
+                "requiredSections", DEFAULT_REQUIRED_SECTIONS
+            ),
+            "min_section_length": config.get("minSectionLength", 0),
+            "require_diagrams": config.get("requireDiagrams", False),
+            "validate_diagram_content": config.get("validateDiagramContent", False),
+        }
+        self.fingerprint = get_rules_fingerprint(
+            self.rules, get_configured_template(config)
+        )
+        self.results: Optional[LoreResultIndex] = None
+        self.results_path: Optional[Path] = None
+        self.started_ns = time.time_ns()
+        self.statuses: Dict[str, LoreStatus] = {}
+
+    def load_results(self, cache_path: Optional[Path]) -> None:
+        """
+        Reuse the results recorded for unchanged lore files by earlier runs.
+
+        Only working tree runs use the index; it is bound to the lore
+        directory and the rule fingerprint.
+
+        Args:
+            cache_path: Cache file (see get_cache_path()); None disables it
+        """
+        if cache_path is None or self.staged is not None:
+            return
+        self.results_path = cache_path
+        self.results = LoreResultIndex.from_cache(
+            load_cache(cache_path),
+            str(Path(self.lore_root).resolve()),
+            self.fingerprint,
+        )
+
+    def save_results(self) -> bool:
+        """
+        Persist the lore result index if this run changed it.
+
+        Returns:
+            True if the index was saved or had nothing new, False if it
+            could not be written
+        """
+        if self.results is None or not self.results.dirty:
+            return True
+        cache = load_cache(self.results_path)
+        self.results.to_cache(cache, self.started_ns)
+        return save_cache(cache, self.results_path)
+
+    def exists(self, lore_path: str) -> bool:
+        """Check whether a lore file exists (is staged, for staged runs)."""
+        status = self.statuses.get(lore_path)
+        if status is not None:
+            return status.exists
+        if self.staged is not None:
+            return self.staged.exists(lore_path)
+        return (Path(self.lore_root) / lore_path).exists()
+
+    def check(self, lore_path: str, tracked_files: List[str]) -> LoreStatus:
+        """
+        Get the status of a lore file.
+
+        Args:
+            lore_path: Lore file path as written in decorators
+            tracked_files: Source files referencing it
+
+        Returns:
+            LoreStatus of the lore file
+
+        Raises:
+            UnicodeDecodeError: If the lore file is not valid UTF-8
+        """
+        status = self.statuses.get(lore_path)
+        if status is not None:
+            return status
+
+        full_path = Path(self.lore_root) / lore_path
+        if self.staged is not None:
+            validation = self._validate_staged(lore_path, full_path)
+        else:
+            validation = self._validate_file(lore_path, full_path)
+
+        if validation is None:
+            status = LoreStatus(lore_path, tracked_files, LoreStatus.MISSING)
+        else:
+            status = LoreStatus.from_validation(lore_path, tracked_files, validation)
+        self.statuses[lore_path] = status
+        return status
+
+    def _validate_staged(
+        self, lore_path: str, full_path: Path
+    ) -> Optional[Dict[str, Any]]:
+        """Validate a staged lore file; the blob id is known without reading."""
+        oid = self.staged.oid(lore_path)
+        if oid is None:
+            return None
+        validation = self._get_result(oid)
+        if validation is None:
+            data = self.staged.reader.read(oid)[1]
+            if data is None:
+                return None
+            validation = self._validate_content(data, oid)
+        return dict(validation, file_path=str(full_path))
+
+    def _validate_file(
+        self, lore_path: str, full_path: Path
+    ) -> Optional[Dict[str, Any]]:
+        """Validate a working tree lore file, skipping the read if unchanged."""
+        try:
+            signature = get_file_signature(os.stat(full_path))
+        except (FileNotFoundError, NotADirectoryError):
+            if self.results is not None:
+                self.results.discard(lore_path)
+            return None
+
+        validation = None
+        if self.results is not None:
+            validation = self.results.lookup(lore_path, signature)
+        if validation is None:
+            try:
+                data = full_path.read_bytes()
+            except (FileNotFoundError, NotADirectoryError):
+                return None
+            oid = hash_blob(data)
+            validation = self._get_result(oid)
+            if validation is None:
+                validation = self._validate_content(data, oid)
+            if self.results is not None:
+                self.results.store(lore_path, signature, oid, validation)
+        return dict(validation, file_path=str(full_path))
+
+    def _get_result(self, oid: str) -> Optional[Dict[str, Any]]:
+        """Look up the results recorded for content under the current rules."""
+        if self.blob_cache is None:
+            return None
+        validation = self.blob_cache.get(LORE_RESULT_KIND, self.fingerprint, oid)
+        return validation if isinstance(validation, dict) else None
+
+    def _validate_content(self, data: bytes, oid: str) -> Dict[str, Any]:
+        """Check content and record the results (without the file path)."""
+        outline = index_lore(data, self.blob_cache, oid)
+        validation = check_outline(outline, Path(), **self.rules)
+        del validation["file_path"]
+        if self.blob_cache is not None:
+            self.blob_cache.put(LORE_RESULT_KIND, self.fingerprint, oid, validation)
+        return validation
+
+    def check_each(
+        self, lore_files: Iterable[Tuple[str, List[str]]], workers: int = 1
+    ) -> Iterator[LoreStatus]:
+        """
+        Check lore files, optionally in a thread pool.
+
+        With more than one worker, at most VALIDATION_WINDOW_PER_WORKER
+        checks per worker are queued, and statuses are released strictly in
+        input order, so the output matches a serial run exactly. Closing the
+        iterator early cancels the queued checks.
+
+        Args:
+            lore_files: (lore_path, tracked_files) pairs
+            workers: Number of workers (1 checks serially in the calling
+                thread)
+
+        Yields:
+            The LoreStatus of each lore file, in input order
+        """
+        if workers <= 1:
+            for lore_path, tracked_files in lore_files:
+                yield self.check(lore_path, tracked_files)
+            return
+
+        window_size = workers * VALIDATION_WINDOW_PER_WORKER
+        window = deque()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                for lore_path, tracked_files in lore_files:
+                    window.append(pool.submit(self.check, lore_path, tracked_files))
+                    while window and (len(window) > window_size or window[0].done()):
+                        yield window.popleft().result()
+                while window:
+                    yield window.popleft().result()
+            finally:
+                for future in window:
+                    future.cancel()
+
+    def iter_statuses(
+        self,
+        decorators: Iterable[Tuple[str, str]],
+        mapping: Dict[str, List[str]],
+        workers: int = 1,
+    ) -> Iterator[LoreStatus]:
+        """
+        Check lore files as a streaming scan first references them.
+
+        Args:
+            decorators: (source_path, lore_path) pairs, e.g. from
+                iter_lore_decorators()
+            mapping: Dictionary filled with lore path -> referencing sources
+            workers: Number of lore files checked concurrently (see
+                check_each())
+
+        Yields:
+            The LoreStatus of each lore file, in order of first reference
+        """
+
+        def first_references() -> Iterator[Tuple[str, List[str]]]:
+            for source_path, lore_path in decorators:
+                tracked_files = mapping.get(lore_path)
+                if tracked_files is not None:
+                    tracked_files.append(source_path)
+                    continue
+                tracked_files = mapping[lore_path] = [source_path]
+                yield lore_path, tracked_files
+
+        return self.check_each(first_references(), workers)
+
+    def find_updates(
+        self, mapping: Dict[str, List[str]], changed_files: Iterable[str]
+    ) -> List[Tuple[str, List[str], bool]]:
+        """
+        Find existing lore files whose tracked source files changed.
+
+        Args:
+            mapping: Lore path -> referencing source files
+            changed_files: Changed paths relative to the repository root
+
+        Returns:
+            (lore path, changed sources, whether the lore file changed as
+            well) tuples in mapping order
+        """
+        changed_files = set(changed_files)
+        updates = []
+        if not changed_files:
+            return updates
+        for lore_path, tracked_files in mapping.items():
+            changed_tracked = [f for f in tracked_files if f in changed_files]
+            if changed_tracked and self.exists(lore_path):
+                lore_relative = str(Path(self.lore_root) / lore_path)
+                updates.append(
+                    (lore_path, changed_tracked, lore_relative in changed_files)
+                )
+        return updates
@@ -6,6 +6,7 @@ This module provides functionality to load, save, and manage configuration
 for Dungeon Master using dmconfig.json with sensible defaults and validation.
 """
 
+import hashlib
 import json
 import os
 import sys
@@ -31,11 +32,24 @@ DEFAULT_CONFIG = {
     "minSectionLength": 50,
     "validatePlaceholders": True,
     "validateDiagramContent": True,
+    "validationWorkers": 0,  # Lore files checked in parallel (0 = automatic)
     "allowEmptyExamples": False,
     # Directory settings
     "cursorRulesDirectory": ".cursor/rules",
     "cacheFile": "dmcache.json",
     "configFile": "dmconfig.json",
+    # Scanning settings
+    "scanBackend": "git",  # "git" (filesystem fallback), "git-grep" or "filesystem"
+    "grepUntracked": True,  # The "git-grep" backend also searches untracked files
+    "respectGitignore": True,  # Honour .gitignore files when walking the filesystem
+    "scanWorkers": 1,  # Parallel decorator extraction workers (0 = automatic)
+    "scanExecutor": "thread",  # "thread" (I/O-bound) or "process" (CPU-bound)
+    "decoratorScanMode": "full",  # "full" or "header" (only the start of each file)
+    "headerScanBytes": 8192,  # Bytes read per file in header mode
+    "headerScanLines": 100,  # Lines searched per file in header mode (0 = no limit)
+    "blobCacheEntries": 100000,  # Results shared by all worktrees, by blob id (0 = off)
+    # Daemon settings
+    "daemonPollInterval": 5,  # Seconds between background refreshes (0 = off)
     # Exclusion patterns
     "excludedDirectories": [
         ".git",
@@ -85,6 +99,13 @@ DEFAULT_CONFIG = {
 # Configuration file name
 CONFIG_FILE = "dmconfig.json"
 
+# Allowed values for settings that select between implementations
+CHOICE_SETTINGS = {
+    "scanBackend": ["git", "git-grep", "filesystem"],
+    "scanExecutor": ["thread", "process"],
+    "decoratorScanMode": ["full", "header"],
+}
+
 
 class ConfigurationError(Exception):
     """Raised when there's an error with configuration loading or validation."""
@@ -156,20 +177,37 @@ def load_config(
                         "enforceDocumentation",
                         "validateOnCommit",
                         "requireDiagrams",
+                        "respectGitignore",
+                        "grepUntracked",
                     ]:
                         if not isinstance(value, bool):
                             invalid_keys.append(f"{key} must be a boolean")
                             continue
-                    elif key in ["minSectionLength", "maxFileSize"]:
+                    elif key in [
+                        "minSectionLength",
+                        "maxFileSize",
+                        "scanWorkers",
+                        "headerScanBytes",
+                        "headerScanLines",
+                        "blobCacheEntries",
+                        "daemonPollInterval",
+                        "validationWorkers",
+                    ]:
                         if not isinstance(value, int) or value < 0:
                             invalid_keys.append(f"{key} must be a non-negative integer")
                             continue
+                    elif key in CHOICE_SETTINGS:
+                        if value not in CHOICE_SETTINGS[key]:
+                            choices = ", ".join(CHOICE_SETTINGS[key])
+                            invalid_keys.append(f"{key} must be one of: {choices}")
+                            continue
 
                     config[key] = value
                 else:
                     if verbose:
                         console.print(
-                            f"  [yellow]Warning: Unknown config key '{key}' ignored[/yellow]"
+                            f"  [yellow]Warning: Unknown config key '{key}' "
+                            "ignored[/yellow]"
                         )
 
             if invalid_keys:
@@ -301,6 +339,12 @@ def validate_config(config: Dict[str, Any]) -> List[str]:
     numeric_settings = {
         "minSectionLength": (0, 10000),
         "maxFileSize": (1024, 1073741824),  # 1KB to 1GB
+        "scanWorkers": (0, 256),
+        "headerScanBytes": (256, 10485760),
+        "headerScanLines": (0, 1000000),
+        "blobCacheEntries": (0, 100000000),
+        "daemonPollInterval": (0, 3600),
+        "validationWorkers": (0, 256),
     }
 
     for key, (min_val, max_val) in numeric_settings.items():
@@ -318,11 +362,22 @@ def validate_config(config: Dict[str, Any]) -> List[str]:
             errors.append(f"{key} must be a list")
 
     # Validate boolean settings
-    bool_settings = ["enforceDocumentation", "validateOnCommit", "requireDiagrams"]
+    bool_settings = [
+        "enforceDocumentation",
+        "validateOnCommit",
+        "requireDiagrams",
+        "respectGitignore",
+        "grepUntracked",
+    ]
     for key in bool_settings:
         if key in config and not isinstance(config[key], bool):
             errors.append(f"{key} must be a boolean")
 
+    # Validate choice settings
+    for key, choices in CHOICE_SETTINGS.items():
+        if key in config and config[key] not in choices:
+            errors.append(f"{key} must be one of: {', '.join(choices)}")
+
     return errors
 
 
@@ -443,6 +498,23 @@ def merge_config_with_args(config: Dict[str, Any], **kwargs) -> Dict[str, Any]:
     return merged_config
 
 
+def get_config_fingerprint(config: Dict[str, Any]) -> str:
+    """
+    Get a stable digest of a configuration.
+
+    Used to tell whether results recorded under one configuration can be
+    reused under another.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Hex digest that changes whenever any setting changes
+    """
+    encoded = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
 def is_test_environment() -> bool:
     """
     Detect if running in test environment.
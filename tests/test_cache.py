@@ -0,0 +1,337 @@
+"""
+Unit tests for dmcache.json persistence, the scan and lore indexes and the
+blob cache.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from dungeon_master.core.cache import (
+    BLOB_CACHE_FILE,
+    BLOB_INDEX_GENERATIONS,
+    SCAN_INDEX_VERSION,
+    BlobCache,
+    BlobIndex,
+    LoreIndex,
+    LoreResultIndex,
+    ScanIndex,
+    enable_memory_cache,
+    get_cache_path,
+    get_file_signature,
+    load_cache,
+    save_cache,
+)
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for cache files."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir)
+
+
+class TestCacheFile:
+    """Test loading and saving the cache document."""
+
+    def test_get_cache_path(self, temp_dir):
+        """Test cache path resolution from config."""
+        assert get_cache_path() == Path("dmcache.json")
+        assert get_cache_path({"cacheFile": "custom.json"}, temp_dir) == (
+            temp_dir / "custom.json"
+        )
+        assert get_cache_path({"cacheFile": None}) is None
+
+    def test_load_missing_cache(self, temp_dir):
+        """Test that a missing cache loads as empty."""
+        assert load_cache(temp_dir / "dmcache.json") == {}
+
+    def test_load_corrupt_cache(self, temp_dir):
+        """Test that a corrupt cache loads as empty."""
+        cache_path = temp_dir / "dmcache.json"
+        cache_path.write_text("{not json")
+        assert load_cache(cache_path) == {}
+
+        cache_path.write_text("[1, 2, 3]")
+        assert load_cache(cache_path) == {}
+
+    def test_save_and_load_roundtrip(self, temp_dir):
+        """Test saving preserves unrelated keys and leaves no temp files."""
+        cache_path = temp_dir / "dmcache.json"
+        cache = {"lastValidation": None, "reviewedFiles": {}}
+
+        assert save_cache(cache, cache_path) is True
+        assert load_cache(cache_path) == cache
+        assert [p.name for p in temp_dir.iterdir()] == ["dmcache.json"]
+
+    def test_memory_cache(self, temp_dir):
+        """Test documents stay in memory until another process saves."""
+        cache_path = temp_dir / "dmcache.json"
+        save_cache({"a": 1}, cache_path)
+
+        enable_memory_cache()
+        try:
+            first = load_cache(cache_path)
+            assert load_cache(cache_path) is first
+
+            first["a"] = 2
+            assert save_cache(first, cache_path)
+            assert load_cache(cache_path) is first
+
+            # Replaced behind our back: the new content is read
+            cache_path.with_name("other.json").write_text('{"a": 3}')
+            os.replace(cache_path.with_name("other.json"), cache_path)
+            assert load_cache(cache_path) == {"a": 3}
+        finally:
+            enable_memory_cache(False)
+
+
+class TestScanIndex:
+    """Test the stat-signature keyed scan index."""
+
+    def test_lookup_hit_and_miss(self):
+        """Test entries are reused only for identical signatures."""
+        index = ScanIndex("/repo", scanned_at_ns=1000)
+        index.files["a.py"] = [500, 10, 1, ["a.md"]]
+
+        assert index.lookup("a.py", (500, 10, 1)) == ["a.md"]
+        assert index.lookup("a.py", (600, 10, 1)) is None
+        assert index.lookup("a.py", (500, 11, 1)) is None
+        assert index.lookup("a.py", (500, 10, 2)) is None
+        assert index.lookup("b.py", (500, 10, 1)) is None
+        assert index.hits == 1
+        assert index.misses == 4
+
+    def test_racy_entries_are_reparsed(self):
+        """Test files modified at or after the previous scan are not trusted."""
+        index = ScanIndex("/repo", scanned_at_ns=1000)
+        index.files["a.py"] = [1000, 10, 1, ["a.md"]]
+
+        assert index.lookup("a.py", (1000, 10, 1)) is None
+
+    def test_malformed_entries_are_reparsed(self):
+        """Test hand-edited or corrupt entries count as misses."""
+        index = ScanIndex("/repo", scanned_at_ns=1000)
+        for entry in ([500, 10], None, "a.md", [500, 10, 1, "a.md"], {"a": 1}):
+            index.files["a.py"] = entry
+            assert index.lookup("a.py", (500, 10, 1)) is None
+        assert index.misses == 5
+
+    def test_prune_removes_unseen_files(self):
+        """Test entries for deleted files are dropped."""
+        index = ScanIndex("/repo", scanned_at_ns=1000)
+        index.files["kept.py"] = [1, 1, 1, []]
+        index.files["deleted.py"] = [1, 1, 1, ["gone.md"]]
+
+        index.lookup("kept.py", (1, 1, 1))
+        assert index.prune() == 1
+        assert list(index.files) == ["kept.py"]
+        assert index.dirty is True
+
+    def test_cache_roundtrip(self):
+        """Test the index survives a round trip through the cache document."""
+        index = ScanIndex("/repo", parser="1")
+        index.store("a.py", (5, 6, 7), ["a.md"])
+        cache = {}
+        index.to_cache(cache, 2000)
+
+        restored = ScanIndex.from_cache(json.loads(json.dumps(cache)), "/repo", "1")
+        assert restored.scanned_at_ns == 2000
+        assert restored.lookup("a.py", (5, 6, 7)) == ["a.md"]
+        assert cache["scanIndex"]["version"] == SCAN_INDEX_VERSION
+
+    def test_mismatched_index_is_discarded(self):
+        """Test indexes for other roots or parser settings are ignored."""
+        index = ScanIndex("/repo", parser="1")
+        index.store("a.py", (5, 6, 7), ["a.md"])
+        cache = {}
+        index.to_cache(cache, 2000)
+
+        assert ScanIndex.from_cache(cache, "/other", "1").files == {}
+        assert ScanIndex.from_cache(cache, "/repo", "2").files == {}
+
+    def test_get_file_signature(self, temp_dir):
+        """Test signatures come from the stat result."""
+        file_path = temp_dir / "a.py"
+        file_path.write_text("x = 1\n")
+        stat_result = os.stat(file_path)
+
+        assert get_file_signature(stat_result) == (
+            stat_result.st_mtime_ns,
+            stat_result.st_size,
+            stat_result.st_ino,
+        )
+
+
+class TestLoreResultIndex:
+    """Test the stat-signature keyed lore result index."""
+
+    def test_lookup_roundtrip_and_invalidation(self):
+        """Test results are reused for unchanged files under the same rules."""
+        index = LoreResultIndex("/repo/.lore", "rules-1")
+        index.store("a.md", (5, 6, 7), "abc", {"is_valid": True})
+        cache = {}
+        index.to_cache(cache, 2000)
+
+        restored = LoreResultIndex.from_cache(
+            json.loads(json.dumps(cache)), "/repo/.lore", "rules-1"
+        )
+        assert restored.lookup("a.md", (5, 6, 7)) == {"is_valid": True}
+        assert restored.lookup("a.md", (5, 7, 7)) is None
+        assert restored.hits == 1
+
+        # Files modified during the recording run are not trusted
+        restored.store("b.md", (2000, 1, 1), "def", {"is_valid": False})
+        assert restored.lookup("b.md", (2000, 1, 1)) is None
+
+        restored.discard("a.md")
+        assert "a.md" not in restored.files
+        assert restored.dirty is True
+
+        assert LoreResultIndex.from_cache(cache, "/repo/.lore", "rules-2").files == {}
+        assert LoreResultIndex.from_cache(cache, "/other/.lore", "rules-1").files == {}
+
+    def test_malformed_entries_are_rechecked(self):
+        """Test hand-edited or corrupt entries count as misses."""
+        index = LoreResultIndex("/repo/.lore", "rules-1", checked_at_ns=2000)
+        for entry in ([5, 6, 7], 5, [5, 6, 7, "abc", "valid"], [5, 6, 7, "abc"]):
+            index.files["a.md"] = entry
+            assert index.lookup("a.md", (5, 6, 7)) is None
+        assert index.hits == 0
+
+
+class TestBlobIndex:
+    """Test the blob id keyed scan results."""
+
+    def test_malformed_entries_are_dropped(self):
+        """Test corrupt blob entries are parsed again."""
+        index = BlobIndex("1")
+        index.store("b1", ["a.md"])
+        index.store("b2", ["b.md"])
+        cache = {"treeIndex": {}}
+        index.to_cache(cache)
+        assert "treeIndex" not in cache
+        cache["blobIndex"]["blobs"]["b2"][1] = "b.md"
+        cache["blobIndex"]["blobs"]["b3"] = [1]
+        cache["blobIndex"]["blobs"]["b4"] = {"a.py": ["a.md"]}
+
+        restored = BlobIndex.from_cache(json.loads(json.dumps(cache)), "1")
+        assert sorted(restored.blobs) == ["b1"]
+        assert restored.lookup("b1") == ["a.md"]
+        assert restored.lookup("b2") is None
+        assert restored.hits == 1
+
+    def test_unused_blobs_are_dropped(self):
+        """Test results unused for BLOB_INDEX_GENERATIONS updates expire."""
+        index = BlobIndex("1")
+        index.store("old", ["old.md"])
+        cache = {}
+        for generation in range(BLOB_INDEX_GENERATIONS + 1):
+            index.store(f"new{generation}", [])
+            index.to_cache(cache)
+        blobs = cache["blobIndex"]["blobs"]
+        assert "old" not in blobs and "new0" not in blobs
+        assert f"new{BLOB_INDEX_GENERATIONS}" in blobs
+
+
+class TestLoreIndex:
+    """Test the bidirectional lore index."""
+
+    MAPPING = {
+        "api.md": ["src/api.py", "src/shared.py"],
+        "db.md": ["src/shared.py", "src/db.py"],
+    }
+
+    def test_lookups_in_both_directions(self):
+        """Test lore -> sources and source -> lore lookups."""
+        index = LoreIndex(self.MAPPING)
+        assert index.sources_for("db.md") == ["src/shared.py", "src/db.py"]
+        assert index.lore_for("src/shared.py") == ["api.md", "db.md"]
+        assert index.lore_for("src/missing.py") == []
+        assert index.sources_for("missing.md") == []
+
+    def test_cache_roundtrip(self):
+        """Test persisting and restoring the index."""
+        cache = {}
+        assert LoreIndex(self.MAPPING).to_cache(cache, "/repo", "p")
+        assert not LoreIndex(self.MAPPING).to_cache(cache, "/repo", "p")
+
+        restored = LoreIndex.from_cache(json.loads(json.dumps(cache)), "/repo", "p")
+        assert restored.lore_to_sources == self.MAPPING
+        assert restored.lore_for("src/db.py") == ["db.md"]
+
+        assert LoreIndex.from_cache(cache, "/other", "p") is None
+        assert LoreIndex.from_cache(cache, "/repo", "q") is None
+        assert LoreIndex.from_cache({}, "/repo", "p") is None
+
+    def test_checkpoint_survives_identical_mapping(self):
+        """Test a rescan keeps the checkpoint only while the mapping matches."""
+        cache = {}
+        checkpoint = {"head": "abc", "dirty": [], "failing": []}
+        assert LoreIndex(self.MAPPING, checkpoint).to_cache(cache, "/repo", "p")
+        assert not LoreIndex(self.MAPPING).to_cache(cache, "/repo", "p")
+        assert LoreIndex.from_cache(cache, "/repo", "p").checkpoint == checkpoint
+
+        assert LoreIndex({"api.md": ["src/api.py"]}).to_cache(cache, "/repo", "p")
+        assert LoreIndex.from_cache(cache, "/repo", "p").checkpoint is None
+
+
+class TestBlobCache:
+    """Test the content-addressed cache shared by worktrees."""
+
+    def test_roundtrip_between_connections(self, temp_dir):
+        """Test results written by one process are read by the next."""
+        cache = BlobCache.open(temp_dir, 10)
+        assert cache.empty
+        assert cache.get("lore", "v1", "abc") is None
+        cache.put("lore", "v1", "abc", {"is_valid": True})
+        # Pending results are visible before they are written
+        assert cache.get("lore", "v1", "abc") == {"is_valid": True}
+        cache.close()
+        assert (temp_dir / BLOB_CACHE_FILE).is_file()
+
+        cache = BlobCache.open(temp_dir, 10)
+        assert not cache.empty
+        assert cache.get("lore", "v1", "abc") == {"is_valid": True}
+        # Kinds and fingerprints are separate namespaces
+        assert cache.get("lore", "v2", "abc") is None
+        assert cache.get("decorators", "v1", "abc") is None
+        cache.close()
+
+    def test_least_recently_used_entries_are_evicted(self, temp_dir):
+        """Test the cache keeps max_entries entries, dropping unused ones."""
+        cache = BlobCache.open(temp_dir, 3)
+        for oid in ("a", "b", "c"):
+            cache.put("decorators", "p", oid, [1, []])
+            cache.flush()
+        assert cache.get("decorators", "p", "a") == [1, []]
+        cache.put("decorators", "p", "d", [1, []])
+        cache.close()
+
+        cache = BlobCache.open(temp_dir, 3)
+        kept = [oid for oid in "abcd" if cache.get("decorators", "p", oid)]
+        assert kept == ["a", "c", "d"]
+        cache.close()
+
+    def test_unusable_database_disables_cache(self, temp_dir):
+        """Test a corrupt or disabled cache never raises."""
+        assert BlobCache.open(temp_dir, 0) is None
+
+        path = temp_dir / BLOB_CACHE_FILE
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"not a database" * 100)
+        assert BlobCache.open(temp_dir, 10) is None
+
+        path.unlink()
+        cache = BlobCache.open(temp_dir, 10)
+        other = sqlite3.connect(str(path))
+        other.execute("DROP TABLE blobs")
+        other.close()
+        assert cache.get("lore", "v1", "abc") is None
+        cache.put("lore", "v1", "abc", {})
+        assert cache.flush() is False
+        cache.close()
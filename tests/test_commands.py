@@ -0,0 +1,333 @@
+"""
+Unit tests for command helpers.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from dungeon_master.commands import validate
+from dungeon_master.commands.impact import get_impacted_lore
+from dungeon_master.core.cache import LoreIndex
+from dungeon_master.core.decorator_parser import ScanStats
+from dungeon_master.core.git_utils import close_git_sessions
+
+
+class TestImpact:
+    """Test lore impact lookups for changed paths."""
+
+    def test_get_impacted_lore(self):
+        """Test indexed, newly added and directory references."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            (repo / "src").mkdir()
+            (repo / "src" / "api.py").write_text('# track_lore("new.md")\n')
+            (repo / "src" / "db.py").write_text("")
+            index = LoreIndex(
+                {"api.md": ["src/api.py"], "db.md": ["src/db.py", "lib/x.py"]}
+            )
+
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                # Old reference from the index plus the one just added
+                assert get_impacted_lore(["src/api.py"], index) == [
+                    "api.md",
+                    "new.md",
+                ]
+                # A deleted file still affects the lore it used to feed
+                assert get_impacted_lore(["lib/x.py"], index) == ["db.md"]
+                assert get_impacted_lore(["src"], index) == ["api.md", "db.md"]
+                assert get_impacted_lore(["README.md"], index) == []
+            finally:
+                os.chdir(cwd)
+
+
+class TestValidateFailFast:
+    """Test validate stops scanning at the first problem with fail_fast."""
+
+    def test_fail_fast_stops_scan(self):
+        """Test the scan is abandoned after the first missing lore file."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            for index in range(5):
+                (repo / f"mod{index}.py").write_text(
+                    f'# track_lore("missing{index}.md")\n'
+                )
+
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                stats = ScanStats()
+                with patch.object(validate, "ScanStats", return_value=stats):
+                    assert validate.run_validate(fail_fast=True) is False
+                assert stats.parsed < 5
+
+                assert validate.run_validate() is False
+            finally:
+                os.chdir(cwd)
+
+
+class TestValidateReport:
+    """Test validate explains each lore file problem."""
+
+    def test_report_lists_references_and_problems(self, capsys):
+        """Test every reference and the specific section problem are shown."""
+        lore_content = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            (repo / "a.py").write_text('# track_lore("missing.md")\n')
+            (repo / "b.py").write_text('# track_lore("missing.md")\n')
+            (repo / "c.py").write_text('# track_lore("short.md")\n')
+            (repo / ".lore.dev").mkdir()
+            (repo / ".lore.dev" / "short.md").write_text(lore_content)
+            (repo / "dmconfig.json").write_text('{"minSectionLength": 100000}')
+
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                assert validate.run_validate() is False
+            finally:
+                os.chdir(cwd)
+
+        output = capsys.readouterr().out
+        assert "Referenced in: a.py, b.py" in output
+        assert "Section check: Overview:" in output
+        assert "of 100000 characters" in output
+        assert "Missing required sections" not in output
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+class TestScopedValidate:
+    """Test scoped validation gives the same answer as a full run."""
+
+    def _git(self, repo, *args):
+        subprocess.run(
+            ["git", "-c", "user.name=dm", "-c", "user.email=dm@example.com", *args],
+            cwd=repo,
+            check=True,
+            capture_output=True,
+        )
+
+    def _validate_both_ways(self):
+        """Run a scoped validation without a full scan, then a full one."""
+        scan = patch.object(
+            validate, "iter_lore_decorators", side_effect=AssertionError
+        )
+        with scan:
+            scoped = validate.run_validate(scoped=True)
+        return scoped, validate.run_validate()
+
+    def test_scoped_matches_full(self):
+        """Test working tree edits, reverts and commits are all picked up."""
+        lore_content = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._git(repo, "init", "-q")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "a.py").write_text('# track_lore("a.md")\n')
+            (repo / "b.py").write_text('# track_lore("b.md")\n')
+            (repo / ".lore.dev").mkdir()
+            (repo / ".lore.dev" / "a.md").write_text(lore_content)
+            (repo / ".lore.dev" / "b.md").write_text(lore_content)
+            self._git(repo, "add", "-A")
+            self._git(repo, "commit", "-q", "-m", "initial")
+
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                # No checkpoint yet: a scoped run falls back to a full scan
+                assert validate.run_validate(scoped=True) is True
+
+                # An uncommitted new reference to a missing lore file
+                (repo / "b.py").write_text(
+                    '# track_lore("b.md")\n# track_lore("c.md")\n'
+                )
+                assert self._validate_both_ways() == (False, False)
+
+                # Reverting the edit clears the problem again
+                (repo / "b.py").write_text('# track_lore("b.md")\n')
+                assert self._validate_both_ways() == (True, True)
+
+                # Committed changes are found through the HEAD diff
+                (repo / "a.py").write_text('# track_lore("d.md")\n')
+                self._git(repo, "commit", "-q", "-am", "switch lore")
+                assert self._validate_both_ways() == (False, False)
+
+                # A broken lore file that was already failing stays failing
+                (repo / "a.py").write_text('# track_lore("a.md")\n')
+                placeholder = "[PLEASE FILL OUT: Overview]\n"
+                (repo / ".lore.dev" / "a.md").write_text(placeholder)
+                self._git(repo, "commit", "-q", "-am", "break lore")
+                assert self._validate_both_ways() == (False, False)
+                (repo / "b.py").write_text('# track_lore("b.md")\n\n')
+                self._git(repo, "commit", "-q", "-am", "unrelated")
+                assert self._validate_both_ways() == (False, False)
+            finally:
+                os.chdir(cwd)
+
+
+class TestStagedValidate:
+    """Test validating the staged content instead of the working tree."""
+
+    _git = TestScopedValidate._git
+
+    def test_staged_ignores_unstaged_edits(self):
+        """Test only what the next commit contains decides the result."""
+        lore_content = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+        placeholder = "[PLEASE FILL OUT: Overview]\n"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._git(repo, "init", "-q")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "a.py").write_text('# track_lore("a.md")\n')
+            (repo / ".lore.dev").mkdir()
+            (repo / ".lore.dev" / "a.md").write_text(lore_content)
+            self._git(repo, "add", "-A")
+            self._git(repo, "commit", "-q", "-m", "initial")
+
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                # An unstaged reference to a missing lore file is not committed
+                (repo / "a.py").write_text(
+                    '# track_lore("a.md")\n# track_lore("b.md")\n'
+                )
+                assert validate.run_validate(staged=True) is True
+                assert validate.run_validate() is False
+
+                # A staged one is, even after the working tree copy is deleted
+                (repo / ".lore.dev" / "a.md").write_text(lore_content + "\n")
+                self._git(repo, "add", "a.py", ".lore.dev/a.md")
+                (repo / "a.py").unlink()
+                assert validate.run_validate(staged=True) is False
+
+                # Lore that is staged but deleted from the working tree counts
+                (repo / ".lore.dev" / "b.md").write_text(lore_content)
+                self._git(repo, "add", ".lore.dev/b.md")
+                (repo / ".lore.dev" / "b.md").unlink()
+                assert validate.run_validate(staged=True) is True
+
+                # Lore is checked as staged, not as edited afterwards
+                (repo / ".lore.dev" / "a.md").write_text(placeholder)
+                self._git(repo, "add", ".lore.dev/a.md")
+                (repo / ".lore.dev" / "a.md").write_text(lore_content)
+                assert validate.run_validate(staged=True) is False
+            finally:
+                os.chdir(cwd)
+                close_git_sessions()
+
+
+class TestValidatedTree:
+    """Test validation is skipped for a tree that already passed."""
+
+    _git = TestScopedValidate._git
+
+    def test_same_tree_passes_without_scanning(self):
+        """Test retries and amends reuse the result; any change re-validates."""
+        lore_content = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._git(repo, "init", "-q")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "a.py").write_text('# track_lore("a.md")\n')
+            (repo / ".lore.dev").mkdir()
+            (repo / ".lore.dev" / "a.md").write_text(lore_content)
+            self._git(repo, "add", "-A")
+
+            no_scan = patch.object(
+                validate, "iter_lore_decorators", side_effect=AssertionError
+            )
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                assert validate.run_validate(staged=True) is True
+                with no_scan:
+                    assert validate.run_validate() is True
+                    assert validate.run_validate(staged=True) is True
+
+                # Amending the commit leaves the tree and nothing changed
+                self._git(repo, "commit", "-q", "-m", "initial")
+                with no_scan:
+                    assert validate.run_validate() is True
+
+                # A different tree is validated again
+                (repo / "a.py").write_text('# track_lore("b.md")\n')
+                self._git(repo, "add", "a.py")
+                assert validate.run_validate() is False
+                assert validate.run_validate() is False
+
+                # Back to the committed tree, with nothing changed
+                (repo / "a.py").write_text('# track_lore("a.md")\n')
+                self._git(repo, "add", "a.py")
+                with no_scan:
+                    assert validate.run_validate() is True
+
+                # Unstaged edits and forced rebuilds always scan
+                scan = patch.object(
+                    validate,
+                    "iter_lore_decorators",
+                    wraps=validate.iter_lore_decorators,
+                )
+                with scan as scanned:
+                    assert validate.run_validate(rebuild_cache=True) is True
+                    (repo / "a.py").write_text('# track_lore("a.md")\n\n')
+                    assert validate.run_validate(staged=True) is True
+                    assert scanned.call_count == 1
+                    assert validate.run_validate() is False
+                    assert scanned.call_count == 2
+            finally:
+                os.chdir(cwd)
+                close_git_sessions()
+
+    def test_skipped_run_moves_checkpoint(self):
+        """Test a scoped run after a skipped one only re-scans newer changes."""
+        lore_content = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._git(repo, "init", "-q")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "a.py").write_text('# track_lore("a.md")\n')
+            (repo / "b.py").write_text('# track_lore("a.md")\n')
+            (repo / ".lore.dev").mkdir()
+            (repo / ".lore.dev" / "a.md").write_text(lore_content)
+            self._git(repo, "add", "-A")
+            self._git(repo, "commit", "-q", "-m", "initial")
+
+            refresh = patch.object(
+                validate, "refresh_lore_index", wraps=validate.refresh_lore_index
+            )
+            cwd = os.getcwd()
+            os.chdir(repo)
+            try:
+                assert validate.run_validate() is True
+
+                # Validated while staged, then committed: the next run is
+                # skipped, and a.py must not be re-scanned after that
+                (repo / "a.py").write_text('# track_lore("a.md")\n\n')
+                (repo / ".lore.dev" / "a.md").write_text(lore_content + "\n")
+                self._git(repo, "add", "-A")
+                assert validate.run_validate(staged=True) is True
+                self._git(repo, "commit", "-q", "-m", "edit")
+                with patch.object(
+                    validate, "iter_lore_decorators", side_effect=AssertionError
+                ):
+                    assert validate.run_validate() is True
+
+                    with refresh as refreshed:
+                        assert validate.run_validate(scoped=True) is True
+                    assert refreshed.call_args[0][1] == set()
+
+                    (repo / "b.py").write_text('# track_lore("a.md")\n\n')
+                    (repo / ".lore.dev" / "a.md").write_text(lore_content)
+                    with refresh as refreshed:
+                        assert validate.run_validate(scoped=True) is True
+                    assert refreshed.call_args[0][1] == {"b.py", ".lore.dev/a.md"}
+            finally:
+                os.chdir(cwd)
+                close_git_sessions()
@@ -248,6 +248,78 @@ class TestConfigurationValidation:
         assert any("minSectionLength" in error for error in errors)
         assert any("maxFileSize" in error for error in errors)
 
+    def test_validate_config_choice_settings(self):
+        """Test validation of settings restricted to a set of values."""
+        config = {
+            "loreDirectory": ".lore",
+            "enforceDocumentation": True,
+            "requiredSections": ["test"],
+            "scanBackend": "svn",
+        }
+
+        errors = validate_config(config)
+        assert any("scanBackend must be one of" in error for error in errors)
+
+        config["scanBackend"] = "filesystem"
+        assert validate_config(config) == []
+
+        config["scanExecutor"] = "fiber"
+        errors = validate_config(config)
+        assert any("scanExecutor must be one of" in error for error in errors)
+
+        config["scanExecutor"] = "process"
+        config["decoratorScanMode"] = "head"
+        errors = validate_config(config)
+        assert any("decoratorScanMode must be one of" in error for error in errors)
+
+    def test_validate_config_grep_untracked(self):
+        """Test validation of the git-grep untracked files switch."""
+        config = {
+            "loreDirectory": ".lore",
+            "enforceDocumentation": True,
+            "requiredSections": ["test"],
+            "grepUntracked": "no",
+        }
+
+        errors = validate_config(config)
+        assert any("grepUntracked must be a boolean" in error for error in errors)
+
+        config["grepUntracked"] = False
+        assert validate_config(config) == []
+
+    def test_validate_config_scan_workers(self):
+        """Test validation of the worker count."""
+        config = {
+            "loreDirectory": ".lore",
+            "enforceDocumentation": True,
+            "requiredSections": ["test"],
+            "scanWorkers": -1,
+        }
+
+        errors = validate_config(config)
+        assert any("scanWorkers must be an integer" in error for error in errors)
+
+        config["scanWorkers"] = 0
+        assert validate_config(config) == []
+
+    def test_validate_config_blob_cache_entries(self):
+        """Test validation of the blob cache size."""
+        config = {
+            "loreDirectory": ".lore",
+            "enforceDocumentation": True,
+            "requiredSections": ["test"],
+            "blobCacheEntries": -1,
+        }
+
+        errors = validate_config(config)
+        assert any("blobCacheEntries must be an integer" in error for error in errors)
+
+        config["blobCacheEntries"] = "many"
+        assert validate_config(config) == errors
+
+        config["blobCacheEntries"] = 0
+        assert validate_config(config) == []
+
     def test_validate_config_custom_template_path(self, temp_dir):
         """Test validation with custom template path."""
         # Non-existent template path
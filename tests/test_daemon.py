@@ -0,0 +1,185 @@
+"""
+Tests for the Dungeon Master daemon.
+"""
+
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from dungeon_master.core import daemon
+from dungeon_master.core.cache import load_cache
+from dungeon_master.core.git_utils import read_git_index
+
+pytestmark = pytest.mark.skipif(
+    not daemon.is_daemon_supported(), reason="requires Unix domain sockets"
+)
+
+
+@pytest.fixture
+def runtime_dir(monkeypatch):
+    """Keep daemon sockets in a throwaway runtime directory."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        monkeypatch.setenv("XDG_RUNTIME_DIR", temp_dir)
+        yield Path(temp_dir) / "dungeon-master"
+
+
+@pytest.fixture
+def repo(runtime_dir):
+    """Run the test from a fresh repository directory."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cwd = os.getcwd()
+        os.chdir(temp_dir)
+        try:
+            yield Path(temp_dir)
+        finally:
+            os.chdir(cwd)
+
+
+@pytest.fixture
+def serve(repo):
+    """Start a daemon for the repository in a background thread."""
+    servers = []
+
+    def start(**kwargs):
+        server = daemon.DaemonServer(repo, **kwargs)
+        server.bind()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return server
+
+    yield start
+
+    for server, thread in servers:
+        server.stop()
+        thread.join(timeout=5)
+
+
+class TestDaemonClient:
+    """Test requests from the CLI side."""
+
+    def test_no_daemon_falls_back(self, repo):
+        """Test clients get None when nothing is listening."""
+        assert daemon.run_in_daemon("validate", {}) is None
+        assert daemon.get_daemon_status() is None
+        assert daemon.stop_daemon() is False
+
+    def test_socket_path_is_per_repository(self, repo):
+        """Test each repository gets its own short socket path."""
+        path = daemon.get_socket_path(repo)
+        assert path == daemon.get_socket_path()
+        assert path != daemon.get_socket_path(repo / "other")
+        assert len(os.fsencode(path)) < 100
+
+    def test_socket_lives_in_runtime_directory(self, repo, runtime_dir, monkeypatch):
+        """Test sockets go to $XDG_RUNTIME_DIR or a per-user temp directory."""
+        assert daemon.get_socket_path().parent == runtime_dir
+
+        monkeypatch.delenv("XDG_RUNTIME_DIR")
+        assert daemon.get_socket_path().parent == (
+            Path(tempfile.gettempdir()) / f"dungeon-master-{os.getuid()}"
+        )
+
+    def test_untrusted_socket_is_ignored(self, repo, runtime_dir, serve):
+        """Test clients only talk to private sockets in a private directory."""
+        server = serve()
+        assert daemon.get_daemon_status() is not None
+        assert stat.S_IMODE(os.stat(runtime_dir).st_mode) == 0o700
+
+        os.chmod(server.socket_path, 0o666)
+        assert daemon.get_daemon_status() is None
+        assert daemon.run_in_daemon("validate", {}) is None
+        with pytest.raises(daemon.DaemonError, match="not a private socket"):
+            daemon.DaemonServer(repo).bind()
+        os.chmod(server.socket_path, 0o600)
+
+        os.chmod(runtime_dir, 0o755)
+        assert daemon.get_daemon_status() is None
+        os.chmod(runtime_dir, 0o700)
+        assert daemon.get_daemon_status() is not None
+
+    def test_cli_does_not_import_daemon(self):
+        """Test commands without a daemon path skip importing it."""
+        code = (
+            "import sys, dungeon_master.cli; "
+            "sys.exit('dungeon_master.core.daemon' in sys.modules)"
+        )
+        assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+class TestDaemonServer:
+    """Test answering requests from a running daemon."""
+
+    def test_validate_matches_in_process(self, repo, serve, capsys):
+        """Test daemon output and result match running the command directly."""
+        from dungeon_master.commands.validate import run_validate
+
+        (repo / "a.py").write_text('# track_lore("a.md")\n')
+        serve()
+
+        assert daemon.run_in_daemon("validate", {}) is False
+        from_daemon = capsys.readouterr().out
+        assert run_validate() is False
+        in_process = capsys.readouterr().out
+
+        assert "MISSING: .lore.dev/a.md" in from_daemon
+        assert from_daemon == in_process
+        assert "loreIndex" in load_cache(repo / "dmcache.json")
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+    def test_refresh_leaves_git_index_alone(self, repo):
+        """Test the background refresh never writes the index tree."""
+        subprocess.run(["git", "init", "-q"], check=True)
+        (repo / "a.py").write_text('# track_lore("a.md")\n')
+        subprocess.run(["git", "add", "a.py"], check=True)
+
+        daemon.DaemonServer(repo).refresh()
+        assert "" not in read_git_index(repo).cache_tree
+        assert "loreIndex" in load_cache(repo / "dmcache.json")
+
+    def test_status_and_stop(self, repo, serve):
+        """Test status reports requests and stop removes the socket."""
+        server = serve(handlers={"echo": lambda value: value})
+
+        assert daemon.run_in_daemon("echo", {"value": True}) is True
+        assert daemon.run_in_daemon("missing", {}) is None
+        status = daemon.get_daemon_status()
+        assert status["pid"] == os.getpid()
+        assert status["requests"] == 1
+
+        with pytest.raises(daemon.DaemonError):
+            daemon.DaemonServer(repo).bind()
+
+        assert daemon.stop_daemon() is True
+        for _ in range(100):
+            if not server.socket_path.exists():
+                break
+            threading.Event().wait(0.05)
+        assert not server.socket_path.exists()
+
+    def test_git_environment_is_forwarded(self, repo, serve):
+        """Test hook variables such as GIT_INDEX_FILE reach the command."""
+        serve(handlers={"index": lambda: os.environ.get("GIT_INDEX_FILE") == "tmp"})
+
+        with patch.dict(os.environ, {"GIT_INDEX_FILE": "tmp"}):
+            assert daemon.run_in_daemon("index", {}) is True
+        assert daemon.run_in_daemon("index", {}) is False
+
+    def test_other_code_is_not_served(self, repo):
+        """Test requests from clients running different code are refused."""
+        server = daemon.DaemonServer(repo, handlers={"echo": lambda: True})
+        request = {"protocol": daemon.PROTOCOL_VERSION, "command": "echo"}
+
+        assert server.dispatch(dict(request, code="0:elsewhere")) == {
+            "status": "mismatch"
+        }
+        response = server.dispatch(dict(request, code=daemon.get_code_identity()))
+        assert response["result"] is True
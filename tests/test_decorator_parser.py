@@ -2,11 +2,18 @@
 Unit tests for the lore decorator parser.
 """
 
+import os
+import shutil
+import subprocess
+import sys
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
+from dungeon_master.core import decorator_parser, git_utils
+from dungeon_master.core.cache import load_cache
 from dungeon_master.core.decorator_parser import (
     extract_lore_paths,
     extract_lore_paths_safe,
@@ -14,6 +21,8 @@ from dungeon_master.core.decorator_parser import (
     get_file_extension,
     get_lore_files_for_source,
     is_supported_file,
+    iter_lore_decorators,
+    iter_repository_files,
     scan_repository_for_lore_decorators,
     should_skip_directory,
 )
@@ -228,6 +237,65 @@ class TestClass:
         finally:
             temp_path.unlink()
 
+    def test_byte_prefilter_matches_full_text_regex(self):
+        """Test the byte-level fast path agrees with matching decoded text."""
+        content = (
+            '\r\n# track_lore("crlf.md")\r\n'
+            "text = \"# track_lore('string.md')\"\n"
+            "x = 1  # track_lore('inline.md')\n"
+            "    #   track_lore(  'spaced.md'  )\n"
+            '# track_lore("a.md") # track_lore("b.md")\n'
+            "# track_lore(\n    'wrapped.md'\n)\n"
+            "#track_lore('tight.md')\n"
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "sample.py"
+            file_path.write_bytes(content.encode("utf-8"))
+
+            expected = [
+                match.strip()
+                for match in decorator_parser.PY_REGEX.findall(
+                    file_path.read_text(encoding="utf-8")
+                )
+            ]
+            assert extract_lore_paths(file_path) == expected
+            assert expected == [
+                "crlf.md",
+                "spaced.md",
+                "a.md",
+                "wrapped.md",
+                "tight.md",
+            ]
+
+    def test_files_without_marker_are_never_decoded(self):
+        """Test non-UTF-8 files without decorators are skipped cheaply."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "latin1.py"
+            file_path.write_bytes("x = 'caf\xe9'\n".encode("latin-1"))
+            assert extract_lore_paths(file_path) == []
+
+            file_path.write_bytes(b'# track_lore("ok.md")\nx = "caf\xe9"\n')
+            assert extract_lore_paths(file_path) == ["ok.md"]
+
+            file_path.write_bytes(b'# track_lore("caf\xe9.md")\n')
+            with pytest.raises(UnicodeDecodeError, match="invalid UTF-8"):
+                extract_lore_paths(file_path)
+
+    def test_large_files_are_memory_mapped(self):
+        """Test the mmap path finds decorators past the first page."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "bundle.js"
+            file_path.write_bytes(
+                b"var a = 1;\n" * 50_000 + b'// track_lore("bundle.md")\n'
+            )
+
+            with patch.object(decorator_parser, "MMAP_THRESHOLD", 1024):
+                with patch.object(
+                    decorator_parser.mmap, "mmap", wraps=decorator_parser.mmap.mmap
+                ) as mapped:
+                    assert extract_lore_paths(file_path) == ["bundle.md"]
+            assert mapped.called
+
 
 class TestRepositoryScanning:
     """Test repository scanning functionality."""
@@ -327,6 +395,816 @@ def test():
             temp_path.unlink()
 
 
+class TestRepositoryWalker:
+    """Test the iterative scandir-based repository walker."""
+
+    def test_yields_relative_paths_in_name_order(self):
+        """Test files are yielded depth first with '/'-separated paths."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "b.py").write_text("")
+            (root / "a.ts").write_text("")
+            (root / "notes.md").write_text("")
+            (root / "src" / "pkg").mkdir(parents=True)
+            (root / "src" / "pkg" / "mod.py").write_text("")
+            (root / "node_modules").mkdir()
+            (root / "node_modules" / "dep.js").write_text("")
+            (root / ".hidden").mkdir()
+            (root / ".hidden" / "secret.py").write_text("")
+
+            paths = [path for path, _ in iter_repository_files(root)]
+            assert paths == ["a.ts", "b.py", "src/pkg/mod.py"]
+
+    def test_yields_reusable_dir_entries(self):
+        """Test yielded entries point at the files on disk."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.py").write_text("x = 1\n")
+
+            [(path, entry)] = list(iter_repository_files(root))
+            assert path == "a.py"
+            assert Path(entry.path) == root / "a.py"
+            assert entry.stat().st_size == 6
+
+    def test_include_patterns(self):
+        """Test custom include patterns replace the extension filter."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "src").mkdir()
+            (root / "src" / "a.py").write_text("")
+            (root / "src" / "b.txt").write_text("")
+
+            paths = [path for path, _ in iter_repository_files(root, None, ["*.txt"])]
+            assert paths == ["src/b.txt"]
+
+    def test_deep_tree_does_not_recurse(self):
+        """Test trees deeper than the recursion limit are walked."""
+        depth = sys.getrecursionlimit() + 100
+        with tempfile.TemporaryDirectory() as temp_dir:
+            current = Path(temp_dir)
+            for _ in range(depth):
+                current = current / "d"
+                os.mkdir(current)
+            (current / "deep.py").write_text("")
+
+            try:
+                paths = [path for path, _ in iter_repository_files(Path(temp_dir))]
+                assert paths == ["d/" * depth + "deep.py"]
+            finally:
+                # shutil.rmtree is recursive itself, so unwind the tree by hand
+                (current / "deep.py").unlink()
+                for _ in range(depth):
+                    os.rmdir(current)
+                    current = current.parent
+
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="requires symlinks")
+    def test_symlinked_directories_are_not_followed(self):
+        """Test directory symlink loops do not cause infinite walks."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "src").mkdir()
+            (root / "src" / "a.py").write_text("")
+            os.symlink(root, root / "src" / "loop")
+
+            paths = [path for path, _ in iter_repository_files(root)]
+            assert paths == ["src/a.py"]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+class TestGitScanBackend:
+    """Test scanning with the git ls-files backend."""
+
+    def _make_repo(self, root):
+        """Initialize a git repository with ignored and excluded content."""
+        subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+        (root / ".gitignore").write_text("generated/\n")
+        (root / "src").mkdir()
+        (root / "src" / "app.py").write_text('# track_lore("app.md")\n')
+        (root / "src" / "view.tsx").write_text('// track_lore("view.md")\n')
+        (root / "generated").mkdir()
+        (root / "generated" / "gen.py").write_text('# track_lore("gen.md")\n')
+        (root / "tests").mkdir()
+        (root / "tests" / "test_app.py").write_text('# track_lore("test.md")\n')
+        (root / "src" / "skip_me.py").write_text('# track_lore("skip.md")\n')
+
+    def test_ignored_files_are_not_scanned(self):
+        """Test gitignored files are excluded with the git backend."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._make_repo(root)
+            config = {
+                "excludedDirectories": ["tests"],
+                "excludedFilePatterns": ["skip_*.py"],
+            }
+
+            mapping = scan_repository_for_lore_decorators(
+                root, config=config, use_cache=False
+            )
+            assert mapping == {
+                "app.md": ["src/app.py"],
+                "view.md": ["src/view.tsx"],
+            }
+
+    def test_matches_filesystem_backend_order(self):
+        """Test both backends return the same mapping in the same order."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._make_repo(root)
+            (root / "generated" / "gen.py").unlink()
+            (root / "a").mkdir()
+            (root / "a" / "x.py").write_text('# track_lore("shared.md")\n')
+            (root / "a.py").write_text('# track_lore("shared.md")\n')
+
+            git_mapping = scan_repository_for_lore_decorators(
+                root, config={"scanBackend": "git"}, use_cache=False
+            )
+            fs_mapping = scan_repository_for_lore_decorators(
+                root, config={"scanBackend": "filesystem"}, use_cache=False
+            )
+            assert git_mapping == fs_mapping
+            assert git_mapping["shared.md"] == ["a/x.py", "a.py"]
+            assert list(git_mapping) == list(fs_mapping)
+
+    def test_refresh_lore_index_matches_full_scan(self):
+        """Test refreshing changed paths gives the same index as a rescan."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._make_repo(root)
+            config = {
+                "excludedDirectories": ["tests"],
+                "excludedFilePatterns": ["skip_*.py"],
+            }
+            index = decorator_parser.LoreIndex(
+                scan_repository_for_lore_decorators(
+                    root, config=config, use_cache=False
+                )
+            )
+
+            (root / "src" / "app.py").write_text('# track_lore("moved.md")\n')
+            (root / "src" / "view.tsx").unlink()
+            (root / "src" / "new.py").write_text('# track_lore("app.md")\n')
+            (root / "generated" / "other.py").write_text('# track_lore("x.md")\n')
+            (root / "src" / "skip_two.py").write_text('# track_lore("x.md")\n')
+            changed = [
+                "src/app.py",
+                "src/view.tsx",
+                "src/new.py",
+                "generated/other.py",
+                "src/skip_two.py",
+            ]
+
+            refreshed = decorator_parser.refresh_lore_index(
+                index, changed, root, config
+            )
+            expected = scan_repository_for_lore_decorators(
+                root, config=config, use_cache=False
+            )
+            assert refreshed.lore_to_sources == expected
+            assert expected == {
+                "moved.md": ["src/app.py"],
+                "app.md": ["src/new.py"],
+            }
+
+    def test_staged_scan_reads_the_index(self):
+        """Test staged scans see staged content, not working tree edits."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._make_repo(root)
+            subprocess.run(["git", "add", "-A"], cwd=root, check=True)
+            config = {
+                "excludedDirectories": ["tests"],
+                "excludedFilePatterns": ["skip_*.py"],
+                "cacheFile": "dmcache.json",
+            }
+
+            (root / "src" / "app.py").write_text('# track_lore("edited.md")\n')
+            (root / "src" / "view.tsx").unlink()
+            (root / "src" / "new.py").write_text('# track_lore("new.md")\n')
+
+            stats = decorator_parser.ScanStats()
+            with patch.object(
+                git_utils, "GitBlobReader", wraps=git_utils.GitBlobReader
+            ) as reader:
+                mapping = {}
+                try:
+                    for source, lore in iter_lore_decorators(
+                        root, config=config, staged=True, stats=stats
+                    ):
+                        mapping.setdefault(lore, []).append(source)
+                finally:
+                    git_utils.close_git_sessions()
+
+            assert mapping == {
+                "app.md": ["src/app.py"],
+                "view.md": ["src/view.tsx"],
+            }
+            # Both edited files came from one cat-file process
+            assert stats.staged == 2
+            assert reader.call_count == 1
+            assert "loreIndex" not in load_cache(root / "dmcache.json")
+
+            assert scan_repository_for_lore_decorators(root, config=config) == {
+                "edited.md": ["src/app.py"],
+                "new.md": ["src/new.py"],
+            }
+
+    def test_grep_backend_matches_native_scan(self):
+        """Test the git grep backend finds what parsing every file finds."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._make_repo(root)
+            subprocess.run(["git", "add", "src"], cwd=root, check=True)
+            (root / "src" / "multi.py").write_text(
+                'x = 1\n# track_lore(\n    "multi.md")\n'
+            )
+            (root / "src" / "both.ts").write_text(
+                '# track_lore("wrong.md")\n  //track_lore( "b.md" ) // x\n'
+            )
+            (root / "src" / "latin1.py").write_bytes(b'# track_lore("caf\xe9.md")\n')
+            (root / "src" / "binary.py").write_bytes(b'\0# track_lore("bin.md")\n')
+            (root / "src" / "plain.py").write_text("# mentions track_lore\n")
+            (root / "README.md").write_text('# track_lore("readme.md")\n')
+            config = {
+                "excludedDirectories": ["tests"],
+                "excludedFilePatterns": ["skip_*.py"],
+            }
+
+            native = scan_repository_for_lore_decorators(
+                root, config=config, use_cache=False
+            )
+            stats = decorator_parser.ScanStats()
+            grep_config = dict(config, scanBackend="git-grep")
+            grepped = scan_repository_for_lore_decorators(
+                root, config=grep_config, use_cache=False, stats=stats
+            )
+            assert grepped == native
+            assert list(grepped) == list(native)
+            assert grepped["multi.md"] == ["src/multi.py"]
+            assert grepped["b.md"] == ["src/both.ts"]
+            # multi.py and latin1.py need the parser; plain.py is never opened
+            assert stats.grepped == 3
+            assert stats.parsed == 5
+
+            header = dict(grep_config, decoratorScanMode="header")
+            assert (
+                scan_repository_for_lore_decorators(
+                    root, config=header, use_cache=False
+                )
+                == native
+            )
+
+            untracked = dict(grep_config, grepUntracked=False)
+            assert scan_repository_for_lore_decorators(
+                root, config=untracked, use_cache=False
+            ) == {"app.md": ["src/app.py"], "view.md": ["src/view.tsx"]}
+
+    def test_grep_backend_keeps_the_scan_index(self):
+        """Test git grep scans neither prune nor skip the persisted indexes."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            self._make_repo(root)
+            config = {"cacheFile": "dmcache.json", "excludedDirectories": []}
+            expected = scan_repository_for_lore_decorators(root, config=config)
+            cache = load_cache(root / "dmcache.json")
+            files = set(cache["scanIndex"]["files"])
+
+            grep_config = dict(config, scanBackend="git-grep")
+            assert (
+                scan_repository_for_lore_decorators(root, config=grep_config)
+                == expected
+            )
+            cache = load_cache(root / "dmcache.json")
+            assert set(cache["scanIndex"]["files"]) == files
+            assert decorator_parser.load_lore_index(root, grep_config)
+
+    def test_grep_backend_without_git(self):
+        """Test the git grep backend falls back to listing files."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "app.py").write_text('# track_lore("app.md")\n')
+            assert scan_repository_for_lore_decorators(
+                root, config={"scanBackend": "git-grep"}, use_cache=False
+            ) == {"app.md": ["app.py"]}
+
+    def test_staged_scan_needs_git(self):
+        """Test staged scans are refused outside a git work tree."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with pytest.raises(ValueError):
+                iter_lore_decorators(Path(temp_dir), staged=True)
+
+
+class TestIncrementalScan:
+    """Test the persistent scan index used by repository scanning."""
+
+    def _scan(self, repo, settings=None, **kwargs):
+        """Scan with the cache enabled, counting files that get parsed."""
+        config = {"cacheFile": "dmcache.json", **(settings or {})}
+        with patch.object(
+            decorator_parser,
+            "extract_lore_paths_for_scan",
+            wraps=decorator_parser.extract_lore_paths_for_scan,
+        ) as extract:
+            mapping = scan_repository_for_lore_decorators(repo, config=config, **kwargs)
+        return mapping, extract.call_count
+
+    def _touch(self, file_path, content):
+        """Rewrite a file and move its mtime into the past."""
+        file_path.write_text(content)
+        stat_result = file_path.stat()
+        past = stat_result.st_mtime_ns - 10_000_000_000
+        os.utime(file_path, ns=(past, past))
+
+    def test_unchanged_files_are_not_reparsed(self):
+        """Test a second scan reuses cached results."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._touch(repo / "a.py", '# track_lore("a.md")\n')
+            self._touch(repo / "b.py", '# track_lore("b.md")\n')
+
+            first, parsed = self._scan(repo)
+            assert parsed == 2
+
+            second, parsed = self._scan(repo)
+            assert parsed == 0
+            assert second == first
+            assert "scanIndex" in load_cache(repo / "dmcache.json")
+
+    def test_changed_and_deleted_files(self):
+        """Test changed files are re-parsed and deleted files dropped."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._touch(repo / "a.py", '# track_lore("a.md")\n')
+            self._touch(repo / "b.py", '# track_lore("b.md")\n')
+            self._scan(repo)
+
+            (repo / "a.py").write_text('# track_lore("renamed.md")\n')
+            (repo / "b.py").unlink()
+
+            mapping, parsed = self._scan(repo)
+            assert parsed == 1
+            assert mapping == {"renamed.md": ["a.py"]}
+
+            index = load_cache(repo / "dmcache.json")["scanIndex"]
+            assert list(index["files"]) == ["a.py"]
+
+    def test_rebuild_cache_reparses_everything(self):
+        """Test the rebuild flag ignores the existing index."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._touch(repo / "a.py", '# track_lore("a.md")\n')
+            self._scan(repo)
+
+            mapping, parsed = self._scan(repo, rebuild_cache=True)
+            assert parsed == 1
+            assert mapping == {"a.md": ["a.py"]}
+
+    def test_scan_without_config_writes_no_cache(self):
+        """Test plain scans stay side-effect free."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            (repo / "a.py").write_text('# track_lore("a.md")\n')
+
+            scan_repository_for_lore_decorators(repo)
+            assert not (repo / "dmcache.json").exists()
+
+    def test_scan_mode_change_invalidates_index(self):
+        """Test header-mode results are not reused by a full scan."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._touch(repo / "a.py", "x = 1\n" * 500 + '# track_lore("late.md")\n')
+
+            mapping, _ = self._scan(repo, scan_mode="header")
+            assert mapping == {}
+
+            mapping, parsed = self._scan(repo, scan_mode="full")
+            assert parsed == 1
+            assert mapping == {"late.md": ["a.py"]}
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+    def test_blob_index_survives_checkouts(self):
+        """Test files rewritten by git checkout are reused by blob id."""
+
+        def git(*args):
+            subprocess.run(
+                ["git", "-c", "user.name=dm", "-c", "user.email=dm@example.com"]
+                + list(args),
+                cwd=repo,
+                check=True,
+                capture_output=True,
+            )
+
+        def settle():
+            """Age every file so no index entry is racily clean."""
+            for path in repo.rglob("*.py"):
+                self._touch(path, path.read_text())
+            git("update-index", "-q", "--refresh")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            git("init", "-q", "-b", "main")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "pkg").mkdir()
+            (repo / "lib").mkdir()
+            (repo / "lib" / "a.py").write_text('# track_lore("a.md")\n')
+            (repo / "lib" / "c.py").write_text("x = 1\n")
+            (repo / "pkg" / "b.py").write_text('# track_lore("b.md")\n')
+            git("add", "-A")
+            git("commit", "-q", "-m", "main")
+            git("checkout", "-q", "-b", "topic")
+            (repo / "pkg" / "b.py").write_text('# track_lore("topic.md")\n')
+            git("commit", "-q", "-am", "topic")
+            git("checkout", "-q", "main")
+            settle()
+
+            on_main, parsed = self._scan(repo)
+            assert parsed == 3
+            assert "blobIndex" in load_cache(repo / "dmcache.json")
+
+            # Only the file the checkout changed is parsed (the others keep
+            # their blob ids, though every file now has a new mtime)
+            git("checkout", "-q", "topic")
+            settle()
+            on_topic, parsed = self._scan(repo)
+            assert parsed == 1
+            assert on_topic == {"a.md": ["lib/a.py"], "topic.md": ["pkg/b.py"]}
+
+            # Both trees are known now; new mtimes everywhere parse nothing
+            git("checkout", "-q", "main")
+            settle()
+            mapping, parsed = self._scan(repo)
+            assert (mapping, parsed) == (on_main, 0)
+
+            # Unstaged edits are never answered from the blob index
+            self._touch(repo / "lib" / "c.py", '# track_lore("c.md")\n')
+            mapping, parsed = self._scan(repo)
+            assert parsed == 1
+            assert mapping["c.md"] == ["lib/c.py"]
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+    def test_blob_index_reparses_only_changed_files(self):
+        """Test a one-file change in a large tree re-parses only that file."""
+
+        def git(*args):
+            subprocess.run(
+                ["git", "-c", "user.name=dm", "-c", "user.email=dm@example.com"]
+                + list(args),
+                cwd=repo,
+                check=True,
+                capture_output=True,
+            )
+
+        def settle():
+            """Give every file a new mtime, as a rebase or fresh clone would."""
+            for path in repo.rglob("*.py"):
+                self._touch(path, path.read_text())
+            git("update-index", "-q", "--refresh")
+
+        # Without the blob cache, so only the blob index can answer
+        settings = {"blobCacheEntries": 0}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            git("init", "-q", "-b", "main")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "pkg").mkdir()
+            for number in range(50):
+                (repo / "pkg" / f"m{number}.py").write_text(f"x = {number}\n")
+                (repo / f"r{number}.py").write_text(f"y = {number}\n")
+            git("add", "-A")
+            git("commit", "-q", "-m", "main")
+            settle()
+
+            _, parsed = self._scan(repo, settings)
+            assert parsed == 100
+
+            # Neither the sibling files nor the root files are parsed again
+            (repo / "pkg" / "m7.py").write_text('# track_lore("m7.md")\n')
+            git("add", "-A")
+            settle()
+            mapping, parsed = self._scan(repo, settings)
+            assert parsed == 1
+            assert mapping == {"m7.md": ["pkg/m7.py"]}
+
+            # A moved file keeps its blob id, so it is not parsed either
+            git("mv", "pkg/m7.py", "moved.py")
+            settle()
+            mapping, parsed = self._scan(repo, settings)
+            assert parsed == 0
+            assert mapping == {"m7.md": ["moved.py"]}
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+    def test_blob_cache_is_shared_by_worktrees(self):
+        """Test content parsed in one worktree is reused by another."""
+
+        def git(cwd, *args):
+            subprocess.run(
+                ["git", "-c", "user.name=dm", "-c", "user.email=dm@example.com"]
+                + list(args),
+                cwd=cwd,
+                check=True,
+                capture_output=True,
+            )
+
+        def settle(work_tree):
+            """Age every file so no index entry is racily clean."""
+            for path in work_tree.rglob("*.py"):
+                self._touch(path, path.read_text())
+            git(work_tree, "update-index", "-q", "--refresh")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir) / "main"
+            worktree = Path(temp_dir) / "topic"
+            repo.mkdir()
+            git(repo, "init", "-q", "-b", "main")
+            (repo / ".gitignore").write_text("dmcache.json\n")
+            (repo / "pkg").mkdir()
+            (repo / "pkg" / "a.py").write_text('# track_lore("a.md")\n')
+            (repo / "pkg" / "b.py").write_text('# track_lore("b.md")\n')
+            git(repo, "add", "-A")
+            git(repo, "commit", "-q", "-m", "main")
+            settle(repo)
+            on_main, parsed = self._scan(repo)
+            assert parsed == 2
+
+            # A new worktree has no dmcache.json but shares the blob cache
+            git(repo, "worktree", "add", "-q", "-b", "topic", str(worktree))
+            settle(worktree)
+            mapping, parsed = self._scan(worktree)
+            assert (mapping, parsed) == (on_main, 0)
+
+            # Content first parsed in the worktree is known to the main one
+            (worktree / "pkg" / "b.py").write_text('# track_lore("topic.md")\n')
+            git(worktree, "commit", "-q", "-am", "topic")
+            settle(worktree)
+            on_topic, parsed = self._scan(worktree)
+            assert parsed == 1
+            git(repo, "merge", "-q", "--ff-only", "topic")
+            settle(repo)
+            mapping, parsed = self._scan(repo)
+            assert (mapping, parsed) == (on_topic, 0)
+
+            # Staged blobs are looked up by their id before being read
+            (worktree / "pkg" / "a.py").write_text('# track_lore("staged.md")\n')
+            git(worktree, "add", "pkg/a.py")
+            (worktree / "pkg" / "a.py").write_text("")
+            try:
+                for expected_staged in (1, 0):
+                    stats = decorator_parser.ScanStats()
+                    decorators = decorator_parser.iter_lore_decorators(
+                        worktree,
+                        config={"cacheFile": "dmcache.json"},
+                        stats=stats,
+                        staged=True,
+                    )
+                    assert ("pkg/a.py", "staged.md") in list(decorators)
+                    assert stats.staged == expected_staged
+            finally:
+                git_utils.close_git_sessions()
+
+
+class TestScanSkips:
+    """Test files the scanner skips without parsing."""
+
+    def test_skips_are_counted(self):
+        """Test size, pattern and binary skips."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            (repo / "app.py").write_text('# track_lore("app.md")\n')
+            (repo / "bundle.min.js").write_text('// track_lore("min.md")\n')
+            (repo / "huge.js").write_text(
+                '// track_lore("huge.md")\n' + "x" * 4096 + "\n"
+            )
+            (repo / "blob.py").write_bytes(b'# track_lore("blob.md")\n\x00\x01')
+            config = {
+                "excludedFilePatterns": ["*.min.js"],
+                "maxFileSize": 2048,
+                "scanBackend": "filesystem",
+            }
+
+            stats = decorator_parser.ScanStats()
+            mapping = scan_repository_for_lore_decorators(
+                repo, config=config, use_cache=False, stats=stats
+            )
+
+            assert mapping == {"app.md": ["app.py"]}
+            assert stats.files == 4
+            assert stats.parsed == 2
+            assert stats.skipped_size == 1
+            assert stats.skipped_binary == 1
+            assert stats.skipped_pattern == 1
+            assert "1 binary" in stats.summary()
+
+    def test_binary_detection(self):
+        """Test NUL bytes in the first block mark a file as binary."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "data.py"
+            file_path.write_bytes(b'# track_lore("a.md")\n\x00')
+            with pytest.raises(decorator_parser.BinaryFileError):
+                extract_lore_paths(file_path)
+            assert extract_lore_paths_safe(file_path) == []
+            assert decorator_parser.extract_lore_paths_for_scan(file_path) is None
+
+            # NUL bytes past the sniffed block do not count
+            file_path.write_bytes(b'# track_lore("a.md")\n' + b"x" * 9000 + b"\x00")
+            assert extract_lore_paths(file_path) == ["a.md"]
+
+    def test_compile_file_patterns(self):
+        """Test the combined file name matcher."""
+        assert decorator_parser.compile_file_patterns([]) is None
+        regex = decorator_parser.compile_file_patterns(["*.pyc", ".DS_Store"])
+        assert regex.match("module.pyc")
+        assert regex.match(".DS_Store")
+        assert not regex.match("module.py")
+
+
+class TestHeaderScanMode:
+    """Test header-bounded decorator scanning."""
+
+    def test_header_limits(self):
+        """Test decorators past the byte or line limit are not found."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "module.py"
+            file_path.write_text(
+                '# track_lore("top.md")\n'
+                + "x = 1\n" * 10
+                + '# track_lore("line12.md")\n'
+            )
+
+            assert extract_lore_paths(file_path, 8192, 0) == ["top.md", "line12.md"]
+            assert extract_lore_paths(file_path, 8192, 11) == ["top.md"]
+            assert extract_lore_paths(file_path, 8192, 12) == ["top.md", "line12.md"]
+            # A decorator cut by the byte limit is dropped, not truncated
+            assert extract_lore_paths(file_path, 90, None) == ["top.md"]
+
+    def test_scan_modes(self):
+        """Test decoratorScanMode and the scan_mode override."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            (repo / "a.py").write_text('# track_lore("a.md")\n' + "x = 1\n" * 50)
+            (repo / "b.py").write_text("x = 1\n" * 50 + '# track_lore("b.md")\n')
+            config = {"decoratorScanMode": "header", "headerScanLines": 20}
+
+            assert scan_repository_for_lore_decorators(repo, config=config) == {
+                "a.md": ["a.py"]
+            }
+            assert scan_repository_for_lore_decorators(
+                repo, config=config, scan_mode="full"
+            ) == {"a.md": ["a.py"], "b.md": ["b.py"]}
+            assert scan_repository_for_lore_decorators(repo) == {
+                "a.md": ["a.py"],
+                "b.md": ["b.py"],
+            }
+
+
+class TestLoreIndexLookups:
+    """Test the persisted lore index and index-backed lookups."""
+
+    def test_scan_persists_lore_index(self):
+        """Test a cached scan stores an index that loads without scanning."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            (repo / "a.py").write_text('# track_lore("a.md")\n# track_lore("b.md")\n')
+            (repo / "b.py").write_text('# track_lore("b.md")\n')
+            config = {"cacheFile": "dmcache.json", "scanBackend": "filesystem"}
+
+            assert decorator_parser.load_lore_index(repo, config) is None
+            built = decorator_parser.build_lore_index(repo, config)
+
+            with patch.object(decorator_parser, "iter_candidate_files") as candidates:
+                index = decorator_parser.load_lore_index(repo, config)
+            candidates.assert_not_called()
+
+            assert index.lore_to_sources == built.lore_to_sources
+            assert find_files_for_lore("b.md", repo, index=index) == ["a.py", "b.py"]
+            assert get_lore_files_for_source(repo / "a.py", repo, index=index) == [
+                "a.md",
+                "b.md",
+            ]
+
+            # Header-mode scans use a different index
+            assert (
+                decorator_parser.load_lore_index(repo, config, scan_mode="header")
+                is None
+            )
+
+    def test_get_relative_source_path(self):
+        """Test source paths are normalised like scanner output."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            relative = decorator_parser.get_relative_source_path
+            assert relative(repo / "src" / "a.py", repo) == "src/a.py"
+            assert relative(Path("elsewhere/b.py"), repo) == "elsewhere/b.py"
+
+
+class TestParallelScan:
+    """Test decorator extraction with a worker pool."""
+
+    def _make_repo(self, repo):
+        """Create enough files to keep several workers and the window busy."""
+        for index in range(120):
+            directory = repo / f"pkg{index % 7}"
+            directory.mkdir(exist_ok=True)
+            (directory / f"mod{index}.py").write_text(
+                f'# track_lore("topic{index % 5}.md")\n'
+                f'# track_lore("file{index}.md")\n'
+            )
+        # Unreadable content must not affect the other files
+        (repo / "pkg0" / "broken.py").write_bytes(b'# track_lore("x\xff.md")\n')
+
+    @pytest.mark.parametrize(
+        "workers,executor", [(4, "thread"), (0, "thread"), (2, "process")]
+    )
+    def test_parallel_scan_matches_serial(self, workers, executor):
+        """Test pooled scans produce the same ordered mapping as serial ones."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._make_repo(repo)
+
+            serial = scan_repository_for_lore_decorators(repo, workers=1)
+            parallel = scan_repository_for_lore_decorators(
+                repo, config={"scanExecutor": executor}, workers=workers
+            )
+
+            assert "x.md" not in serial
+            assert list(parallel.items()) == list(serial.items())
+
+    def test_scan_workers_setting_and_cache(self):
+        """Test the scanWorkers setting is used and results are cached."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._make_repo(repo)
+            config = {"cacheFile": "dmcache.json", "scanWorkers": 3}
+
+            with patch.object(
+                decorator_parser,
+                "ThreadPoolExecutor",
+                wraps=decorator_parser.ThreadPoolExecutor,
+            ) as pool:
+                first = scan_repository_for_lore_decorators(repo, config=config)
+            pool.assert_called_once_with(max_workers=3)
+
+            index = load_cache(repo / "dmcache.json")["scanIndex"]
+            assert len(index["files"]) == 121
+            assert scan_repository_for_lore_decorators(repo) == first
+
+    def test_resolve_scan_workers(self):
+        """Test automatic worker counts."""
+        assert decorator_parser.resolve_scan_workers(3) == 3
+        assert 1 <= decorator_parser.resolve_scan_workers(0) <= 32
+        assert decorator_parser.resolve_scan_workers(0, "process") == (
+            os.cpu_count() or 1
+        )
+
+
+class TestStreamingScan:
+    """Test the streaming iter_lore_decorators() API."""
+
+    def _make_repo(self, repo):
+        for index in range(30):
+            (repo / f"mod{index:02d}.py").write_text(
+                f'# track_lore("topic{index % 3}.md")\n'
+            )
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_pairs_match_mapping(self, workers):
+        """Test streamed pairs rebuild the batch scan mapping."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._make_repo(repo)
+
+            mapping = {}
+            for source_path, lore_path in iter_lore_decorators(repo, workers=workers):
+                mapping.setdefault(lore_path, []).append(source_path)
+
+            expected = scan_repository_for_lore_decorators(repo)
+            assert list(mapping.items()) == list(expected.items())
+
+    def test_missing_repository_raises_on_call(self):
+        """Test a bad path fails before iteration starts."""
+        with pytest.raises(FileNotFoundError):
+            iter_lore_decorators(Path("/nonexistent/repository"))
+
+    def test_early_stop_saves_partial_scan_index(self):
+        """Test stopping early keeps parsed results but not the lore index."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = Path(temp_dir)
+            self._make_repo(repo)
+            config = {"cacheFile": "dmcache.json", "scanBackend": "filesystem"}
+
+            decorators = iter_lore_decorators(repo, config=config)
+            assert next(decorators) == ("mod00.py", "topic0.md")
+            decorators.close()
+
+            cache = load_cache(repo / "dmcache.json")
+            assert "mod00.py" in cache["scanIndex"]["files"]
+            assert "loreIndex" not in cache
+            assert decorator_parser.load_lore_index(repo, config) is None
+
+            # A complete scan afterwards still sees every file
+            mapping = scan_repository_for_lore_decorators(repo, config=config)
+            assert sum(len(sources) for sources in mapping.values()) == 30
+            assert decorator_parser.load_lore_index(repo, config) is not None
+
+
 class TestRealFiles:
     """Test with real example files in the repository."""
 
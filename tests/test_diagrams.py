@@ -0,0 +1,137 @@
+"""
+Unit tests for the Mermaid diagram checker.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from dungeon_master.core.diagrams import DiagramCheck, check_diagram
+from dungeon_master.core.template import (
+    DEFAULT_TEMPLATE,
+    check_outline,
+    index_sections,
+)
+
+# A lore file with real diagrams
+COMPLETE_LORE = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+
+
+class TestCheckDiagram:
+    """Test the structure of each supported diagram kind."""
+
+    @pytest.mark.parametrize(
+        "source, kind, nodes, edges",
+        [
+            (
+                "flowchart LR\n"
+                "    A[Start] -- yes --> B{Check} & C((Done))\n"
+                "    B -->|no| D>Flag]:::warn\n"
+                "    subgraph Group\n"
+                "    end\n"
+                "    click A callback\n",
+                "flowchart",
+                4,
+                3,
+            ),
+            (
+                "sequenceDiagram\n"
+                "    participant U as User\n"
+                "    actor Admin\n"
+                "    U->>+Server: Request\n"
+                "    Server--)U: Done\n"
+                "    loop Retry\n"
+                "    end\n",
+                "sequence",
+                3,
+                2,
+            ),
+            (
+                "classDiagram\n"
+                "    class Animal {\n"
+                "        +int age --> weird\n"
+                "    }\n"
+                '    Animal <|-- "many" Duck\n'
+                "    Duck : +swim()\n",
+                "class",
+                2,
+                1,
+            ),
+            (
+                "stateDiagram-v2\n"
+                "    [*] --> Idle\n"
+                "    Idle --> Busy : start\n"
+                "    state Done\n",
+                "state",
+                4,
+                2,
+            ),
+        ],
+    )
+    def test_kinds(self, source, kind, nodes, edges):
+        """Test nodes and edges are counted for each kind."""
+        check = check_diagram(source)
+        assert (check.kind, check.nodes, check.edges) == (kind, nodes, edges)
+        assert check.problem is None
+
+    def test_problems(self):
+        """Test empty, edgeless and skeleton diagrams are rejected."""
+        assert check_diagram("%% nothing yet\n").problem == "empty diagram"
+        assert check_diagram("flowchart TD\n    A[Alone]\n").problem == "no edges"
+        assert check_diagram("classDiagram\n").problem == "no classes"
+        skeleton = check_diagram("graph TD\n    A[Client] --> B[This Component]\n")
+        assert skeleton.problem == "template skeleton"
+
+        # Unchecked diagram types are accepted as they are
+        assert check_diagram('pie\n    "a" : 1\n').problem is None
+
+    def test_json_roundtrip(self):
+        """Test checks survive the blob cache representation."""
+        check = check_diagram("flowchart TD\n    A --> B\n")
+        restored = DiagramCheck.from_json(check.to_json())
+        assert restored.to_json() == ["flowchart", 2, 1, None]
+
+
+class TestDiagramRules:
+    """Test requireDiagrams and validateDiagramContent."""
+
+    def test_template_diagrams_are_rejected(self):
+        """Test the template's example diagrams fail content validation."""
+        content = DEFAULT_TEMPLATE.format(filename="x", tracked_files="x.py")
+        for placeholder in ("sequence flow", "architecture"):
+            content = content.replace(
+                f"%% Replace with actual {placeholder} relevant to this component", ""
+            )
+        outline = index_sections(content)
+        assert [d.problem for d in outline.diagrams] == ["template skeleton"] * 2
+
+        result = check_outline(outline, Path("x.md"), ["Diagrams"])
+        assert result["diagram_problems"] == []
+        result = check_outline(
+            outline, Path("x.md"), ["Diagrams"], validate_diagram_content=True
+        )
+        assert not result["is_valid"]
+        assert "Diagrams" in result["missing_sections"]
+        assert result["diagram_problems"] == [
+            "diagram 1 (sequence): template skeleton",
+            "diagram 2 (flowchart): template skeleton",
+        ]
+
+    def test_require_diagrams(self):
+        """Test a lore file without diagrams fails when they are required."""
+        outline = index_sections("## Overview\ntext\n## Diagrams\nNone yet.\n")
+        assert check_outline(outline, Path("x.md"), ["Overview"])["is_valid"]
+        result = check_outline(
+            outline, Path("x.md"), ["Overview"], require_diagrams=True
+        )
+        assert result["diagram_problems"] == ["no Mermaid diagram"]
+
+        outline = index_sections(COMPLETE_LORE)
+        result = check_outline(
+            outline,
+            Path("x.md"),
+            require_diagrams=True,
+            validate_diagram_content=True,
+        )
+        assert result["is_valid"]
+        assert outline.diagrams
@@ -0,0 +1,342 @@
+"""
+Unit tests for git integration utilities.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from dungeon_master.core.git_utils import (
+    GitSession,
+    GitStatusSnapshot,
+    _list_index_entries,
+    close_git_sessions,
+    get_changed_files,
+    get_git_session,
+    get_index_tree,
+    get_unstaged_files,
+    has_uncommitted_changes,
+    is_file_tracked,
+    list_repository_files,
+    read_git_index,
+    read_index_entries,
+)
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+
+
+def run_git(repo, *args):
+    """Run a git command inside a test repository."""
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True)
+
+
+@pytest.fixture
+def git_repo():
+    """Create an empty git repository."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        repo = Path(tmp_dir)
+        run_git(repo, "init", "-q")
+        run_git(repo, "config", "user.email", "dm@example.com")
+        run_git(repo, "config", "user.name", "Dungeon Master")
+        yield repo
+
+
+class TestListRepositoryFiles:
+    """Test git ls-files based file enumeration."""
+
+    def test_lists_tracked_and_untracked_files(self, git_repo):
+        """Test tracked and untracked files are listed, ignored ones are not."""
+        (git_repo / ".gitignore").write_text("build/\n*.log\n")
+        (git_repo / "tracked.py").write_text("")
+        run_git(git_repo, "add", ".")
+        (git_repo / "untracked.py").write_text("")
+        (git_repo / "debug.log").write_text("")
+        (git_repo / "build").mkdir()
+        (git_repo / "build" / "out.py").write_text("")
+
+        paths = list_repository_files(git_repo)
+        assert sorted(paths) == [".gitignore", "tracked.py", "untracked.py"]
+
+    def test_paths_are_relative_to_subdirectory(self, git_repo):
+        """Test listing from a subdirectory only returns its files."""
+        (git_repo / "src" / "pkg").mkdir(parents=True)
+        (git_repo / "src" / "pkg" / "mod.py").write_text("")
+        (git_repo / "top.py").write_text("")
+
+        assert list_repository_files(git_repo / "src") == ["pkg/mod.py"]
+
+    def test_non_git_directory(self):
+        """Test None is returned outside a git work tree."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert list_repository_files(Path(tmp_dir)) is None
+
+
+class TestGitStatusSnapshot:
+    """Test the one-shot git status snapshot."""
+
+    def test_classifies_changes(self, git_repo):
+        """Test staged, unstaged, untracked, renamed and deleted paths."""
+        for name in ("kept.py", "edited.py", "staged.py", "old.py", "gone.py"):
+            (git_repo / name).write_text(f"# {name}\n")
+        run_git(git_repo, "add", ".")
+        run_git(git_repo, "commit", "-q", "-m", "initial")
+
+        (git_repo / "edited.py").write_text("changed\n")
+        (git_repo / "staged.py").write_text("changed\n")
+        run_git(git_repo, "add", "staged.py")
+        run_git(git_repo, "mv", "old.py", "new.py")
+        (git_repo / "gone.py").unlink()
+        (git_repo / "sub").mkdir()
+        (git_repo / "sub" / "fresh.py").write_text("")
+
+        status = GitStatusSnapshot.capture(git_repo)
+        assert status.staged == {"staged.py", "new.py"}
+        assert status.unstaged == {"edited.py", "gone.py"}
+        assert status.untracked == {"sub/fresh.py"}
+        assert status.renamed == {"new.py": "old.py"}
+        assert status.deleted == {"gone.py"}
+        assert status.get_changed(include_unstaged=False) == status.staged
+        assert "old.py" in status.dirty and "kept.py" not in status.dirty
+        assert status.has_changes()
+
+    def test_parse_unmerged_and_headers(self):
+        """Test conflicts count as staged and unstaged; headers are skipped."""
+        output = (
+            b"# branch.oid abc\0"
+            b"u UU N... 100644 100644 100644 100644 a b c conflict.py\0"
+            b"1 .M N... 100644 100644 100644 a b name with spaces.py\0"
+            b"! ignored.log\0"
+        )
+        status = GitStatusSnapshot.parse(output)
+        assert status.unmerged == {"conflict.py"}
+        assert status.staged == {"conflict.py"}
+        assert status.unstaged == {"conflict.py", "name with spaces.py"}
+        assert status.untracked == set()
+
+    def test_helpers_use_the_snapshot(self, git_repo, monkeypatch):
+        """Test the module-level helpers answer from a snapshot."""
+        (git_repo / "a.py").write_text("")
+        run_git(git_repo, "add", "a.py")
+        monkeypatch.chdir(git_repo)
+
+        assert get_changed_files() == ["a.py"]
+        assert get_changed_files(include_staged=False) == []
+        assert has_uncommitted_changes() is True
+        try:
+            assert is_file_tracked("a.py") is True
+            assert is_file_tracked("missing.py") is False
+        finally:
+            close_git_sessions()
+
+    def test_non_git_directory(self):
+        """Test no snapshot is taken outside a git work tree."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert GitStatusSnapshot.capture(Path(tmp_dir)) is None
+
+
+class TestGitSession:
+    """Test the long-lived git coprocess session."""
+
+    @pytest.fixture
+    def session(self, git_repo):
+        """Open a session on a repository with ignore and attribute rules."""
+        (git_repo / ".gitignore").write_text("*.log\n!keep.log\n")
+        (git_repo / ".gitattributes").write_text("*.min.js -diff\n")
+        (git_repo / "src").mkdir()
+        (git_repo / "src" / "app.py").write_text("print()\n")
+        run_git(git_repo, "add", ".")
+        session = GitSession(git_repo / "src")
+        yield session
+        session.close()
+
+    def test_locations_are_cached(self, session, git_repo):
+        """Test rev-parse answers are looked up once."""
+        assert session.toplevel == git_repo.resolve()
+        assert session.git_dir == str(git_repo.resolve() / ".git")
+        assert session.common_dir.resolve() == git_repo.resolve() / ".git"
+        assert session.head is None
+
+        run_git(git_repo, "commit", "-q", "-m", "initial")
+        assert session.head is None
+
+    def test_ignore_attribute_and_tracked_queries(self, session):
+        """Test repeated queries reuse one coprocess per kind."""
+        popen_patch = patch.object(subprocess, "Popen", wraps=subprocess.Popen)
+        run_patch = patch.object(subprocess, "run", wraps=subprocess.run)
+        with popen_patch as popen, run_patch as run:
+            assert session.is_ignored("debug.log") is True
+            assert session.is_ignored("keep.log") is False
+            assert session.get_ignored(["a.log", "b.py", "c.log"]) == {
+                "a.log",
+                "c.log",
+            }
+            assert session.get_attributes("x.min.js", ["diff", "text"]) == {
+                "diff": "unset",
+                "text": "unspecified",
+            }
+            assert session.get_attributes("x.py", ["diff", "text"])["diff"] == (
+                "unspecified"
+            )
+            assert session.is_tracked("app.py") is True
+            assert session.is_tracked("../.gitignore") is True
+            assert session.is_tracked("other.py") is False
+            assert session.read_blob("0" * 40) == (None, None)
+        # rev-parse once (the index is read directly); run() goes through Popen
+        assert run.call_count == 1
+        assert popen.call_count - run.call_count == 3
+
+    def test_failed_query_restarts_the_coprocess(self, session):
+        """Test a path git rejects raises without breaking later queries."""
+        with pytest.raises(OSError):
+            session.is_ignored("/outside/the/repository")
+        assert session.is_ignored("debug.log") is True
+
+    def test_shared_sessions(self, git_repo):
+        """Test sessions are shared per directory until closed."""
+        session = get_git_session(git_repo)
+        assert get_git_session(git_repo) is session
+        close_git_sessions()
+        assert get_git_session(git_repo) is not session
+        close_git_sessions()
+
+
+class TestGitIndex:
+    """Test reading the index without running git."""
+
+    @pytest.fixture
+    def repo(self, git_repo):
+        """Create a repository with staged, unstaged and intent-to-add files."""
+        (git_repo / "src" / "deep").mkdir(parents=True)
+        for name in ("src/a.py", "src/b.py", "src/deep/c.txt", "top.md"):
+            (git_repo / name).write_text(f"{name}\n")
+        (git_repo / "link").symlink_to("top.md")
+        run_git(git_repo, "add", ".")
+        run_git(git_repo, "commit", "-q", "-m", "initial")
+        (git_repo / "src" / "a.py").write_text("changed\n")
+        (git_repo / "src" / "b.py").unlink()
+        (git_repo / "new.py").write_text("")
+        run_git(git_repo, "add", "-N", "new.py")
+        return git_repo
+
+    @staticmethod
+    def summary(entries):
+        """Reduce entries to what ``git ls-files -s`` reports."""
+        return {path: (e.oid, e.mode, e.stage) for path, e in entries.items()}
+
+    @pytest.mark.parametrize("version", ["2", "3", "4"])
+    def test_matches_git_ls_files(self, repo, version):
+        """Test every index version lists what git lists, without git."""
+        run_git(repo, "update-index", "--index-version", version)
+        for directory, paths in (
+            (repo, None),
+            (repo / "src", None),
+            (repo / "src", ["deep", "../top.md"]),
+        ):
+            with patch.object(subprocess, "run") as run:
+                entries = read_index_entries(directory, paths)
+            run.assert_not_called()
+            expected = _list_index_entries(directory, paths)
+            assert self.summary(entries) == self.summary(expected)
+            assert list(entries) == list(expected)
+
+        index = read_git_index(repo)
+        assert index.version == max(int(version), 3)
+        assert index.entries[0].mtime_ns is not None
+
+    def test_unstaged_files_match_git_diff(self, repo):
+        """Test stat checks and content hashes agree with git diff."""
+        expected = ["new.py", "src/a.py", "src/b.py"]
+        assert sorted(get_unstaged_files(repo)) == expected
+        assert sorted(get_unstaged_files(repo / "src")) == ["a.py", "b.py"]
+
+        # Same size and mtime: the content hash decides
+        target = repo / "top.md"
+        stat_result = target.stat()
+        for content, changed in (("top.mX\n", True), ("top.md\n", False)):
+            target.write_text(content)
+            os.utime(target, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+            assert ("top.md" in get_unstaged_files(repo)) is changed
+
+    def test_cache_tree(self, repo):
+        """Test the TREE extension gives the ids git write-tree computes."""
+        run_git(repo, "rm", "-q", "--cached", "new.py")
+        run_git(repo, "add", "-A")
+        tree = subprocess.run(
+            ["git", "write-tree"], cwd=repo, capture_output=True, text=True
+        ).stdout.strip()
+        index = read_git_index(repo)
+        assert index.cache_tree[""][0] == tree
+        assert index.cache_tree["src/deep"][1] == 1
+
+        (repo / "src" / "a.py").write_text("again\n")
+        run_git(repo, "add", "src/a.py")
+        index = read_git_index(repo)
+        assert index.cache_tree["src"][0] is None
+        assert index.cache_tree["src/deep"][0] is not None
+
+    def test_index_tree(self, repo):
+        """Test the index tree id comes from the cache tree when valid."""
+        run_git(repo, "rm", "-q", "--cached", "new.py")
+        run_git(repo, "add", "-A")
+        tree = get_index_tree(repo)
+        with patch.object(subprocess, "run") as run:
+            assert get_index_tree(repo) == tree
+        run.assert_not_called()
+
+        run_git(repo, "commit", "-q", "-m", "second")
+        head_tree = subprocess.run(
+            ["git", "rev-parse", "HEAD^{tree}"],
+            cwd=repo,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        assert tree == head_tree
+
+        # A stale cached tree is left alone unless writing is allowed
+        (repo / "src" / "a.py").write_text("again\n")
+        run_git(repo, "add", "src/a.py")
+        with patch.object(subprocess, "run") as run:
+            assert get_index_tree(repo, write=False) is None
+        run.assert_not_called()
+        assert get_index_tree(repo) not in (None, tree)
+
+    def test_split_index_falls_back_to_git(self, repo):
+        """Test unsupported index formats are left to git."""
+        run_git(repo, "update-index", "--split-index")
+        assert read_git_index(repo) is None
+        entries = read_index_entries(repo)
+        assert "src/deep/c.txt" in entries
+        assert entries["top.md"].mtime_ns is None
+        assert sorted(get_unstaged_files(repo)) == ["new.py", "src/a.py", "src/b.py"]
+
+    def test_sha256_repository(self):
+        """Test 32-byte object ids are read from SHA-256 repositories."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            repo = Path(tmp_dir)
+            result = subprocess.run(
+                ["git", "init", "-q", "--object-format=sha256"],
+                cwd=repo,
+                capture_output=True,
+            )
+            if result.returncode != 0:
+                pytest.skip("git without SHA-256 support")
+            (repo / "a.py").write_text("a\n")
+            run_git(repo, "add", "a.py")
+
+            entries = read_index_entries(repo)
+            assert self.summary(entries) == self.summary(
+                _list_index_entries(repo, None)
+            )
+            assert len(entries["a.py"].oid) == 64
+            assert get_unstaged_files(repo) == []
+
+    def test_empty_and_missing_index(self, git_repo):
+        """Test a fresh repository has an empty index, no repository none."""
+        assert read_index_entries(git_repo) == {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert read_index_entries(Path(tmp_dir)) is None
@@ -0,0 +1,326 @@
+"""
+Unit tests for the pure-Python gitignore matcher.
+
+The conformance corpus below is checked against the output of
+`git check-ignore` for every file and directory it creates.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from dungeon_master.core.decorator_parser import (
+    iter_repository_files,
+    scan_repository_for_lore_decorators,
+)
+from dungeon_master.core.gitignore import (
+    GitignoreMatcher,
+    IgnoreRules,
+    parse_ignore_line,
+    translate_pattern,
+)
+
+# Each case lists ignore files (path -> content) and the files to create
+CONFORMANCE_CORPUS = {
+    "basic": {
+        "ignore": {
+            ".gitignore": "*.log\nbuild/\n/root_only.txt\n!important.log\n",
+        },
+        "files": [
+            "app.log",
+            "important.log",
+            "src/debug.log",
+            "src/important.log",
+            "build/out.py",
+            "src/build/out.py",
+            "root_only.txt",
+            "src/root_only.txt",
+            "keep.py",
+        ],
+    },
+    "anchored": {
+        "ignore": {
+            ".gitignore": "doc/frotz/\na/b.txt\n/top/\nsrc/*.gen.py\n",
+        },
+        "files": [
+            "doc/frotz/page.md",
+            "x/doc/frotz/page.md",
+            "a/b.txt",
+            "x/a/b.txt",
+            "top/file.py",
+            "nested/top/file.py",
+            "src/api.gen.py",
+            "src/sub/api.gen.py",
+        ],
+    },
+    "double_star": {
+        "ignore": {
+            ".gitignore": "**/foo\nabc/**\na/**/b\n**/logs/*.txt\n",
+        },
+        "files": [
+            "foo",
+            "x/y/foo",
+            "z/foo/inner.py",
+            "abc/d/e.py",
+            "abc.py",
+            "a/b",
+            "a/x/y/b",
+            "a/bb",
+            "logs/one.txt",
+            "deep/logs/two.txt",
+            "deep/logs/three.py",
+        ],
+    },
+    "negation": {
+        "ignore": {
+            ".gitignore": "logs/\n!logs/keep.txt\n*.tmp\n!*/\n!special.tmp\n",
+        },
+        "files": [
+            "logs/keep.txt",
+            "logs/drop.txt",
+            "a.tmp",
+            "special.tmp",
+            "dir/special.tmp",
+            "dir/other.tmp",
+        ],
+    },
+    "whitelist": {
+        "ignore": {
+            ".gitignore": "*\n!*/\n!*.py\n",
+        },
+        "files": ["a.py", "a.txt", "src/b.py", "src/b.md", "src/deep/c.py"],
+    },
+    "nested": {
+        "ignore": {
+            ".gitignore": "*.tmp\nvendor\n",
+            "sub/.gitignore": "!keep.tmp\n/local\n*.py\n!main.py\n",
+            "sub/deeper/.gitignore": "!*.py\n",
+        },
+        "files": [
+            "a.tmp",
+            "sub/keep.tmp",
+            "sub/drop.tmp",
+            "sub/local/file.txt",
+            "sub/x/local/file.txt",
+            "sub/main.py",
+            "sub/util.py",
+            "sub/deeper/util.py",
+            "vendor/lib.py",
+            "sub/vendor/lib.py",
+        ],
+    },
+    "character_classes": {
+        "ignore": {
+            ".gitignore": "file[0-9].txt\nx[!a]y\n[[:digit:]]*.dat\nq?.md\n[]]z\n",
+        },
+        "files": [
+            "file1.txt",
+            "fileA.txt",
+            "xby",
+            "xay",
+            "7.dat",
+            "a7.dat",
+            "q1.md",
+            "q12.md",
+            "]z",
+        ],
+    },
+    "escapes_and_comments": {
+        "ignore": {
+            ".gitignore": "# comment\n\\#hash\n\\!bang\n\n   \nspaced.txt   \n",
+        },
+        "files": ["#hash", "!bang", "comment", "spaced.txt"],
+    },
+    "info_exclude": {
+        "ignore": {
+            ".git/info/exclude": "secret/\nlocal.cfg\n",
+            ".gitignore": "!secret/\n",
+        },
+        "files": ["secret/key.txt", "local.cfg", "sub/local.cfg"],
+    },
+    "directory_only": {
+        "ignore": {
+            ".gitignore": "out/\ncache\n",
+        },
+        "files": ["out", "x/out/file.py", "cache", "y/cache/file.py"],
+    },
+}
+
+
+def _git_env(home):
+    """Isolate git from the user's global and system configuration."""
+    env = dict(os.environ)
+    env.update(
+        {
+            "HOME": str(home),
+            "XDG_CONFIG_HOME": str(home),
+            "GIT_CONFIG_NOSYSTEM": "1",
+        }
+    )
+    return env
+
+
+def _build_case(root, case):
+    """Create a git repository holding the case's files and ignore rules."""
+    env = _git_env(root.parent)
+    subprocess.run(["git", "init", "-q", str(root)], check=True, env=env)
+    for relative_path in case["files"]:
+        file_path = root / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("")
+    for relative_path, content in case["ignore"].items():
+        file_path = root / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+    return env
+
+
+def _all_paths(root):
+    """List every file and directory below root except .git."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != ".git"]
+        relative_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        prefix = "" if relative_dir == "." else relative_dir + "/"
+        paths.extend((prefix + name, True) for name in dirnames)
+        paths.extend((prefix + name, False) for name in filenames)
+    return paths
+
+
+def _git_ignored(root, paths, env):
+    """Ask git which of the given paths are ignored."""
+    result = subprocess.run(
+        ["git", "check-ignore", "--no-index", "--stdin", "-z"],
+        cwd=root,
+        input="\0".join(paths).encode() + b"\0",
+        capture_output=True,
+        env=env,
+    )
+    assert result.returncode in (0, 1), result.stderr
+    return {p.decode() for p in result.stdout.split(b"\0") if p}
+
+
+class TestPatternParsing:
+    """Test parsing and translation of individual patterns."""
+
+    def test_parse_ignore_line(self):
+        """Test comments, negation and directory markers."""
+        assert parse_ignore_line("") is None
+        assert parse_ignore_line("# comment") is None
+        assert parse_ignore_line("   ") is None
+        assert parse_ignore_line("*.log") == ("*.log", False, False)
+        assert parse_ignore_line("!keep.log") == ("keep.log", True, False)
+        assert parse_ignore_line("build/") == ("build", False, True)
+        assert parse_ignore_line("name   ") == ("name", False, False)
+        assert parse_ignore_line("name\\ ") == ("name\\ ", False, False)
+        assert parse_ignore_line("\\#hash") == ("\\#hash", False, False)
+
+    def test_translate_pattern(self):
+        """Test wildcard translation and anchoring."""
+        assert re.fullmatch(translate_pattern("*.py"), "a/b/c.py")
+        assert not re.fullmatch(translate_pattern("/*.py"), "a/c.py")
+        assert re.fullmatch(translate_pattern("a/**/b"), "a/b")
+        assert re.fullmatch(translate_pattern("a/**/b"), "a/x/y/b")
+        assert not re.fullmatch(translate_pattern("a/*/b"), "a/x/y/b")
+        assert not re.fullmatch(translate_pattern("[a-z]"), "/")
+
+    def test_last_matching_pattern_wins(self):
+        """Test later patterns take precedence within one file."""
+        rules = IgnoreRules("", ["*.log", "!keep.log", "keep.log"])
+        assert rules.match("keep.log", False) is True
+
+        rules = IgnoreRules("", ["*.log", "!keep.log"])
+        assert rules.match("keep.log", False) is False
+        assert rules.match("other.txt", False) is None
+
+    def test_rules_are_relative_to_base(self):
+        """Test nested rules only apply below their directory."""
+        rules = IgnoreRules("sub/", ["/local"])
+        assert rules.match("sub/local", True) is True
+        assert rules.match("local", True) is None
+        assert rules.match("sub/x/local", True) is None
+
+
+class TestGitignoreMatcher:
+    """Test the matcher on real directory trees."""
+
+    def test_ignored_directory_cannot_be_reincluded(self):
+        """Test files under an ignored directory stay ignored."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir)
+            (root / ".gitignore").write_text("logs/\n!logs/keep.txt\n")
+
+            matcher = GitignoreMatcher(root)
+            assert matcher.is_ignored("logs", is_dir=True)
+            assert matcher.is_ignored("logs/keep.txt")
+            assert not matcher.is_ignored("src/keep.txt")
+
+    def test_walker_prunes_ignored_directories(self):
+        """Test the repository walker never reads ignored directories."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir)
+            (root / ".gitignore").write_text("generated/\n*.gen.py\n")
+            (root / "src").mkdir()
+            (root / "src" / "app.py").write_text('# track_lore("app.md")\n')
+            (root / "src" / "app.gen.py").write_text('# track_lore("gen.md")\n')
+            (root / "generated").mkdir()
+            (root / "generated" / "out.py").write_text('# track_lore("out.md")\n')
+
+            matcher = GitignoreMatcher(root)
+            with pytest.MonkeyPatch.context() as monkeypatch:
+                listed = []
+                original = os.scandir
+
+                def recording_scandir(path):
+                    listed.append(os.path.relpath(path, root))
+                    return original(path)
+
+                monkeypatch.setattr(os, "scandir", recording_scandir)
+                paths = [p for p, _ in iter_repository_files(root, [], None, matcher)]
+
+            assert paths == ["src/app.py"]
+            assert "generated" not in listed
+
+    def test_scan_respects_gitignore_outside_git(self):
+        """Test scans of non-git directories honour .gitignore by default."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir)
+            (root / ".gitignore").write_text("dist_out/\n")
+            (root / "app.py").write_text('# track_lore("app.md")\n')
+            (root / "dist_out").mkdir()
+            (root / "dist_out" / "bundle.js").write_text('// track_lore("b.md")\n')
+
+            assert scan_repository_for_lore_decorators(root) == {"app.md": ["app.py"]}
+            assert scan_repository_for_lore_decorators(
+                root, config={"respectGitignore": False}, use_cache=False
+            ) == {"app.md": ["app.py"], "b.md": ["dist_out/bundle.js"]}
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+@pytest.mark.parametrize("case_name", sorted(CONFORMANCE_CORPUS))
+def test_conformance_with_git_check_ignore(case_name):
+    """Test the matcher agrees with git check-ignore on the corpus."""
+    case = CONFORMANCE_CORPUS[case_name]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir) / "repo"
+        env = _build_case(root, case)
+        paths = _all_paths(root)
+
+        expected = _git_ignored(root, [path for path, _ in paths], env)
+        matcher = GitignoreMatcher(root)
+        actual = {path for path, is_dir in paths if matcher.is_ignored(path, is_dir)}
+
+        assert actual == expected
+
+        # The pruning walker must visit exactly the files git does not ignore
+        walked = {
+            path for path, _ in iter_repository_files(root, [".git"], ["*"], matcher)
+        }
+        assert walked == {
+            path for path, is_dir in paths if not is_dir and path not in expected
+        }
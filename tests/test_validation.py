@@ -0,0 +1,343 @@
+"""
+Unit tests for the lore validation engine.
+"""
+
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from dungeon_master.core import validation
+from dungeon_master.core.cache import BlobCache
+from dungeon_master.core.template import (
+    DEFAULT_TEMPLATE,
+    DIAGRAM_PLACEHOLDERS,
+    REQUIRED_PLACEHOLDERS,
+    LoreOutline,
+    check_outline,
+    find_placeholders,
+    index_sections,
+)
+from dungeon_master.core.validation import (
+    LoreStatus,
+    LoreValidator,
+    resolve_validation_workers,
+    validate_lore,
+)
+
+# A lore file that passes validation
+COMPLETE_LORE = (Path(__file__).parents[1] / ".lore/core/engine.md").read_text()
+
+
+@pytest.fixture
+def lore_root():
+    """Create a lore directory with one file per status."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        template = DEFAULT_TEMPLATE.format(filename="x", tracked_files="x.py")
+        (root / "valid.md").write_text(COMPLETE_LORE)
+        (root / "template.md").write_text(template)
+        yield root
+
+
+class TestPlaceholders:
+    """Test the single-pass placeholder search."""
+
+    def test_finds_every_placeholder(self):
+        """Test the template contains every placeholder, found in one pass."""
+        content = DEFAULT_TEMPLATE.format(filename="x", tracked_files="x.py")
+        placeholders = set(REQUIRED_PLACEHOLDERS + DIAGRAM_PLACEHOLDERS)
+        assert find_placeholders(content) == placeholders
+        assert find_placeholders(COMPLETE_LORE) == set()
+        assert find_placeholders("[PLEASE FILL OUT: Examples] x" * 3) == {
+            "[PLEASE FILL OUT: Examples]"
+        }
+
+
+class TestSectionIndex:
+    """Test the single-pass section indexer."""
+
+    def test_section_table(self):
+        """Test offsets, nesting and lengths of the indexed sections."""
+        content = (
+            "# Title\n"
+            "## Overview\n"
+            "Some text <!-- hidden -->here\n"
+            "<!--\n"
+            "## Not a heading\n"
+            "-->\n"
+            "### Detail ###\n"
+            "```python\n"
+            "# not a heading\n"
+            "```\n"
+            "## Diagrams\n"
+        )
+        outline = index_sections(content)
+        titles = [(s.level, s.title) for s in outline.sections]
+        assert titles == [(1, "Title"), (2, "Overview"), (3, "Detail"), (2, "Diagrams")]
+
+        title, overview, detail, diagrams = outline.sections
+        assert content[overview.start :].startswith("## Overview")
+        assert overview.end == diagrams.start == detail.end
+        assert title.end == diagrams.end == len(content)
+        assert detail.length == len("#notaheading")
+        assert overview.length == len("Sometexthere") + detail.length
+        assert diagrams.length == 0
+
+    def test_find_and_json(self):
+        """Test section lookup by name and the cached representation."""
+        outline = index_sections(
+            "## Key Functions/Components\nx\n## Usage Examples\ny\n"
+        )
+        assert outline.find("functions/components").title == (
+            "Key Functions/Components"
+        )
+        assert outline.find("Examples").title == "Usage Examples"
+        assert outline.find("Components") is None
+
+        restored = LoreOutline.from_json(outline.to_json())
+        assert [s.length for s in restored.sections] == [1, 1]
+        assert restored.find("Examples").start == outline.find("Examples").start
+
+    def test_required_sections_and_length(self):
+        """Test required sections must exist and be long enough."""
+        outline = index_sections(COMPLETE_LORE)
+        assert check_outline(outline, Path("x.md"), min_section_length=50)["is_valid"]
+
+        result = check_outline(outline, Path("x.md"), ["Overview", "Glossary"])
+        assert not result["is_valid"]
+        assert result["missing_sections"] == ["Glossary"]
+
+        result = check_outline(
+            index_sections("## Overview\nShort.\n## Diagrams\nNone.\n"),
+            Path("x.md"),
+            ["Overview", "Diagrams"],
+            min_section_length=10,
+        )
+        assert not result["is_template"]
+        assert result["missing_sections"] == ["Overview", "Diagrams"]
+        assert result["section_problems"] == [
+            "Overview: 6 of 10 characters",
+            "Diagrams: 5 of 10 characters",
+        ]
+
+        result = check_outline(
+            index_sections("## Overview\n[PLEASE FILL OUT: Overview]\n"),
+            Path("x.md"),
+            ["Overview", "Diagrams"],
+        )
+        assert result["section_problems"] == [
+            "Overview: placeholder text left",
+            "Diagrams: missing",
+        ]
+
+
+class TestLoreValidator:
+    """Test lore statuses are computed once per lore file."""
+
+    def test_statuses(self, lore_root):
+        """Test each state is detected."""
+        validator = LoreValidator(str(lore_root))
+        assert validator.check("valid.md", ["a.py"]).state == LoreStatus.VALID
+        assert validator.check("template.md", ["a.py"]).state == LoreStatus.TEMPLATE
+        assert validator.check("missing.md", ["a.py"]).state == LoreStatus.MISSING
+
+        assert not validator.check("valid.md", ["b.py"]).is_problem
+        assert not validator.check("missing.md", ["a.py"]).exists
+
+        strict = LoreValidator(
+            str(lore_root),
+            config={"requiredSections": ["Overview"], "minSectionLength": 10**6},
+        )
+        status = strict.check("valid.md", ["a.py"])
+        assert status.state == LoreStatus.INCOMPLETE
+        assert status.is_problem
+        assert status.missing_sections == ["Overview"]
+
+    def test_streaming_checks_each_file_once(self, lore_root):
+        """Test statuses follow the scan and are not recomputed."""
+        decorators = [
+            ("a.py", "valid.md"),
+            ("b.py", "missing.md"),
+            ("c.py", "valid.md"),
+            ("d.py", "template.md"),
+        ]
+        validator = LoreValidator(str(lore_root))
+        mapping = {}
+        with patch.object(
+            validation,
+            "index_sections",
+            wraps=validation.index_sections,
+        ) as index_content:
+            statuses = list(validator.iter_statuses(decorators, mapping))
+            assert validator.check("valid.md", []) is statuses[0]
+            assert index_content.call_count == 2
+
+        assert [status.lore_path for status in statuses] == [
+            "valid.md",
+            "missing.md",
+            "template.md",
+        ]
+        assert statuses[0].tracked_files == ["a.py", "c.py"]
+        assert mapping["valid.md"] is statuses[0].tracked_files
+
+    def test_find_updates(self, lore_root):
+        """Test changed sources are paired with their existing lore files."""
+        mapping = {
+            "valid.md": ["a.py", "b.py"],
+            "template.md": ["c.py"],
+            "missing.md": ["a.py"],
+        }
+        validator = LoreValidator(str(lore_root))
+        changed = {"b.py", "c.py", str(lore_root / "template.md")}
+        assert validator.find_updates(mapping, changed) == [
+            ("valid.md", ["b.py"], False),
+            ("template.md", ["c.py"], True),
+        ]
+        assert validator.find_updates(mapping, set()) == []
+
+
+class TestParallelValidation:
+    """Test lore files checked by a worker pool."""
+
+    def test_statuses_keep_input_order(self, lore_root):
+        """Test statuses come back in order even when checks finish out of it."""
+        for number in range(8):
+            (lore_root / f"{number}.md").write_text(COMPLETE_LORE)
+        validator = LoreValidator(str(lore_root))
+        check = validator.check
+        threads = set()
+
+        def slow_check(lore_path, tracked_files):
+            threads.add(threading.get_ident())
+            time.sleep(0.01 * (8 - int(lore_path[0])))
+            return check(lore_path, tracked_files)
+
+        decorators = [(f"{n}.py", f"{n}.md") for n in range(8)] + [("x.py", "0.md")]
+        mapping = {}
+        with patch.object(validator, "check", side_effect=slow_check):
+            statuses = list(validator.iter_statuses(decorators, mapping, workers=4))
+
+        assert [status.lore_path for status in statuses] == [
+            f"{n}.md" for n in range(8)
+        ]
+        assert all(status.state == LoreStatus.VALID for status in statuses)
+        assert mapping["0.md"] == ["0.py", "x.py"]
+        assert len(threads) > 1
+
+    def test_closing_early_cancels_queued_checks(self, lore_root):
+        """Test a fail-fast consumer does not wait for every lore file."""
+        validator = LoreValidator(str(lore_root))
+        lore_files = [("missing.md", ["a.py"])] + [("valid.md", ["b.py"])] * 100
+        with patch.object(
+            validator, "check", side_effect=validator.check
+        ) as check_lore:
+            statuses = validator.check_each(lore_files, workers=2)
+            assert next(statuses).state == LoreStatus.MISSING
+            statuses.close()
+        assert check_lore.call_count < len(lore_files)
+
+    def test_resolve_workers(self):
+        """Test automatic pool sizes follow the number of lore files."""
+        assert resolve_validation_workers(3) == 3
+        assert resolve_validation_workers(3, lore_files=2) == 2
+        assert resolve_validation_workers(0, lore_files=1) == 1
+        assert resolve_validation_workers(0, lore_files=0) == 1
+        assert resolve_validation_workers(0) > 1
+
+
+class TestLoreResults:
+    """Test lore validation results and section tables are reused."""
+
+    def test_unchanged_lore_files_are_not_read(self, lore_root):
+        """Test the result index skips reading unchanged lore files."""
+        cache_path = lore_root / "dmcache.json"
+        first = LoreValidator(str(lore_root))
+        first.load_results(cache_path)
+        assert first.check("valid.md", ["a.py"]).state == LoreStatus.VALID
+        assert first.check("template.md", ["a.py"]).state == LoreStatus.TEMPLATE
+        assert first.save_results()
+
+        second = LoreValidator(str(lore_root))
+        second.load_results(cache_path)
+        with patch.object(Path, "read_bytes") as read_bytes:
+            assert second.check("valid.md", ["a.py"]).state == LoreStatus.VALID
+            assert second.check("template.md", ["a.py"]).state == LoreStatus.TEMPLATE
+            assert read_bytes.call_count == 0
+        assert second.results.hits == 2
+
+        # Changing a rule invalidates every recorded result
+        strict = LoreValidator(str(lore_root), config={"minSectionLength": 10**6})
+        strict.load_results(cache_path)
+        assert strict.results.files == {}
+        assert strict.check("valid.md", ["a.py"]).state == LoreStatus.INCOMPLETE
+
+    def test_results_are_shared_by_content(self, lore_root):
+        """Test a copy of a checked lore file is not checked again."""
+        (lore_root / "copy.md").write_text(COMPLETE_LORE)
+        blob_cache = BlobCache.open(lore_root, 10)
+        validator = LoreValidator(str(lore_root), blob_cache=blob_cache)
+        with patch.object(
+            validation, "check_outline", wraps=validation.check_outline
+        ) as check_content:
+            validator.check("valid.md", ["a.py"])
+            status = validator.check("copy.md", ["b.py"])
+            assert check_content.call_count == 1
+        assert status.state == LoreStatus.VALID
+        blob_cache.close()
+
+    def test_same_content_is_indexed_once(self, lore_root):
+        """Test renamed and re-read copies hit the blob cache."""
+        data = COMPLETE_LORE.encode("utf-8")
+        blob_cache = BlobCache.open(lore_root, 10)
+        with patch.object(
+            validation,
+            "index_sections",
+            wraps=validation.index_sections,
+        ) as index_content:
+            first = validate_lore(lore_root / "a.md", data, blob_cache)
+            second = validate_lore(lore_root / "b.md", data, blob_cache)
+            assert index_content.call_count == 1
+
+        # Editing the text around the diagrams re-indexes the file, but the
+        # diagram checks are reused per code block
+        edited = (COMPLETE_LORE + "\nMore notes.\n").encode("utf-8")
+        with patch.object(
+            validation, "check_diagram", wraps=validation.check_diagram
+        ) as check_content:
+            validate_lore(lore_root / "a.md", edited, blob_cache)
+            assert check_content.call_count == 0
+        blob_cache.close()
+
+        assert first["is_valid"] and second["is_valid"]
+        assert second["file_path"] == str(lore_root / "b.md")
+
+        # A later run reads the result back from the database
+        blob_cache = BlobCache.open(lore_root, 10)
+        validator = LoreValidator(str(lore_root), blob_cache=blob_cache)
+        assert validator.check("valid.md", ["a.py"]).state == LoreStatus.VALID
+        assert blob_cache.hits == 1
+        blob_cache.close()
+
+    def test_schema_version_invalidates_results(self, lore_root):
+        """Test bumping the cache schema version ignores stored results."""
+        blob_cache = BlobCache.open(lore_root, 10)
+        validate_lore(lore_root / "a.md", COMPLETE_LORE.encode("utf-8"), blob_cache)
+        rules = {"required_sections": ["Overview"]}
+        fingerprint = validation.get_rules_fingerprint(rules, DEFAULT_TEMPLATE)
+        version = validation.CACHE_SCHEMA_VERSION + 1
+        with patch.object(validation, "CACHE_SCHEMA_VERSION", version):
+            assert validation.get_rules_fingerprint(rules, DEFAULT_TEMPLATE) != (
+                fingerprint
+            )
+            with patch.object(
+                validation, "index_sections", wraps=validation.index_sections
+            ) as index_content:
+                validate_lore(
+                    lore_root / "a.md", COMPLETE_LORE.encode("utf-8"), blob_cache
+                )
+                assert index_content.call_count == 1
+        blob_cache.close()